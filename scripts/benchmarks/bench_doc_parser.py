@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Benchmark the documentation parser on large doc pages.
+
+Each page is also parsed with the previous doc_parser.py from git (by
+default the version before the last commit that changed it), so a change
+is reported as a speedup over the code it replaces.
+
+Usage:
+    python scripts/benchmarks/bench_doc_parser.py
+    python scripts/benchmarks/bench_doc_parser.py --sections 50 200 800 --repeat 10
+    python scripts/benchmarks/bench_doc_parser.py page.md other-page.md --json
+    python scripts/benchmarks/bench_doc_parser.py --baseline a585997
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+# Add lib to path
+lib_path = os.path.join(os.path.dirname(__file__), '..', 'lib')
+sys.path.insert(0, lib_path)
+
+from doc_parser import parse_documentation
+
+
+BENCH_URL = "https://www.elastic.co/docs/reference/query-languages/query-dsl/query-dsl-bench-query"
+
+SECTION_TEMPLATE = """## Section {n} [bench-section-{n}]
+
+Paragraph of prose for section {n}, describing how `field_{n}` is analyzed
+and which options change the result. See `boost` (Optional, float) for scoring.
+
+```console
+GET /products/_search
+{{
+  "query": {{
+    "match": {{
+      "field_{n}": {{ "query": "value {n}", "operator": "and" }}
+    }}
+  }}
+}}
+```
+
+### Parameters for section {n}
+
+`param_{n}`
+:   (Optional, string) Description of parameter {n}.
+
+    A second paragraph of the description.
+
+- `option_{n}` (Optional, integer) Bullet documented option.
+
+| Parameter | Description |
+| --- | --- |
+| `column_{n}` | Table documented parameter |
+
+#### setting_{n}
+
+```json
+{{ "query": {{ "term": {{ "setting_{n}": "x" }} }} }}
+```
+"""
+
+
+def synthetic_page(sections: int) -> str:
+    """Build a doc page with the given number of sections.
+    
+    Args:
+        sections: Number of sections (each has prose, code and parameters)
+        
+    Returns:
+        Markdown content
+    """
+    header = "# Bench query [query-dsl-bench-query]\n\nReturns documents for the benchmark.\n\n"
+    return header + '\n'.join(SECTION_TEMPLATE.format(n=n) for n in range(sections))
+
+
+def previous_revision() -> str:
+    """Revision before the last commit that changed doc_parser.py."""
+    last = subprocess.run(
+        ['git', 'log', '-1', '--format=%H', '--', 'doc_parser.py'],
+        cwd=lib_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    return f"{last}^" if last else 'HEAD'
+
+
+def load_baseline(revision: str) -> Optional[types.ModuleType]:
+    """Load doc_parser.py as of a git revision, as a separate module.
+    
+    Args:
+        revision: Git revision (e.g. 'HEAD~3' or a commit hash)
+        
+    Returns:
+        Module, or None if the revision could not be read
+    """
+    try:
+        source = subprocess.run(
+            ['git', 'show', f"{revision}:./doc_parser.py"],
+            cwd=lib_path, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not read doc_parser.py at {revision}: {(getattr(e, 'stderr', '') or str(e)).strip()}", file=sys.stderr)
+        return None
+    module = types.ModuleType('doc_parser_baseline')
+    exec(compile(source, f"{revision}:doc_parser.py", 'exec'), module.__dict__)
+    return module
+
+
+def time_call(func, markdown: str, repeat: int) -> float:
+    """Best wall time of a parser call in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(markdown)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(pages: List[tuple], repeat: int, baseline: Optional[types.ModuleType] = None) -> List[Dict[str, Any]]:
+    """Time parse_documentation on each page, and the baseline's if given.
+    
+    Args:
+        pages: List of (name, markdown) tuples
+        repeat: Runs per page (the best run is reported)
+        baseline: Previous doc_parser module to compare against
+        
+    Returns:
+        List of result dicts
+    """
+    results = []
+    for name, markdown in pages:
+        parse_ms = time_call(lambda md: parse_documentation(BENCH_URL, markdown=md), markdown, repeat)
+        baseline_ms = None
+        if baseline:
+            baseline_ms = time_call(lambda md: baseline.parse_documentation(BENCH_URL, markdown=md), markdown, repeat)
+        size = len(markdown.encode('utf-8'))
+        results.append({
+            'page': name,
+            'bytes': size,
+            'lines': markdown.count('\n') + 1,
+            'parse_ms': round(parse_ms, 3),
+            'baseline_ms': round(baseline_ms, 3) if baseline_ms is not None else None,
+            'speedup': round(baseline_ms / parse_ms, 2) if baseline_ms and parse_ms else None,
+            'mb_per_s': round(size / (parse_ms / 1000) / 1_000_000, 2) if parse_ms else None
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark doc_parser on large doc pages")
+    parser.add_argument('files', nargs='*', help='Markdown files to benchmark (default: synthetic pages)')
+    parser.add_argument('--sections', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Section counts of the synthetic pages (default: 10 100 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per page; the best is reported (default: 5)')
+    parser.add_argument('--baseline', metavar='REV',
+                        help='Git revision of doc_parser.py to compare against '
+                             '(default: the version before its last change)')
+    parser.add_argument('--no-baseline', action='store_true', help='Only time the current parser')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON, for tracking across commits')
+    args = parser.parse_args()
+    
+    if args.files:
+        pages = [(path, Path(path).read_text(encoding='utf-8')) for path in args.files]
+    else:
+        pages = [(f"synthetic-{n}", synthetic_page(n)) for n in args.sections]
+    
+    baseline = None
+    revision = None
+    if not args.no_baseline:
+        try:
+            revision = args.baseline or previous_revision()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Could not find the previous doc_parser.py: {e}", file=sys.stderr)
+        if revision:
+            baseline = load_baseline(revision)
+    
+    results = run(pages, max(1, args.repeat), baseline)
+    
+    if args.json:
+        print(json.dumps({'baseline': revision if baseline else None, 'results': results}, indent=2))
+        return
+    
+    if baseline:
+        print(f"Baseline: doc_parser.py at {revision}")
+    print(f"{'Page':<30} {'KB':>9} {'Lines':>8} {'Parse ms':>9} {'Base ms':>9} {'Speedup':>8} {'MB/s':>7}")
+    for result in results:
+        baseline_ms = f"{result['baseline_ms']:>9.2f}" if result['baseline_ms'] is not None else f"{'-':>9}"
+        speedup = f"{result['speedup']:>7.2f}x" if result['speedup'] else f"{'-':>8}"
+        print(
+            f"{result['page'][-30:]:<30} {result['bytes'] / 1024:>9.1f} {result['lines']:>8} "
+            f"{result['parse_ms']:>9.2f} {baseline_ms} {speedup} {result['mb_per_s'] or 0:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
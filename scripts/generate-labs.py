@@ -7,6 +7,7 @@ import os
 import re
 import subprocess
 import sys
+import tarfile
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
@@ -19,15 +20,24 @@ sys.path.insert(0, lib_path)
 # Project root (parent of scripts directory)
 PROJECT_ROOT = Path(__file__).parent.parent
 
-from cache_manager import CacheManager
-from doc_parser import parse_documentation, normalize_url, extract_slug_from_url
+DATASET_SCHEMAS_PATH = Path(__file__).parent / "data" / "dataset_schemas.json"
+
+from async_engine import get_engine
+from batch_llm import BATCH_BACKENDS, BatchManifest, FINISHED_STATUSES, get_batch_backend, write_batch_file, ingest_results
+from cache_manager import CacheManager, NAMESPACES as CACHE_NAMESPACES, BACKENDS as CACHE_BACKENDS
+from doc_parser import PARSER_VERSION, fetch_markdown, parse_documentation, extract_slug_from_url
 from es_validator import ESValidator
-from example_generator import ExampleGenerator
+from example_generator import ExampleGenerator, PROMPT_VERSIONS
+from lab_daemon import DEFAULT_SOCKET_PATH, JobServer
+from lab_fingerprints import LabFingerprints
 from preflight import run_all_checks
+from prompt_context import LABS_DIR, QUERY_LANGUAGE_PATTERN
 from quality_checker import QualityChecker
 from report_generator import ReportGenerator
 from state_manager import StateManager
 from track_builder import TrackBuilder
+from url_discovery import discover_urls, write_work_list
+from value_profile import DEFAULT_PROFILE_PATH, ValueProfile, build_value_profile
 
 
 def load_dataset_schemas() -> Dict[str, Any]:
@@ -36,8 +46,7 @@ def load_dataset_schemas() -> Dict[str, Any]:
     Returns:
         Dataset schemas dict
     """
-    schemas_path = Path(__file__).parent / "data" / "dataset_schemas.json"
-    with open(schemas_path, 'r', encoding='utf-8') as f:
+    with open(DATASET_SCHEMAS_PATH, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
@@ -56,13 +65,49 @@ def check_existing_lab(slug: str, base_dir: str = "instruqt_labs") -> bool:
     return track_dir.exists() or config_path.exists()
 
 
+def load_parsed_doc(url: str, cache_manager: CacheManager, refresh: bool = False) -> Dict[str, Any]:
+    """Fetch and parse a documentation page, through the cache.
+    
+    Args:
+        url: Documentation URL
+        cache_manager: Cache manager
+        refresh: Fetch the page even if it is cached, and re-parse it if it changed
+        
+    Returns:
+        Parsed documentation structure
+    """
+    cached_markdown = cache_manager.get_markdown(url)
+    parsed_doc = cache_manager.get_parsed_doc(url)
+    
+    if refresh:
+        markdown = fetch_markdown(url)
+        if markdown != cached_markdown:
+            cache_manager.set_markdown(url, markdown)
+            cached_markdown = markdown
+            parsed_doc = None
+    
+    # Parsed docs cached by an older parser lack the section tree
+    if parsed_doc is None or parsed_doc.get('parser_version') != PARSER_VERSION:
+        if cached_markdown is None:
+            markdown = fetch_markdown(url)
+            cache_manager.set_markdown(url, markdown)
+        else:
+            markdown = cached_markdown
+        
+        parsed_doc = parse_documentation(url, markdown=markdown)
+        cache_manager.set_parsed_doc(url, parsed_doc)
+    return parsed_doc
+
+
 def process_single_url(
     url: str,
     args: argparse.Namespace,
     dataset_schemas: Dict[str, Any],
     cache_manager: CacheManager,
     state_manager: StateManager,
-    report: ReportGenerator
+    report: ReportGenerator,
+    lab_fingerprints: Optional[LabFingerprints] = None,
+    pipeline: Optional['WarmPipeline'] = None
 ) -> Dict[str, Any]:
     """Process a single URL to generate a lab.
     
@@ -73,22 +118,28 @@ def process_single_url(
         cache_manager: Cache manager
         state_manager: State manager
         report: Report generator
+        lab_fingerprints: Fingerprint manifest to check (--changed-only) and update
+        pipeline: Warm clients to reuse (daemon mode); created per URL if None
         
     Returns:
         Result dict with status and details
     """
     try:
-        # Normalize URL and get slug
-        normalized_url = normalize_url(url)
-        try:
-            parsed_doc_temp = parse_documentation(url, markdown=None)
-            slug = parsed_doc_temp.get('slug', extract_slug_from_url(url))
-        except Exception:
-            slug = extract_slug_from_url(url)
+        # The slug only depends on the URL, so no fetch is needed yet
+        slug = extract_slug_from_url(url)
+        parsed_doc = None
         
         # Check if lab exists
         if check_existing_lab(slug):
-            if not args.regenerate and not args.yolo:
+            if args.changed_only and lab_fingerprints is not None:
+                # Fetch the page again so doc changes aren't hidden by the cache
+                parsed_doc = load_parsed_doc(url, cache_manager, refresh=True)
+                changes = lab_fingerprints.changes(slug, parsed_doc, dataset_schemas, PROMPT_VERSIONS)
+                if not changes:
+                    report.add_skipped_lab(slug, url, "Unchanged (source doc, schemas and prompt version)")
+                    return {'status': 'skipped', 'slug': slug, 'url': url}
+                print(f"[Changed] Regenerating {slug}: {', '.join(changes)}")
+            elif not args.regenerate and not args.yolo:
                 report.add_skipped_lab(slug, url, "Already exists (use --regenerate)")
                 return {'status': 'skipped', 'slug': slug, 'url': url}
         
@@ -96,34 +147,32 @@ def process_single_url(
         state_manager.set_in_progress(url)
         
         # Parse documentation
-        cached_markdown = cache_manager.get_markdown(url)
-        parsed_doc = cache_manager.get_parsed_doc(url)
-        
         if parsed_doc is None:
-            if cached_markdown is None:
-                markdown = parse_documentation(url, markdown=None).get('raw_markdown', '')
-                cache_manager.set_markdown(url, markdown)
-            else:
-                markdown = cached_markdown
-            
-            parsed_doc = parse_documentation(url, markdown=markdown)
-            cache_manager.set_parsed_doc(url, parsed_doc)
+            parsed_doc = load_parsed_doc(url, cache_manager)
         
-        # Generate examples
-        example_generator = ExampleGenerator(cache_manager)
+        # Generate examples, validating each one as soon as it is generated
+        # (pass MCP client if available for ES|QL validation)
+        if pipeline is not None:
+            example_generator = pipeline.example_generator
+            es_validator = pipeline.es_validator
+        else:
+            example_generator = ExampleGenerator(cache_manager)
+            mcp_client = getattr(example_generator, 'mcp_client', None)
+            es_validator = ESValidator(example_generator, dataset_schemas, mcp_client, cache_manager)
+        prompt_stats_start = len(example_generator.prompt_stats)
+        streaming_validation = es_validator.start_streaming_validation(max_retries=5)
         lab_config = example_generator.generate_lab_config(
             parsed_doc,
             dataset_schemas,
-            parsed_doc.get('code_examples', [])
+            parsed_doc.get('code_examples', []),
+            on_example=streaming_validation.submit
         )
+        for prompt_stats in example_generator.prompt_stats[prompt_stats_start:]:
+            report.add_prompt_stats(slug, prompt_stats)
         
-        # Validate examples (pass MCP client if available for ES|QL validation)
-        mcp_client = getattr(example_generator, 'mcp_client', None)
-        es_validator = ESValidator(example_generator, dataset_schemas, mcp_client)
         query_language = lab_config.get('queryLanguage', 'query_dsl')
-        validation_results = es_validator.validate_all_examples(
+        validation_results = streaming_validation.results(
             lab_config.get('examples', []),
-            max_retries=5,
             query_language=query_language
         )
         
@@ -135,12 +184,17 @@ def process_single_url(
             if not r.get('valid', True)
         ]
         
+        rejected_examples = []
         if failed_examples:
             # Get IDs of failing examples
             failed_ids = set(str(r.get('example_id', '?')) for r in failed_examples)
             
             # Filter out failing examples from lab_config
             original_count = len(lab_config.get('examples', []))
+            rejected_examples = [
+                ex for ex in lab_config.get('examples', [])
+                if str(ex.get('id', '?')) in failed_ids
+            ]
             lab_config['examples'] = [
                 ex for ex in lab_config.get('examples', [])
                 if str(ex.get('id', '?')) not in failed_ids
@@ -157,6 +211,42 @@ def process_single_url(
             validation_results['invalid'] = 0
             validation_results['valid'] = valid_count
             
+            # Top up with only the missing examples instead of regenerating the lab
+            for top_up_round in range(args.top_up_rounds):
+                missing = MIN_VALID_EXAMPLES - valid_count
+                if missing <= 0:
+                    break
+                
+                print(f"[Top-up] Requesting {missing} new example(s) (round {top_up_round + 1}/{args.top_up_rounds})")
+                try:
+                    new_examples = example_generator.generate_additional_examples(
+                        parsed_doc,
+                        dataset_schemas,
+                        lab_config,
+                        missing,
+                        rejected_examples
+                    )
+                except RuntimeError as e:
+                    print(f"[Top-up] {e}")
+                    continue
+                
+                top_up_results = es_validator.validate_all_examples(
+                    new_examples,
+                    max_retries=5,
+                    query_language=query_language
+                )
+                for example, result in zip(new_examples, top_up_results['results']):
+                    if result.get('valid'):
+                        lab_config['examples'].append(example)
+                        validation_results['results'].append(result)
+                        example_generator.confirm_top_up(example)
+                    else:
+                        rejected_examples.append(example)
+                
+                valid_count = len(lab_config['examples'])
+                validation_results['valid'] = valid_count
+                print(f"[Top-up] {top_up_results['valid']}/{len(new_examples)} new example(s) valid, lab now has {valid_count}")
+            
             # Block only if we don't have enough valid examples
             if valid_count < MIN_VALID_EXAMPLES:
                 error_msg = f"Only {valid_count} valid example(s) after dropping failures (need {MIN_VALID_EXAMPLES})"
@@ -178,7 +268,7 @@ def process_single_url(
             )
         
         # Build track structure
-        track_builder = TrackBuilder()
+        track_builder = pipeline.track_builder if pipeline is not None else TrackBuilder()
         files_created = track_builder.build_track_structure(
             lab_config,
             slug,
@@ -203,6 +293,9 @@ def process_single_url(
             
             if build_result.returncode != 0:
                 raise RuntimeError(f"Build failed: {build_result.stderr}")
+            
+            if lab_fingerprints is not None:
+                lab_fingerprints.record(slug, url, parsed_doc, dataset_schemas, query_language, PROMPT_VERSIONS)
         
         # Mark as completed
         state_manager.mark_completed(url)
@@ -224,7 +317,7 @@ def process_single_url(
         
     except Exception as e:
         error_msg = str(e)
-        slug = parse_documentation(url, markdown=None).get('slug', 'unknown')
+        slug = extract_slug_from_url(url)
         state_manager.mark_failed(url, error_msg)
         report.add_failed_lab(slug, url, error_msg)
         return {'status': 'failed', 'slug': slug, 'url': url, 'error': error_msg}
@@ -420,6 +513,374 @@ def update_title_only(url: str, args: argparse.Namespace):
     return True
 
 
+def record_fingerprints_mode(
+    urls: List[str],
+    dataset_schemas: Dict[str, Any],
+    cache_manager: CacheManager,
+    lab_fingerprints: LabFingerprints
+) -> int:
+    """Record fingerprints for existing labs without regenerating them.
+    
+    Seeds the manifest so the first --changed-only run only regenerates
+    labs whose inputs changed after this baseline. Labs that already have
+    a fingerprint are left alone.
+    
+    Args:
+        urls: Documentation URLs
+        dataset_schemas: Dataset schema information
+        cache_manager: Cache manager
+        lab_fingerprints: Fingerprint manifest to update
+        
+    Returns:
+        Number of labs recorded
+    """
+    recorded = 0
+    for url in urls:
+        slug = extract_slug_from_url(url)
+        if not check_existing_lab(slug):
+            print(f"[Fingerprints] Skipping {slug}: no lab yet")
+            continue
+        if lab_fingerprints.has_record(slug):
+            print(f"[Fingerprints] Skipping {slug}: already recorded")
+            continue
+        
+        try:
+            parsed_doc = load_parsed_doc(url, cache_manager)
+        except Exception as e:
+            print(f"[Fingerprints] ✗ Could not fetch {url}: {e}")
+            continue
+        
+        config_path = LABS_DIR / f"{slug}Config.ts"
+        match = QUERY_LANGUAGE_PATTERN.search(config_path.read_text(encoding='utf-8')) if config_path.exists() else None
+        lab_fingerprints.record(
+            slug,
+            url,
+            parsed_doc,
+            dataset_schemas,
+            match.group(1) if match else 'query_dsl',
+            PROMPT_VERSIONS
+        )
+        print(f"[Fingerprints] ✓ Recorded {slug}")
+        recorded += 1
+    
+    print(f"[Fingerprints] Recorded {recorded} lab(s) in {lab_fingerprints.fingerprints_file}")
+    return recorded
+
+
+def batch_submit_mode(
+    urls: List[str],
+    args: argparse.Namespace,
+    dataset_schemas: Dict[str, Any],
+    cache_manager: CacheManager,
+    lab_fingerprints: Optional[LabFingerprints] = None
+) -> None:
+    """Collect the generation prompts of all URLs into one offline batch.
+    
+    Args:
+        urls: Documentation URLs
+        args: CLI arguments
+        dataset_schemas: Dataset schema information
+        cache_manager: Cache manager
+        lab_fingerprints: Fingerprint manifest checked with --changed-only
+    """
+    example_generator = ExampleGenerator(cache_manager)
+    requests = []
+    request_urls = {}
+    
+    for url in urls:
+        slug = extract_slug_from_url(url)
+        exists = check_existing_lab(slug)
+        if exists and not args.changed_only and not args.regenerate and not args.yolo:
+            print(f"[Batch] Skipping {slug}: already exists (use --regenerate)")
+            continue
+        
+        try:
+            parsed_doc = load_parsed_doc(url, cache_manager, refresh=exists and args.changed_only)
+        except Exception as e:
+            print(f"[Batch] ✗ Could not fetch {url}: {e}")
+            continue
+        
+        if exists and args.changed_only and lab_fingerprints is not None:
+            if not lab_fingerprints.changes(slug, parsed_doc, dataset_schemas, PROMPT_VERSIONS):
+                print(f"[Batch] Skipping {slug}: unchanged")
+                continue
+        
+        request = example_generator.prepare_batch_request(
+            parsed_doc,
+            dataset_schemas,
+            parsed_doc.get('code_examples', [])
+        )
+        if request is None:
+            print(f"[Batch] {slug}: no generation call needed (synthesized or cached)")
+            continue
+        if request['custom_id'] not in request_urls:
+            requests.append(request)
+            request_urls[request['custom_id']] = url
+    
+    if not requests:
+        print("[Batch] Nothing to submit - every lab is synthesized or already cached")
+        return
+    
+    requests_path = write_batch_file(
+        requests,
+        Path(".generate-labs-batches") / f"requests-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    )
+    backend = get_batch_backend(args.batch_backend, example_generator.client)
+    batch_id = backend.submit(requests_path)
+    BatchManifest().save(args.batch_backend, batch_id, urls, request_urls)
+    print(f"[Batch] Submitted {len(requests)} generation requests ({requests_path}) as batch {batch_id}")
+    print("[Batch] Run again with --batch-ingest once the batch has completed")
+
+
+def batch_ingest_mode(args: argparse.Namespace, cache_manager: CacheManager) -> Optional[List[str]]:
+    """Ingest the results of the submitted batch into the cache.
+    
+    Args:
+        args: CLI arguments
+        cache_manager: Cache manager
+        
+    Returns:
+        URLs of the batch to finish from cache, or None if the batch is
+        missing or not finished yet
+    """
+    manifest_store = BatchManifest()
+    manifest = manifest_store.load()
+    if not manifest:
+        print("[Batch] ✗ No submitted batch found (run with --batch-submit first)")
+        return None
+    
+    client = None
+    if manifest['backend'] == 'openai':
+        client = ExampleGenerator(cache_manager).client
+    backend = get_batch_backend(manifest['backend'], client)
+    batch_id = manifest['batch_id']
+    
+    status = backend.status(batch_id)
+    if status not in FINISHED_STATUSES:
+        print(f"[Batch] Batch {batch_id} is still {status}; try again later")
+        return None
+    if status != 'completed':
+        print(f"[Batch] ⚠ Batch {batch_id} {status}; ingesting any partial results")
+    
+    result = ingest_results(backend, batch_id, cache_manager)
+    print(f"[Batch] Ingested {result['ingested']}/{len(manifest['requests'])} lab configs from batch {batch_id}")
+    for custom_id, error in result['errors'].items():
+        url = manifest['requests'].get(custom_id, custom_id)
+        print(f"[Batch]   ✗ {url}: {error} (will be generated live)")
+    
+    manifest_store.clear()
+    return manifest.get('urls') or list(manifest['requests'].values())
+
+
+def discover_mode(args: argparse.Namespace) -> bool:
+    """Write a prioritized work list of doc URLs found on index pages or sitemaps.
+    
+    Args:
+        args: Parsed CLI arguments
+        
+    Returns:
+        True if a work list was written
+    """
+    known_urls = []
+    if args.urls_file and os.path.exists(args.urls_file):
+        with open(args.urls_file, 'r', encoding='utf-8') as f:
+            known_urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    
+    print(f"[Discover] Fetching {len(args.discover)} source(s)...")
+    result = discover_urls(
+        args.discover,
+        lab_exists=None if args.regenerate else check_existing_lab,
+        scope=args.discover_scope,
+        known_urls=known_urls
+    )
+    for source, error in result['errors'].items():
+        print(f"[Discover] ✗ Could not fetch {source}: {error}")
+    if len(result['errors']) == len(args.discover):
+        return False
+    
+    work_list = result['work_list']
+    print(f"[Discover] {result['found']} links: {len(work_list)} to generate, "
+          f"{len(result['existing'])} with existing labs, {result['duplicates']} duplicates, "
+          f"{result['out_of_scope']} out of scope")
+    if args.verbose and result['existing']:
+        print(f"[Discover] Existing labs: {', '.join(result['existing'])}")
+    
+    write_work_list(work_list, args.discover_output)
+    print(f"[Discover] ✓ Wrote work list to {args.discover_output}")
+    print(f"[Discover] Generate with: python generate-labs.py {args.discover_output}")
+    return True
+
+
+class WarmPipeline:
+    """Clients, caches and templates kept between daemon jobs.
+    
+    The generator (OpenAI and MCP clients), validator (Elasticsearch
+    client) and track builder (Jinja environment) are rebuilt only when
+    the dataset schemas or the value profile change on disk.
+    """
+    
+    def __init__(self, cache_backend: str = 'sqlite'):
+        """Initialize pipeline and build its components.
+        
+        Args:
+            cache_backend: Cache storage backend
+        """
+        self.cache_manager = CacheManager(backend=cache_backend)
+        self.example_generator = None
+        self._inputs = None
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """Rebuild the components if their inputs changed since the last job."""
+        # Fixes and top-ups of earlier jobs that never validated are not kept
+        self.cache_manager.discard_deferred_calls()
+        
+        inputs = tuple(path.stat().st_mtime if path.exists() else None for path in (DATASET_SCHEMAS_PATH, DEFAULT_PROFILE_PATH))
+        if inputs == self._inputs:
+            # Dataset contents may have changed between jobs
+            self.es_validator.clear_dataset_fingerprints()
+            self.example_generator.prompt_stats.clear()
+            self.example_generator.pending_top_ups.clear()
+            return
+        
+        # Close the previous generator's MCP connection before replacing it
+        mcp_client = getattr(self.example_generator, 'mcp_client', None)
+        if mcp_client:
+            mcp_client.close()
+        
+        self._inputs = inputs
+        self.dataset_schemas = load_dataset_schemas()
+        self.example_generator = ExampleGenerator(self.cache_manager)
+        self.es_validator = ESValidator(
+            self.example_generator,
+            self.dataset_schemas,
+            getattr(self.example_generator, 'mcp_client', None),
+            self.cache_manager
+        )
+        self.track_builder = TrackBuilder()
+
+
+# Flags that only make sense for a full CLI run, not for a daemon job
+# (jobs run their URLs one after another, on the daemon's cache)
+DAEMON_UNSUPPORTED_FLAGS = (
+    'push', 'push_only', 'update_title_only', 'resume', 'no_cache', 'parallel', 'clear_cache', 'cache_export',
+    'cache_import', 'profile_values', 'batch_submit', 'batch_ingest', 'discover', 'record_fingerprints', 'daemon'
+)
+
+
+def run_daemon_job(request: Dict[str, Any], emit, pipeline: WarmPipeline) -> Dict[str, Any]:
+    """Generate the labs of one daemon job on the warm pipeline.
+    
+    Args:
+        request: Job request with argv (generate-labs.py arguments) and the
+            client's cwd (for a relative urls_file)
+        emit: Function sending an event to the client
+        pipeline: Warm pipeline
+        
+    Returns:
+        Fields of the 'done' event (counts and report path)
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(request.get('argv', []))
+    except SystemExit:
+        raise ValueError(f"Invalid arguments: {' '.join(request.get('argv', []))}")
+    
+    defaults = parser.parse_args([])
+    unsupported = [flag for flag in DAEMON_UNSUPPORTED_FLAGS if getattr(args, flag) != getattr(defaults, flag)]
+    if unsupported:
+        raise ValueError(f"Not supported in daemon jobs: {', '.join('--' + flag.replace('_', '-') for flag in unsupported)}")
+    if args.cache_backend != defaults.cache_backend and args.cache_backend != pipeline.cache_manager.backend_name:
+        raise ValueError(
+            f"--cache-backend {args.cache_backend} differs from the daemon's cache ({pipeline.cache_manager.backend_name}); "
+            f"restart the daemon with it"
+        )
+    if args.changed_only and args.regenerate:
+        raise ValueError("--changed-only and --regenerate are mutually exclusive")
+    if args.yolo:
+        args.skip_review = True
+        args.regenerate = True
+    
+    if args.url:
+        urls = [args.url]
+    elif args.urls_file:
+        urls_path = Path(request.get('cwd', '.')) / args.urls_file
+        with open(urls_path, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        raise ValueError("Must provide either --url or urls_file")
+    
+    pipeline.refresh()
+    report = ReportGenerator()
+    state_manager = StateManager(".generate-labs-daemon-state.json")
+    state_manager.save(state_manager.create_batch(args.urls_file or '--url', urls))
+    lab_fingerprints = LabFingerprints()
+    
+    start_time = time.time()
+    results = []
+    for url in urls:
+        result = process_single_url(
+            url,
+            args,
+            pipeline.dataset_schemas,
+            pipeline.cache_manager,
+            state_manager,
+            report,
+            lab_fingerprints,
+            pipeline
+        )
+        results.append(result)
+        emit({'event': 'result', **result})
+    
+    report.set_summary(len(urls), time.time() - start_time)
+    report.set_cache_stats(pipeline.cache_manager.stats())
+    report.set_rate_stats(get_engine().rate_stats())
+    report.set_model_stats(get_engine().model_stats())
+    report.print_report()
+    report_path = None if args.dry_run else report.save_json()
+    
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return {'counts': counts, 'report': report_path, 'duration': round(time.time() - start_time, 1)}
+
+
+def daemon_mode(args: argparse.Namespace) -> None:
+    """Serve generation jobs on a Unix socket with warm clients.
+    
+    Preflight checks, client construction, MCP tool listing and the Jinja
+    environment are paid once; jobs submitted with labctl.py then start
+    immediately.
+    
+    Args:
+        args: Parsed CLI arguments
+    """
+    if not args.dry_run:
+        print("[Preflight] Running health checks...")
+        all_passed, check_results = run_all_checks()
+        for name, passed, message in check_results:
+            print(f"[Preflight] {'✓' if passed else '✗'} {name}: {message}")
+        if not all_passed:
+            print("\n[Preflight] ✗ Some checks failed. Aborting.")
+            sys.exit(1)
+    
+    pipeline = WarmPipeline(args.cache_backend)
+    try:
+        server = JobServer(args.socket, lambda request, emit: run_daemon_job(request, emit, pipeline))
+    except RuntimeError as e:
+        print(f"[Daemon] ✗ {e}")
+        sys.exit(1)
+    
+    print(f"[Daemon] ✓ Listening on {args.socket} (pid {os.getpid()}); submit jobs with: python labctl.py --url URL")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("[Daemon] Stopped")
+
+
 def push_only_mode(args):
     """Push all existing labs to GitHub and Instruqt without regenerating."""
     from rich.console import Console
@@ -526,8 +987,8 @@ def push_only_mode(args):
     console.print(f"\n[bold]Summary:[/bold] {success_count} pushed, {fail_count} failed")
 
 
-def main():
-    """Main entry point."""
+def build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser (also used for daemon jobs)."""
     parser = argparse.ArgumentParser(
         description="Generate interactive Elasticsearch query labs from documentation pages"
     )
@@ -574,6 +1035,16 @@ def main():
         action='store_true',
         help='Regenerate existing labs (overwrites)'
     )
+    parser.add_argument(
+        '--changed-only',
+        action='store_true',
+        help='Regenerate only existing labs whose source doc, dataset schemas or prompt version changed since they were generated'
+    )
+    parser.add_argument(
+        '--record-fingerprints',
+        action='store_true',
+        help='Record fingerprints of existing labs without regenerating them (baseline for --changed-only)'
+    )
     parser.add_argument(
         '--yolo',
         action='store_true',
@@ -583,7 +1054,7 @@ def main():
         '--parallel',
         type=int,
         default=1,
-        help='Number of parallel workers (default: 1, max recommended: 5)'
+        help='Number of parallel workers (default: 1). LLM and MCP calls from all workers share adaptive, rate-limit-aware concurrency limits'
     )
     parser.add_argument(
         '--resume',
@@ -595,11 +1066,89 @@ def main():
         action='store_true',
         help='Bypass cache'
     )
+    parser.add_argument(
+        '--cache-backend',
+        choices=list(CACHE_BACKENDS),
+        default='sqlite',
+        help='Cache storage backend (default: sqlite)'
+    )
+    parser.add_argument(
+        '--clear-cache',
+        nargs='+',
+        choices=list(CACHE_NAMESPACES) + ['all'],
+        metavar='NAMESPACE',
+        help=f"Invalidate cache namespaces before running ({', '.join(CACHE_NAMESPACES)}, or all)"
+    )
+    parser.add_argument(
+        '--cache-export',
+        metavar='PATH',
+        help='Export the cache to a portable bundle (.tar.gz) for other machines or CI'
+    )
+    parser.add_argument(
+        '--cache-import',
+        metavar='PATH',
+        help='Merge a cache bundle into the local cache (newer local entries are kept)'
+    )
+    parser.add_argument(
+        '--profile-values',
+        action='store_true',
+        help='Profile field values in the live indices (saved to data/value_profile.json) for prompts and hit prediction'
+    )
+    parser.add_argument(
+        '--batch-submit',
+        action='store_true',
+        help='Collect all generation prompts into an offline batch and submit it instead of generating labs'
+    )
+    parser.add_argument(
+        '--batch-ingest',
+        action='store_true',
+        help='Ingest the submitted batch into the cache and finish generating its labs (URLs default to the batch\'s)'
+    )
+    parser.add_argument(
+        '--batch-backend',
+        choices=list(BATCH_BACKENDS),
+        default='openai',
+        help='Backend for --batch-submit: the provider\'s Batch API, or a local file-based stand-in (default: openai)'
+    )
+    parser.add_argument(
+        '--discover',
+        nargs='+',
+        metavar='URL',
+        help='Build a work list from docs section index pages or sitemaps instead of generating labs'
+    )
+    parser.add_argument(
+        '--discover-scope',
+        metavar='PREFIX',
+        help='Only keep discovered URLs starting with this prefix (default: the index page\'s section; sitemaps are not scoped)'
+    )
+    parser.add_argument(
+        '--discover-output',
+        default='urls-discovered.txt',
+        metavar='PATH',
+        help='Work list written by --discover, usable as urls_file (default: urls-discovered.txt)'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Keep clients and caches warm and serve generation jobs on a Unix socket (submit jobs with labctl.py)'
+    )
+    parser.add_argument(
+        '--socket',
+        default=DEFAULT_SOCKET_PATH,
+        metavar='PATH',
+        help=f'Unix socket of --daemon (default: {DEFAULT_SOCKET_PATH}, or GENERATE_LABS_SOCKET)'
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
         help='Verbose output'
     )
+    parser.add_argument(
+        '--top-up-rounds',
+        type=int,
+        default=2,
+        help='Rounds of generating only the missing examples when too few pass validation (default: 2, 0 to disable)'
+    )
     parser.add_argument(
         '--min-hits',
         type=int,
@@ -607,8 +1156,17 @@ def main():
         help='Minimum hits required per example (default: 3)'
     )
     
+    return parser
+
+
+def main():
+    """Main entry point."""
+    parser = build_parser()
     args = parser.parse_args()
     
+    if args.changed_only and args.regenerate:
+        parser.error("--changed-only and --regenerate are mutually exclusive")
+    
     # Handle yolo flag
     if args.yolo:
         args.skip_review = True
@@ -618,6 +1176,11 @@ def main():
     if args.push:
         args.skip_review = True
     
+    # Serve jobs from labctl.py with warm clients
+    if args.daemon:
+        daemon_mode(args)
+        return
+    
     # Handle push-only mode - push existing labs without regeneration
     if args.push_only:
         push_only_mode(args)
@@ -630,6 +1193,62 @@ def main():
         success = update_title_only(args.url, args)
         sys.exit(0 if success else 1)
     
+    # Maintenance steps below all run before any generation mode; the run
+    # ends after them unless there is generation work to do
+    has_generation_work = bool(args.url or args.urls_file or args.discover or args.batch_ingest)
+    
+    # Handle per-namespace cache invalidation
+    if args.clear_cache:
+        namespaces = list(CACHE_NAMESPACES) if 'all' in args.clear_cache else args.clear_cache
+        for namespace, removed in CacheManager(backend=args.cache_backend).clear_namespaces(namespaces).items():
+            print(f"[Cache] Cleared {removed} entries from '{namespace}'")
+    
+    # Handle cache bundle import/export
+    if args.cache_import or args.cache_export:
+        bundle_cache = CacheManager(backend=args.cache_backend)
+        try:
+            if args.cache_import:
+                result = bundle_cache.import_bundle(args.cache_import)
+                print(f"[Cache] Imported {result['imported']} entries from {args.cache_import} "
+                      f"({result['skipped']} kept because the local copy is newer)")
+            if args.cache_export:
+                counts = bundle_cache.export_bundle(args.cache_export)
+                print(f"[Cache] Exported {sum(counts.values())} entries to {args.cache_export}")
+                for namespace, count in counts.items():
+                    if count:
+                        print(f"[Cache]   {namespace}: {count}")
+        except (ValueError, OSError, tarfile.TarError) as e:
+            print(f"[Cache] ✗ Bundle operation failed: {e}")
+            sys.exit(1)
+    
+    # Build the value profile used by prompts and hit prediction
+    if args.profile_values:
+        dataset_schemas = load_dataset_schemas()
+        profile_validator = ESValidator(
+            dataset_schemas=dataset_schemas,
+            cache_manager=CacheManager(use_cache=not args.no_cache, backend=args.cache_backend)
+        )
+        indices = list(dataset_schemas)
+        try:
+            profile = build_value_profile(
+                profile_validator.es,
+                indices,
+                {index: profile_validator.get_dataset_fingerprint(index) for index in indices}
+            )
+        except Exception as e:
+            print(f"[Profile] ✗ Profiling failed: {e}")
+            sys.exit(1)
+        print(f"[Profile] Saved value profile to {ValueProfile(profile).save()}")
+    
+    if (args.clear_cache or args.cache_import or args.cache_export or args.profile_values) and not has_generation_work:
+        return
+    
+    # Build a work list from docs index pages or sitemaps; slugs with
+    # existing labs are dropped before any page is fetched
+    if args.discover:
+        discovered = discover_mode(args)
+        sys.exit(0 if discovered else 1)
+    
     # Get URLs
     urls = []
     if args.url:
@@ -637,14 +1256,32 @@ def main():
     elif args.urls_file:
         with open(args.urls_file, 'r', encoding='utf-8') as f:
             urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-    else:
+    elif not args.batch_ingest:
         parser.error("Must provide either --url or urls_file")
     
     # Initialize components
-    cache_manager = CacheManager(use_cache=not args.no_cache)
+    cache_manager = CacheManager(use_cache=not args.no_cache, backend=args.cache_backend)
     state_manager = StateManager()
     report = ReportGenerator()
     dataset_schemas = load_dataset_schemas()
+    lab_fingerprints = LabFingerprints()
+    
+    if args.record_fingerprints:
+        record_fingerprints_mode(urls, dataset_schemas, cache_manager, lab_fingerprints)
+        return
+    
+    # Offline batch generation: submit prompts, or ingest results and
+    # finish the batch's labs from cache
+    if (args.batch_submit or args.batch_ingest) and args.no_cache:
+        parser.error("--batch-submit and --batch-ingest need the cache")
+    if args.batch_submit:
+        batch_submit_mode(urls, args, dataset_schemas, cache_manager, lab_fingerprints)
+        return
+    if args.batch_ingest:
+        batch_urls = batch_ingest_mode(args, cache_manager)
+        if batch_urls is None:
+            sys.exit(1)
+        urls = urls or batch_urls
     
     # Pre-flight checks
     if not args.dry_run:
@@ -697,7 +1334,8 @@ def main():
                     dataset_schemas,
                     cache_manager,
                     state_manager,
-                    report
+                    report,
+                    lab_fingerprints
                 ): url
                 for url in urls
             }
@@ -708,10 +1346,7 @@ def main():
                     result = future.result()
                     results.append(result)
                 except Exception as e:
-                    try:
-                        slug = parse_documentation(url, markdown=None).get('slug', extract_slug_from_url(url))
-                    except:
-                        slug = extract_slug_from_url(url)
+                    slug = extract_slug_from_url(url)
                     report.add_failed_lab(slug, url, str(e))
                     results.append({'status': 'failed', 'slug': slug, 'url': url, 'error': str(e)})
     else:
@@ -723,7 +1358,8 @@ def main():
                 dataset_schemas,
                 cache_manager,
                 state_manager,
-                report
+                report,
+                lab_fingerprints
             )
             results.append(result)
     
@@ -731,6 +1367,9 @@ def main():
     
     # Set summary
     report.set_summary(len(urls), elapsed_time)
+    report.set_cache_stats(cache_manager.stats())
+    report.set_rate_stats(get_engine().rate_stats())
+    report.set_model_stats(get_engine().model_stats())
     
     # Save JSON report (before deployment so we have a record even if deployment fails)
     report_path = None
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Thin client for the generation daemon (generate-labs.py --daemon).
+
+Usage:
+    python labctl.py --url https://www.elastic.co/docs/.../query-dsl-term-query --regenerate
+    python labctl.py urls.txt --changed-only
+    python labctl.py --status
+    python labctl.py --stop
+
+Any generate-labs.py generation arguments are passed to the daemon; its
+output is streamed back as the job runs.
+"""
+
+import argparse
+import os
+import sys
+
+# Add lib to path
+lib_path = os.path.join(os.path.dirname(__file__), 'lib')
+sys.path.insert(0, lib_path)
+
+from lab_daemon import DEFAULT_SOCKET_PATH, ping, send_request
+
+
+def print_event(event):
+    """Print a daemon event."""
+    kind = event.get('event')
+    if kind == 'log':
+        print(event.get('line', ''), flush=True)
+    elif kind == 'queued':
+        print("[labctl] Waiting for the running job to finish...", flush=True)
+    elif kind == 'result':
+        status = event.get('status')
+        mark = {'success': '✓', 'skipped': '–'}.get(status, '✗')
+        print(f"[labctl] {mark} {event.get('slug')}: {status}{' - ' + event['error'] if event.get('error') else ''}", flush=True)
+    elif kind == 'error':
+        print(f"[labctl] ✗ {event.get('message')}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Submit lab generation jobs to a running generate-labs.py --daemon",
+        epilog="Other arguments (urls_file, --url, --regenerate, --changed-only, --dry-run, ...) are passed to the daemon"
+    )
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help=f'Daemon socket (default: {DEFAULT_SOCKET_PATH})')
+    parser.add_argument('--status', action='store_true', help='Show whether the daemon is running')
+    parser.add_argument('--stop', action='store_true', help='Stop the daemon')
+    args, job_argv = parser.parse_known_args()
+    
+    status = ping(args.socket)
+    if status is None:
+        print(f"[labctl] No daemon on {args.socket}; start one with: python generate-labs.py --daemon")
+        sys.exit(1)
+    
+    if args.status:
+        print(f"[labctl] Daemon pid {status['pid']}: up {status['uptime']}s, "
+              f"{status['jobs_run']} job(s) run, {'busy' if status['busy'] else 'idle'}")
+        return
+    if args.stop:
+        send_request(args.socket, {'command': 'shutdown'}, print_event)
+        print("[labctl] Daemon stopped")
+        return
+    if not job_argv:
+        parser.error("Provide a urls_file or --url for the job")
+    
+    final = send_request(args.socket, {'command': 'generate', 'argv': job_argv, 'cwd': os.getcwd()}, print_event)
+    if final is None or final.get('event') == 'error':
+        sys.exit(1)
+    
+    counts = final.get('counts', {})
+    print(f"[labctl] Done in {final.get('duration')}s: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if final.get('report'):
+        print(f"[labctl] Report: {final['report']}")
+    sys.exit(1 if counts.get('failed') else 0)
+
+
+if __name__ == "__main__":
+    main()
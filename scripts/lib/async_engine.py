@@ -0,0 +1,376 @@
+"""Shared asyncio engine for concurrent LLM and MCP calls."""
+
+import asyncio
+import email.utils
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Mapping, Optional, Tuple
+
+
+# Initial in-flight requests per provider, shared by every generator in the
+# process (including --parallel workers). The limit then adapts: it grows
+# while requests succeed and halves on rate limits.
+PROVIDER_CONCURRENCY = {
+    'openai': int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+    'mcp': int(os.getenv("MCP_MAX_CONCURRENCY", "4")),
+}
+
+# Upper bound the adaptive limit may grow to, per provider
+PROVIDER_CONCURRENCY_CEILING = {
+    'openai': int(os.getenv("OPENAI_CONCURRENCY_CEILING", str(PROVIDER_CONCURRENCY['openai'] * 4))),
+    'mcp': int(os.getenv("MCP_CONCURRENCY_CEILING", str(PROVIDER_CONCURRENCY['mcp']))),
+}
+
+# Jittered exponential backoff between retries of rate-limited or failed requests
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Pause after a rate limit that came without a Retry-After hint
+DEFAULT_RATE_LIMIT_PAUSE_SECONDS = 1.0
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset duration such as "20ms", "1.5s" or "6m0s"."""
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|s|m|h)', value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def _header_int(headers: Optional[Mapping[str, str]], name: str) -> Optional[int]:
+    """Read an integer header, or None if it is missing or malformed."""
+    value = headers.get(name) if headers else None
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Get how long to wait before retrying from response headers.
+    
+    Understands retry-after-ms, Retry-After (seconds or HTTP date) and the
+    x-ratelimit-reset-requests / x-ratelimit-reset-tokens durations.
+    
+    Args:
+        headers: Response headers (case-insensitive mapping)
+        
+    Returns:
+        Seconds to wait, or None if the headers don't say
+    """
+    if not headers:
+        return None
+    
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            parsed = email.utils.parsedate_to_datetime(value) if value else None
+            if parsed:
+                return max(parsed.timestamp() - time.time(), 0.0)
+    
+    resets = [
+        _parse_duration(headers[name])
+        for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+        if headers.get(name)
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Compute a jittered exponential backoff delay.
+    
+    Args:
+        attempt: Zero-based retry attempt
+        retry_after: Optional minimum wait requested by the provider
+        
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one provider, with throughput stats.
+    
+    Used as `async with limiter:` around each request. The limit grows by
+    about one slot per limit's worth of successful requests while it is the
+    bottleneck, halves on a rate limit, and new requests wait while the
+    provider has asked for a pause (Retry-After, or rate-limit headers
+    reporting no remaining requests or tokens).
+    """
+    
+    def __init__(self, initial: int, ceiling: Optional[int] = None):
+        """Initialize limiter.
+        
+        Args:
+            initial: Starting concurrency limit
+            ceiling: Maximum concurrency limit (default: initial)
+        """
+        self.limit = float(max(1, initial))
+        self.ceiling = max(int(self.limit), ceiling or initial)
+        self._in_flight = 0
+        self._released: Optional[asyncio.Event] = None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        
+        self.requests = 0
+        self.tokens = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._first_request: Optional[float] = None
+        self._last_response: Optional[float] = None
+    
+    async def __aenter__(self) -> 'AdaptiveLimiter':
+        if self._released is None:
+            self._released = asyncio.Event()
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self._in_flight < int(self.limit):
+                break
+            self._released.clear()
+            await self._released.wait()
+        
+        self._in_flight += 1
+        if self._first_request is None:
+            self._first_request = time.monotonic()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        self._in_flight -= 1
+        self._released.set()
+    
+    def record_success(self, headers: Optional[Mapping[str, str]] = None, tokens: int = 0) -> None:
+        """Record a completed request and adapt the limit.
+        
+        Args:
+            headers: Optional response headers with x-ratelimit-* information
+            tokens: Tokens used by the request
+        """
+        self.requests += 1
+        self.tokens += tokens
+        self._last_response = time.monotonic()
+        
+        remaining_requests = _header_int(headers, 'x-ratelimit-remaining-requests')
+        remaining_tokens = _header_int(headers, 'x-ratelimit-remaining-tokens')
+        if remaining_requests == 0 or (remaining_tokens is not None and remaining_tokens < tokens):
+            # Nearly out of quota: wait for the window to reset instead of hitting a 429
+            self._pause(parse_retry_after(headers) or DEFAULT_RATE_LIMIT_PAUSE_SECONDS)
+            return
+        
+        # Additive increase, only while the limit is what holds requests back
+        if self._in_flight + 1 >= int(self.limit) and self.limit < self.ceiling:
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+    
+    def record_rate_limit(self, retry_after: Optional[float] = None) -> None:
+        """Record a rate-limited request: halve the limit and pause new requests.
+        
+        Args:
+            retry_after: Seconds the provider asked to wait, if known
+        """
+        self.rate_limited += 1
+        now = time.monotonic()
+        
+        # Requests already in flight during one burst count as one signal
+        if now - self._last_decrease > (retry_after or DEFAULT_RATE_LIMIT_PAUSE_SECONDS):
+            self.limit = max(1.0, self.limit / 2)
+            self._last_decrease = now
+        self._pause(retry_after or DEFAULT_RATE_LIMIT_PAUSE_SECONDS)
+    
+    def record_retry(self) -> None:
+        """Record that a request is being retried."""
+        self.retries += 1
+    
+    def _pause(self, seconds: float) -> None:
+        """Hold new requests for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get throughput statistics.
+        
+        Returns:
+            Dict with requests, tokens, rate_limited, retries, current limit,
+            and effective requests/tokens per minute
+        """
+        elapsed = (self._last_response or 0) - (self._first_request or 0)
+        minutes = elapsed / 60 if elapsed > 0 else None
+        return {
+            'requests': self.requests,
+            'tokens': self.tokens,
+            'rate_limited': self.rate_limited,
+            'retries': self.retries,
+            'limit': round(self.limit, 1),
+            'requests_per_minute': round(self.requests / minutes, 1) if minutes else None,
+            'tokens_per_minute': round(self.tokens / minutes) if minutes else None
+        }
+
+
+class CallStats:
+    """Latency, token and outcome counters for one task/model route."""
+    
+    def __init__(self):
+        """Initialize counters."""
+        self.calls = 0
+        self.failures = 0
+        self.tokens = 0
+        self.latencies = []
+    
+    def record(self, latency: float, tokens: int = 0, ok: bool = True) -> None:
+        """Record a finished call.
+        
+        Args:
+            latency: Seconds from the first attempt to the final outcome
+            tokens: Tokens used (0 if unknown)
+            ok: False if the call failed after all retries
+        """
+        self.calls += 1
+        self.tokens += tokens or 0
+        self.latencies.append(latency)
+        if not ok:
+            self.failures += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the counters.
+        
+        Returns:
+            Dict with calls, failures, success_rate, tokens, and average and
+            p95 latency in seconds
+        """
+        latencies = sorted(self.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'success_rate': round((self.calls - self.failures) / self.calls, 3) if self.calls else None,
+            'tokens': self.tokens,
+            'avg_latency': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p95_latency': round(p95, 2) if p95 is not None else None
+        }
+
+
+class AsyncEngine:
+    """Runs coroutines on a dedicated event loop thread.
+    
+    Synchronous callers submit work with run(), which blocks the calling
+    thread only, so several worker threads can share one loop. Coroutines
+    bound their provider traffic with `async with engine.limit('openai')`,
+    an adaptive limiter shared by every caller in the process.
+    """
+    
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None):
+        """Initialize engine and start its event loop thread.
+        
+        Args:
+            concurrency: Optional per-provider limits overriding PROVIDER_CONCURRENCY
+        """
+        self.concurrency = {**PROVIDER_CONCURRENCY, **(concurrency or {})}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._call_stats: Dict[Tuple[str, str], CallStats] = {}
+        
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever,
+            name="generate-labs-async",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """Run a coroutine on the engine loop and wait for its result.
+        
+        Args:
+            coro: Coroutine to run
+            
+        Returns:
+            The coroutine's result (exceptions are re-raised)
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncEngine.run() called from the engine loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def limit(self, provider: str) -> AdaptiveLimiter:
+        """Get the adaptive limiter bounding concurrent requests to a provider.
+        
+        Must be called from a coroutine running on the engine loop.
+        
+        Args:
+            provider: Provider name (e.g., 'openai', 'mcp')
+            
+        Returns:
+            Limiter to hold for the duration of each request
+        """
+        if provider not in self._limiters:
+            initial = self.concurrency.get(provider, 4)
+            self._limiters[provider] = AdaptiveLimiter(
+                initial,
+                max(initial, PROVIDER_CONCURRENCY_CEILING.get(provider, initial))
+            )
+        return self._limiters[provider]
+    
+    def rate_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get throughput statistics for every provider used so far.
+        
+        Returns:
+            {provider: AdaptiveLimiter.stats()}
+        """
+        return {provider: limiter.stats() for provider, limiter in self._limiters.items()}
+    
+    def call_stats(self, task: str, model: str) -> CallStats:
+        """Get the counters for calls of a task routed to a model.
+        
+        Args:
+            task: Task route (e.g., 'generate', 'fix_query')
+            model: Model name
+            
+        Returns:
+            CallStats shared by every caller in the process
+        """
+        key = (task, model)
+        if key not in self._call_stats:
+            self._call_stats[key] = CallStats()
+        return self._call_stats[key]
+    
+    def model_stats(self) -> List[Dict[str, Any]]:
+        """Get latency, token and success statistics per task and model.
+        
+        Returns:
+            List of CallStats.stats() dicts with task and model, sorted by task
+        """
+        return [
+            {'task': task, 'model': model, **stats.stats()}
+            for (task, model), stats in sorted(self._call_stats.items())
+        ]
+
+
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AsyncEngine:
+    """Get the process-wide async engine, starting it on first use.
+    
+    Returns:
+        Shared AsyncEngine instance
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncEngine()
+        return _engine
@@ -0,0 +1,284 @@
+"""Offline batch LLM generation for large regeneration runs."""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Any, List, Dict, Iterator, Callable, Tuple
+
+from cache_manager import CacheManager
+from llm_json import parse_json_response
+
+
+# Available batch backends (see get_batch_backend)
+BATCH_BACKENDS = ('openai', 'local')
+
+# Endpoint every batch request line targets
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# How long the provider may take to finish a batch
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+
+# Batch statuses after which no more results will arrive
+FINISHED_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchBackend:
+    """Submission interface for batch files.
+    
+    A batch file has one request per line in the OpenAI batch format
+    ({"custom_id", "method", "url", "body"}); results are yielded as
+    {"custom_id", "response": {"status_code", "body"}, "error"} lines.
+    """
+    
+    def submit(self, requests_path: Path) -> str:
+        """Submit a batch file and return its batch id."""
+        raise NotImplementedError
+    
+    def status(self, batch_id: str) -> str:
+        """Return the batch status ('in_progress', 'completed', 'failed', ...)."""
+        raise NotImplementedError
+    
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield the result lines of a completed batch."""
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Submits batch files to the provider's Batch API."""
+    
+    def __init__(self, client: Any):
+        """Initialize OpenAI backend.
+        
+        Args:
+            client: Synchronous OpenAI client (e.g. ExampleGenerator.client)
+        """
+        self.client = client
+    
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW
+        )
+        return batch.id
+    
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+    
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalBatchBackend(BatchBackend):
+    """File-based stand-in for a batch API, for tests and offline runs.
+    
+    Each batch is a directory holding input.jsonl. The batch is completed
+    once output.jsonl is written next to it, either by the responder
+    passed to the backend (called with each request body, returning the
+    response content) or by hand.
+    """
+    
+    def __init__(
+        self,
+        batch_dir: str = ".generate-labs-batches",
+        responder: Optional[Callable[[Dict[str, Any]], str]] = None
+    ):
+        """Initialize local backend.
+        
+        Args:
+            batch_dir: Directory holding one subdirectory per batch
+            responder: Optional function answering requests at submit time
+        """
+        self.batch_dir = Path(batch_dir)
+        self.responder = responder
+    
+    def _path(self, batch_id: str, name: str) -> Path:
+        return self.batch_dir / batch_id / name
+    
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        input_path = self._path(batch_id, 'input.jsonl')
+        input_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(requests_path, input_path)
+        
+        if self.responder:
+            with open(input_path, 'r', encoding='utf-8') as f_in, \
+                    open(self._path(batch_id, 'output.jsonl'), 'w', encoding='utf-8') as f_out:
+                for line in f_in:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    content = self.responder(request['body'])
+                    f_out.write(json.dumps({
+                        'custom_id': request['custom_id'],
+                        'response': {
+                            'status_code': 200,
+                            'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+                        },
+                        'error': None
+                    }) + '\n')
+        return batch_id
+    
+    def status(self, batch_id: str) -> str:
+        if not self._path(batch_id, 'input.jsonl').exists():
+            return 'failed'
+        if self._path(batch_id, 'output.jsonl').exists():
+            return 'completed'
+        return 'in_progress'
+    
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        with open(self._path(batch_id, 'output.jsonl'), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_batch_backend(name: str, client: Any = None) -> BatchBackend:
+    """Create a batch backend by name.
+    
+    Args:
+        name: 'openai' or 'local'
+        client: Synchronous OpenAI client (required for 'openai')
+        
+    Returns:
+        BatchBackend
+        
+    Raises:
+        ValueError: If the backend is unknown or misconfigured
+    """
+    if name == 'openai':
+        if client is None:
+            raise ValueError("The openai batch backend needs an OpenAI client")
+        return OpenAIBatchBackend(client)
+    if name == 'local':
+        return LocalBatchBackend()
+    raise ValueError(f"Unknown batch backend '{name}' (expected one of: {', '.join(BATCH_BACKENDS)})")
+
+
+def write_batch_file(requests: List[Dict[str, Any]], path: Path) -> Path:
+    """Write generation requests as a batch JSONL file.
+    
+    Args:
+        requests: Dicts with custom_id and body (chat completion arguments)
+        path: Output path
+        
+    Returns:
+        Path written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps({
+                'custom_id': request['custom_id'],
+                'method': 'POST',
+                'url': BATCH_ENDPOINT,
+                'body': request['body']
+            }) + '\n')
+    return path
+
+
+def parse_result_line(line: Dict[str, Any]) -> Tuple[str, Optional[Any], Optional[str]]:
+    """Extract the parsed JSON response from a batch result line.
+    
+    Args:
+        line: Result line from BatchBackend.results
+        
+    Returns:
+        Tuple of (custom_id, parsed response or None, error message or None)
+    """
+    custom_id = line.get('custom_id', '')
+    if line.get('error'):
+        error = line['error']
+        return custom_id, None, error.get('message', str(error)) if isinstance(error, dict) else str(error)
+    
+    response = line.get('response') or {}
+    if response.get('status_code', 200) >= 400:
+        return custom_id, None, f"HTTP {response.get('status_code')}: {json.dumps(response.get('body'))[:200]}"
+    try:
+        content = response['body']['choices'][0]['message']['content']
+        return custom_id, parse_json_response(content), None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return custom_id, None, f"Unusable response: {e}"
+
+
+def ingest_results(backend: BatchBackend, batch_id: str, cache_manager: CacheManager) -> Dict[str, Any]:
+    """Store the results of a completed batch in the 'batch' cache namespace.
+    
+    Args:
+        backend: Backend the batch was submitted to
+        batch_id: Batch id returned by submit
+        cache_manager: Cache to store results in (keyed by custom_id)
+        
+    Returns:
+        Dict with ingested count and errors ({custom_id: message})
+    """
+    ingested = 0
+    errors = {}
+    for line in backend.results(batch_id):
+        custom_id, lab_config, error = parse_result_line(line)
+        if error or not isinstance(lab_config, dict) or not lab_config.get('examples'):
+            errors[custom_id] = error or "Response has no examples"
+            continue
+        cache_manager.set_call('batch', custom_id, lab_config)
+        ingested += 1
+    return {'ingested': ingested, 'errors': errors}
+
+
+class BatchManifest:
+    """Tracks the submitted batch between the submit and ingest phases."""
+    
+    def __init__(self, manifest_file: str = ".generate-labs-batch.json"):
+        """Initialize batch manifest.
+        
+        Args:
+            manifest_file: Path to manifest file
+        """
+        self.manifest_file = Path(manifest_file)
+    
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load the manifest, or None if no batch has been submitted."""
+        if not self.manifest_file.exists():
+            return None
+        try:
+            return json.loads(self.manifest_file.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, IOError):
+            return None
+    
+    def save(self, backend: str, batch_id: str, urls: List[str], requests: Dict[str, str]) -> Dict[str, Any]:
+        """Record a submitted batch.
+        
+        Args:
+            backend: Backend name
+            batch_id: Batch id returned by submit
+            urls: Every URL of the run, including those already cached
+            requests: custom_id -> URL of each request in the batch
+            
+        Returns:
+            Manifest dict
+        """
+        manifest = {
+            'backend': backend,
+            'batch_id': batch_id,
+            'submitted_at': time.time(),
+            'urls': urls,
+            'requests': requests
+        }
+        self.manifest_file.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        return manifest
+    
+    def clear(self) -> None:
+        """Remove the manifest after the batch has been ingested."""
+        if self.manifest_file.exists():
+            self.manifest_file.unlink()
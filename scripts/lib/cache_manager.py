@@ -1,35 +1,438 @@
-"""Cache manager for markdown fetches and LLM responses."""
+"""Cache manager for markdown fetches, LLM responses and validation results."""
 
 import hashlib
 import json
 import os
+import io
+import re
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, Callable, List, Dict, Iterator, Tuple
+
+
+# Namespaces for individual LLM/MCP calls cached through get_call/set_call
+CALL_NAMESPACES = ('fix_query', 'fix_esql', 'esql_variant', 'esql_batch', 'mcp_esql', 'top_up', 'batch', 'describe')
+
+# Every namespace that can be invalidated independently with clear_namespace
+NAMESPACES = ('markdown', 'parsed', 'llm', 'validation') + CALL_NAMESPACES
+
+# Available storage backends (see CacheManager backend argument)
+BACKENDS = ('sqlite', 'files')
+
+# Eviction defaults (overridable with CACHE_MAX_MB / CACHE_TTL_DAYS)
+DEFAULT_MAX_MB = 512
+DEFAULT_TTL_DAYS = 30
+
+# Cache bundle format written by export_bundle (bump on incompatible changes)
+BUNDLE_FORMAT = "generate-labs-cache-bundle"
+BUNDLE_VERSION = 1
+
+# Key prefix for dataset fingerprints, which describe the local cluster and
+# are therefore never exported
+FINGERPRINT_KEY_PREFIX = "fingerprint:"
+
+# Keys a bundle may contain: SHA256 digests and dataset fingerprints. Keys are
+# file names in the files backend, so anything else could escape the cache dir.
+BUNDLE_KEY_PATTERN = re.compile(
+    rf'[0-9a-f]{{64}}|{re.escape(FINGERPRINT_KEY_PREFIX)}[a-z0-9][a-z0-9._+-]*'
+)
+
+
+class CacheBackend:
+    """Storage interface for cache entries.
+    
+    Backends store opaque byte payloads addressed by (namespace, key).
+    Serialization, statistics and key derivation live in CacheManager.
+    """
+    
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Get a payload, or None if missing or expired."""
+        raise NotImplementedError
+    
+    def set(self, namespace: str, key: str, value: bytes, created_at: Optional[float] = None) -> None:
+        """Store a payload atomically (created_at defaults to now)."""
+        raise NotImplementedError
+    
+    def created_at(self, namespace: str, key: str) -> Optional[float]:
+        """Return when an entry was written, or None if it does not exist."""
+        raise NotImplementedError
+    
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, bytes, float]]:
+        """Yield (key, payload, created_at) for every entry in a namespace."""
+        raise NotImplementedError
+    
+    def delete_namespace(self, namespace: str) -> int:
+        """Delete every entry in a namespace and return how many were removed."""
+        raise NotImplementedError
+    
+    def size_bytes(self) -> int:
+        """Return the number of bytes currently stored."""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Delete every entry."""
+        raise NotImplementedError
+
+
+class FileCacheBackend(CacheBackend):
+    """One file per entry under <cache_dir>/<namespace>/.
+    
+    Writes go to a temporary file that is renamed into place, so concurrent
+    workers never observe a partially written entry. There is no eviction.
+    """
+    
+    def __init__(self, cache_dir: Path):
+        """Initialize file backend.
+        
+        Args:
+            cache_dir: Root directory for cache files
+        """
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / key
+    
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        path = self._path(namespace, key)
+        if path.exists():
+            return path.read_bytes()
+        return None
+    
+    def set(self, namespace: str, key: str, value: bytes, created_at: Optional[float] = None) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            if created_at is not None:
+                os.utime(tmp_path, (created_at, created_at))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    def created_at(self, namespace: str, key: str) -> Optional[float]:
+        path = self._path(namespace, key)
+        if path.exists():
+            return path.stat().st_mtime
+        return None
+    
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, bytes, float]]:
+        namespace_dir = self.cache_dir / namespace
+        if not namespace_dir.exists():
+            return
+        for path in sorted(namespace_dir.iterdir()):
+            if path.is_file() and not path.name.startswith(".tmp-"):
+                yield path.name, path.read_bytes(), path.stat().st_mtime
+    
+    def delete_namespace(self, namespace: str) -> int:
+        namespace_dir = self.cache_dir / namespace
+        if not namespace_dir.exists():
+            return 0
+        files = [f for f in namespace_dir.iterdir() if f.is_file()]
+        for cache_file in files:
+            cache_file.unlink()
+        return len(files)
+    
+    def size_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.cache_dir.rglob('*') if f.is_file())
+    
+    def clear(self) -> None:
+        import shutil
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Single-file SQLite store with compression, deduplication and eviction.
+    
+    Payloads are zlib-compressed and stored once per distinct content in a
+    blobs table; entries reference blobs by SHA256, so identical values
+    under different keys share storage. Entries older than the TTL are
+    treated as misses, and when the store grows past max_bytes the least
+    recently used entries are evicted.
+    """
+    
+    # Run the size check every this many writes rather than on every write
+    EVICT_EVERY_WRITES = 64
+    
+    def __init__(self, db_path: Path, max_bytes: int, ttl_seconds: float):
+        """Initialize SQLite backend.
+        
+        Args:
+            db_path: Path to the database file
+            max_bytes: Maximum compressed bytes to keep before LRU eviction
+            ttl_seconds: Maximum entry age before it is evicted
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One shared connection guarded by a lock for --parallel worker threads;
+        # WAL plus busy timeout covers separate processes sharing the file.
+        self.conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " hash TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " blob_hash TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+        self.evict()
+    
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT b.data, e.created_at FROM entries e"
+                " JOIN blobs b ON b.hash = e.blob_hash"
+                " WHERE e.namespace = ? AND e.key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self.conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                return None
+            self.conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        return zlib.decompress(row[0])
+    
+    def set(self, namespace: str, key: str, value: bytes, created_at: Optional[float] = None) -> None:
+        blob_hash = hashlib.sha256(value).hexdigest()
+        compressed = zlib.compress(value, 6)
+        now = time.time()
+        created_at = created_at if created_at is not None else now
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                    (blob_hash, compressed, len(compressed))
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries"
+                    " (namespace, key, blob_hash, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, blob_hash, created_at, now)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._writes_since_evict += 1
+            evict_due = self._writes_since_evict >= self.EVICT_EVERY_WRITES
+        if evict_due:
+            self.evict()
+    
+    def created_at(self, namespace: str, key: str) -> Optional[float]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT created_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def iter_entries(self, namespace: str) -> Iterator[Tuple[str, bytes, float]]:
+        with self._lock:
+            keys = [row[0] for row in self.conn.execute(
+                "SELECT key FROM entries WHERE namespace = ? ORDER BY key",
+                (namespace,)
+            )]
+        for key in keys:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT b.data, e.created_at FROM entries e"
+                    " JOIN blobs b ON b.hash = e.blob_hash"
+                    " WHERE e.namespace = ? AND e.key = ?",
+                    (namespace, key)
+                ).fetchone()
+            if row is not None:
+                yield key, zlib.decompress(row[0]), row[1]
+    
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes.
+        
+        Returns:
+            Number of entries evicted
+        """
+        evicted = 0
+        with self._lock:
+            self._writes_since_evict = 0
+            evicted += self.conn.execute(
+                "DELETE FROM entries WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._delete_orphan_blobs()
+            
+            while self._stored_bytes() > self.max_bytes:
+                removed = self.conn.execute(
+                    "DELETE FROM entries WHERE rowid IN ("
+                    " SELECT rowid FROM entries ORDER BY accessed_at ASC LIMIT 32)"
+                ).rowcount
+                self._delete_orphan_blobs()
+                if removed == 0:
+                    break
+                evicted += removed
+        return evicted
+    
+    def _delete_orphan_blobs(self) -> None:
+        self.conn.execute(
+            "DELETE FROM blobs WHERE hash NOT IN (SELECT blob_hash FROM entries)"
+        )
+    
+    def _stored_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    
+    def delete_namespace(self, namespace: str) -> int:
+        with self._lock:
+            removed = self.conn.execute(
+                "DELETE FROM entries WHERE namespace = ?",
+                (namespace,)
+            ).rowcount
+            self._delete_orphan_blobs()
+        return removed
+    
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._stored_bytes()
+    
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM blobs")
+            self.conn.execute("VACUUM")
 
 
 class CacheManager:
-    """Manages caching of markdown content and LLM responses."""
+    """Manages caching of markdown content, LLM responses and validation results."""
     
-    def __init__(self, cache_dir: str = ".generate-labs-cache", use_cache: bool = True):
+    def __init__(
+        self,
+        cache_dir: str = ".generate-labs-cache",
+        use_cache: bool = True,
+        backend: str = "sqlite",
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
         """Initialize cache manager.
         
         Args:
             cache_dir: Directory to store cache files
             use_cache: Whether to use caching (False bypasses all cache operations)
+            backend: Storage backend, 'sqlite' (default) or 'files'
+            max_bytes: Size limit for LRU eviction (defaults to CACHE_MAX_MB env var)
+            ttl_seconds: Entry lifetime (defaults to CACHE_TTL_DAYS env var)
         """
         self.cache_dir = Path(cache_dir)
         self.use_cache = use_cache
-        self.markdown_dir = self.cache_dir / "markdown"
-        self.llm_dir = self.cache_dir / "llm"
+        self.backend_name = backend
+        self.backend: Optional[CacheBackend] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # Generated queries held back until they validate, by canonical query
+        self._pending_lock = threading.Lock()
+        self._pending_calls: Dict[str, List[Tuple[str, str, Any, Optional[Callable[[Any, Any], Any]]]]] = {}
+        
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown cache backend '{backend}' (expected one of: {', '.join(BACKENDS)})")
+        
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)) * 86400
         
         if self.use_cache:
-            self.markdown_dir.mkdir(parents=True, exist_ok=True)
-            self.llm_dir.mkdir(parents=True, exist_ok=True)
+            if backend == "sqlite":
+                self.backend = SQLiteCacheBackend(self.cache_dir / "cache.sqlite3", max_bytes, ttl_seconds)
+            else:
+                self.backend = FileCacheBackend(self.cache_dir / "files")
     
     def _hash(self, content: str) -> str:
         """Generate SHA256 hash of content."""
         return hashlib.sha256(content.encode('utf-8')).hexdigest()
     
+    def _record(self, namespace: str, outcome: str, nbytes: int = 0) -> None:
+        """Record a hit, miss or write for the run report."""
+        with self._stats_lock:
+            counters = self._stats.setdefault(namespace, {
+                'hits': 0, 'misses': 0, 'writes': 0, 'bytes_read': 0, 'bytes_written': 0
+            })
+            if outcome == 'hit':
+                counters['hits'] += 1
+                counters['bytes_read'] += nbytes
+            elif outcome == 'miss':
+                counters['misses'] += 1
+            else:
+                counters['writes'] += 1
+                counters['bytes_written'] += nbytes
+    
+    def _get_bytes(self, namespace: str, key: str) -> Optional[bytes]:
+        """Read a raw entry, recording the hit or miss."""
+        if not self.use_cache:
+            return None
+        value = self.backend.get(namespace, key)
+        if value is None:
+            self._record(namespace, 'miss')
+        else:
+            self._record(namespace, 'hit', len(value))
+        return value
+    
+    def _set_bytes(self, namespace: str, key: str, value: bytes) -> None:
+        """Write a raw entry, recording the bytes written."""
+        if not self.use_cache:
+            return
+        self.backend.set(namespace, key, value)
+        self._record(namespace, 'write', len(value))
+    
+    def _get_json(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._get_bytes(namespace, key)
+        if value is None:
+            return None
+        return json.loads(value.decode('utf-8'))
+    
+    def _set_json(self, namespace: str, key: str, value: Any) -> None:
+        self._set_bytes(
+            namespace,
+            key,
+            json.dumps(value, separators=(',', ':')).encode('utf-8')
+        )
+    
     def get_markdown(self, url: str) -> Optional[str]:
         """Get cached markdown content for a URL.
         
@@ -39,15 +442,8 @@ class CacheManager:
         Returns:
             Cached markdown content or None if not cached
         """
-        if not self.use_cache:
-            return None
-        
-        url_hash = self._hash(url)
-        cache_file = self.markdown_dir / f"{url_hash}.md"
-        
-        if cache_file.exists():
-            return cache_file.read_text(encoding='utf-8')
-        return None
+        value = self._get_bytes('markdown', self._hash(url))
+        return value.decode('utf-8') if value is not None else None
     
     def set_markdown(self, url: str, content: str) -> None:
         """Cache markdown content for a URL.
@@ -56,31 +452,31 @@ class CacheManager:
             url: The URL
             content: The markdown content to cache
         """
-        if not self.use_cache:
-            return
-        
-        url_hash = self._hash(url)
-        cache_file = self.markdown_dir / f"{url_hash}.md"
-        cache_file.write_text(content, encoding='utf-8')
+        self._set_bytes('markdown', self._hash(url), content.encode('utf-8'))
     
     def get_parsed_doc(self, url: str) -> Optional[dict]:
         """Get cached parsed document structure.
         
+        The raw markdown is stored once in the markdown namespace and
+        re-attached here, so a parsed doc is only returned while its
+        markdown is still cached.
+        
         Args:
             url: The URL
             
         Returns:
             Parsed document dict or None if not cached
         """
-        if not self.use_cache:
+        parsed = self._get_json('parsed', self._hash(url))
+        if parsed is None:
             return None
         
-        url_hash = self._hash(url)
-        cache_file = self.markdown_dir / f"{url_hash}.parsed.json"
-        
-        if cache_file.exists():
-            return json.loads(cache_file.read_text(encoding='utf-8'))
-        return None
+        if parsed.pop('_raw_markdown_in_markdown_cache', False):
+            markdown = self.get_markdown(url)
+            if markdown is None:
+                return None
+            parsed['raw_markdown'] = markdown
+        return parsed
     
     def set_parsed_doc(self, url: str, parsed: dict) -> None:
         """Cache parsed document structure.
@@ -92,9 +488,13 @@ class CacheManager:
         if not self.use_cache:
             return
         
-        url_hash = self._hash(url)
-        cache_file = self.markdown_dir / f"{url_hash}.parsed.json"
-        cache_file.write_text(json.dumps(parsed, indent=2), encoding='utf-8')
+        parsed = dict(parsed)
+        raw_markdown = parsed.pop('raw_markdown', None)
+        if raw_markdown is not None:
+            if self.get_markdown(url) != raw_markdown:
+                self.set_markdown(url, raw_markdown)
+            parsed['_raw_markdown_in_markdown_cache'] = True
+        self._set_json('parsed', self._hash(url), parsed)
     
     def get_llm_response(self, content_hash: str) -> Optional[dict]:
         """Get cached LLM response.
@@ -105,14 +505,7 @@ class CacheManager:
         Returns:
             Cached LLM response dict or None if not cached
         """
-        if not self.use_cache:
-            return None
-        
-        cache_file = self.llm_dir / f"{content_hash}.json"
-        
-        if cache_file.exists():
-            return json.loads(cache_file.read_text(encoding='utf-8'))
-        return None
+        return self._get_json('llm', content_hash)
     
     def set_llm_response(self, content_hash: str, response: dict) -> None:
         """Cache LLM response.
@@ -121,33 +514,418 @@ class CacheManager:
             content_hash: Hash of the content
             response: The LLM response to cache
         """
-        if not self.use_cache:
-            return
-        
-        cache_file = self.llm_dir / f"{content_hash}.json"
-        cache_file.write_text(json.dumps(response, indent=2), encoding='utf-8')
+        self._set_json('llm', content_hash, response)
     
-    def compute_content_hash(self, doc_content: str, dataset_schemas: dict) -> str:
-        """Compute hash for LLM content (doc + schemas).
+    def compute_content_hash(
+        self,
+        doc_content: str,
+        dataset_schemas: dict,
+        model: str = "",
+        prompt_version: str = "",
+        few_shot_hash: str = "",
+        generation_params: Optional[dict] = None
+    ) -> str:
+        """Compute hash for LLM content.
+        
+        Everything that changes the generated config is part of the key, so
+        switching models, editing the prompt or the few-shot example, or
+        changing sampling parameters never serves a stale config.
         
         Args:
             doc_content: Document content
             dataset_schemas: Dataset schema dict
+            model: Model name
+            prompt_version: Version of the generation prompt template
+            few_shot_hash: Hash of the few-shot example included in the prompt
+            generation_params: Sampling parameters (temperature, max_tokens, ...)
             
         Returns:
             Content hash string
         """
         combined = json.dumps({
             "doc": doc_content,
-            "schemas": dataset_schemas
+            "schemas": dataset_schemas,
+            "model": model,
+            "prompt_version": prompt_version,
+            "few_shot": few_shot_hash,
+            "params": generation_params or {}
         }, sort_keys=True)
         return self._hash(combined)
     
+    def hash_text(self, content: str) -> str:
+        """Hash arbitrary text (e.g., a few-shot example) for use in cache keys.
+        
+        Args:
+            content: Text to hash
+            
+        Returns:
+            SHA256 hex digest
+        """
+        return self._hash(content)
+    
+    def compute_call_key(
+        self,
+        inputs: dict,
+        model: str,
+        temperature: Optional[float],
+        prompt_version: str
+    ) -> str:
+        """Compute cache key for an individual LLM or MCP call.
+        
+        Args:
+            inputs: The prompt inputs that determine the response
+            model: Model (or MCP tool endpoint) that serves the call
+            temperature: Sampling temperature, if any
+            prompt_version: Version of the prompt template
+            
+        Returns:
+            Call cache key
+        """
+        combined = json.dumps({
+            "inputs": inputs,
+            "model": model,
+            "temperature": temperature,
+            "prompt_version": prompt_version
+        }, sort_keys=True)
+        return self._hash(combined)
+    
+    def get_call(self, namespace: str, call_key: str) -> Optional[Any]:
+        """Get a cached call result.
+        
+        Args:
+            namespace: Call type (e.g., 'fix_query', 'mcp_esql')
+            call_key: Key from compute_call_key
+            
+        Returns:
+            Cached result or None if not cached
+        """
+        return self._get_json(namespace, call_key)
+    
+    def set_call(self, namespace: str, call_key: str, value: Any) -> None:
+        """Cache a call result.
+        
+        Args:
+            namespace: Call type (e.g., 'fix_query', 'mcp_esql')
+            call_key: Key from compute_call_key
+            value: JSON-serializable result to cache
+        """
+        self._set_json(namespace, call_key, value)
+    
+    def defer_call(
+        self,
+        namespace: str,
+        call_key: str,
+        value: Any,
+        query: Any = None,
+        merge: Optional[Callable[[Any, Any], Any]] = None
+    ) -> None:
+        """Hold a generated query until it validates, then cache it.
+        
+        Fixes and variants that still fail must not be replayed on reruns,
+        so they are only cached once confirm_calls sees them validate.
+        
+        Args:
+            namespace: Call type (e.g., 'fix_query', 'mcp_esql')
+            call_key: Key from compute_call_key
+            value: Value to cache
+            query: Query whose validation confirms the value (default: value)
+            merge: Combines the cached value (or None) with value, for calls
+                whose parts are confirmed one at a time; default replaces it
+        """
+        if not self.use_cache:
+            return
+        query = value if query is None else query
+        with self._pending_lock:
+            self._pending_calls.setdefault(self.canonicalize_query(query), []).append(
+                (namespace, call_key, value, merge)
+            )
+    
+    def confirm_calls(self, query: Any) -> int:
+        """Cache the deferred calls that produced a validated query.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string that validated
+            
+        Returns:
+            Number of calls cached
+        """
+        with self._pending_lock:
+            pending = self._pending_calls.pop(self.canonicalize_query(query), [])
+            for namespace, call_key, value, merge in pending:
+                if merge:
+                    value = merge(self._get_json(namespace, call_key), value)
+                self.set_call(namespace, call_key, value)
+        return len(pending)
+    
+    def discard_deferred_calls(self) -> None:
+        """Drop deferred calls that never validated (e.g. between daemon jobs)."""
+        with self._pending_lock:
+            self._pending_calls.clear()
+    
+    def canonicalize_query(self, query: Any) -> str:
+        """Canonicalize a query so equivalent queries share a cache key.
+        
+        Query DSL dicts are serialized with sorted keys and no whitespace;
+        ES|QL strings have their whitespace collapsed.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            
+        Returns:
+            Canonical query string
+        """
+        if isinstance(query, str):
+            return ' '.join(query.split())
+        return json.dumps(query, sort_keys=True, separators=(',', ':'))
+    
+    def compute_validation_key(
+        self,
+        query: Any,
+        index: str,
+        dataset_fingerprint: str,
+        query_language: str = 'query_dsl'
+    ) -> str:
+        """Compute cache key for a validation result.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            dataset_fingerprint: Fingerprint of the index contents
+            query_language: 'query_dsl' or 'esql'
+            
+        Returns:
+            Validation cache key
+        """
+        combined = json.dumps({
+            "language": query_language,
+            "query": self.canonicalize_query(query),
+            "index": index,
+            "dataset": dataset_fingerprint
+        }, sort_keys=True)
+        return self._hash(combined)
+    
+    def get_validation(self, validation_key: str) -> Optional[dict]:
+        """Get cached validation result.
+        
+        Args:
+            validation_key: Key from compute_validation_key
+            
+        Returns:
+            Dict with 'hit_count' and 'fixed_query', or None if not cached
+        """
+        return self._get_json('validation', validation_key)
+    
+    def set_validation(self, validation_key: str, result: dict) -> None:
+        """Cache a validation result.
+        
+        Args:
+            validation_key: Key from compute_validation_key
+            result: Dict with 'hit_count' and 'fixed_query'
+        """
+        self._set_json('validation', validation_key, result)
+    
+    def get_dataset_fingerprint(self, index: str, max_age_seconds: float) -> Optional[str]:
+        """Get a recently computed dataset fingerprint for an index.
+        
+        Args:
+            index: Index name
+            max_age_seconds: Maximum age before the fingerprint is considered stale
+            
+        Returns:
+            Fingerprint string or None if missing or stale
+        """
+        entry = self._get_json('validation', f"{FINGERPRINT_KEY_PREFIX}{index}")
+        if not entry or time.time() - entry.get('computed_at', 0) > max_age_seconds:
+            return None
+        return entry.get('fingerprint')
+    
+    def set_dataset_fingerprint(self, index: str, fingerprint: str) -> None:
+        """Cache the dataset fingerprint for an index.
+        
+        Args:
+            index: Index name
+            fingerprint: Fingerprint string
+        """
+        self._set_json('validation', f"{FINGERPRINT_KEY_PREFIX}{index}", {
+            'fingerprint': fingerprint,
+            'computed_at': time.time()
+        })
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics for the run report.
+        
+        Returns:
+            Dict with backend name, stored bytes, overall totals and
+            per-namespace hit/miss/byte counters
+        """
+        with self._stats_lock:
+            namespaces = {name: dict(counters) for name, counters in self._stats.items()}
+        
+        totals = {'hits': 0, 'misses': 0, 'writes': 0, 'bytes_read': 0, 'bytes_written': 0}
+        for counters in namespaces.values():
+            for name in totals:
+                totals[name] += counters[name]
+        
+        return {
+            'enabled': self.use_cache,
+            'backend': self.backend_name,
+            'stored_bytes': self.backend.size_bytes() if self.backend else 0,
+            **totals,
+            'namespaces': namespaces
+        }
+    
+    def export_bundle(self, bundle_path: str, namespaces: Optional[List[str]] = None) -> Dict[str, int]:
+        """Pack cache entries into a portable, compressed bundle.
+        
+        The bundle is a gzip-compressed tar archive holding a versioned
+        manifest and one member per entry. The manifest records each
+        entry's namespace, key, write time and SHA256 so import_bundle can
+        verify integrity. Dataset fingerprints are machine-specific and are
+        left out.
+        
+        Args:
+            bundle_path: Output archive path
+            namespaces: Namespaces to export (defaults to all)
+            
+        Returns:
+            Dict mapping namespace to number of entries exported
+        """
+        if not self.use_cache:
+            raise ValueError("Cannot export a bundle with caching disabled")
+        
+        namespaces = list(namespaces or NAMESPACES)
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'created_at': time.time(),
+            'entries': []
+        }
+        counts = {namespace: 0 for namespace in namespaces}
+        
+        Path(bundle_path).parent.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(bundle_path, 'w:gz') as tar:
+            for namespace in namespaces:
+                for key, value, created_at in self.backend.iter_entries(namespace):
+                    if key.startswith(FINGERPRINT_KEY_PREFIX):
+                        continue
+                    member_name = f"entries/{namespace}/{key}"
+                    info = tarfile.TarInfo(member_name)
+                    info.size = len(value)
+                    info.mtime = int(created_at)
+                    tar.addfile(info, io.BytesIO(value))
+                    manifest['entries'].append({
+                        'namespace': namespace,
+                        'key': key,
+                        'created_at': created_at,
+                        'sha256': hashlib.sha256(value).hexdigest(),
+                        'member': member_name
+                    })
+                    counts[namespace] += 1
+            
+            manifest_bytes = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+            info = tarfile.TarInfo("manifest.json")
+            info.size = len(manifest_bytes)
+            info.mtime = int(manifest['created_at'])
+            tar.addfile(info, io.BytesIO(manifest_bytes))
+        
+        return counts
+    
+    def import_bundle(self, bundle_path: str) -> Dict[str, int]:
+        """Merge a bundle written by export_bundle into this cache.
+        
+        Every entry's namespace, key and manifest checksum are checked
+        before anything is written, so a corrupt or crafted bundle changes
+        nothing. Entries that exist locally with the same or a newer write
+        time are kept.
+        
+        Args:
+            bundle_path: Archive path
+            
+        Returns:
+            Dict with 'imported' and 'skipped' counts
+        """
+        if not self.use_cache:
+            raise ValueError("Cannot import a bundle with caching disabled")
+        
+        with tarfile.open(bundle_path, 'r:gz') as tar:
+            try:
+                manifest = json.loads(tar.extractfile("manifest.json").read().decode('utf-8'))
+            except (KeyError, AttributeError, ValueError) as e:
+                raise ValueError(f"Not a cache bundle (missing or invalid manifest): {e}")
+            if not isinstance(manifest, dict):
+                raise ValueError("Not a cache bundle: manifest is not an object")
+            
+            if manifest.get('format') != BUNDLE_FORMAT:
+                raise ValueError(f"Not a cache bundle: format is {manifest.get('format')!r}")
+            if manifest.get('version', 0) > BUNDLE_VERSION:
+                raise ValueError(
+                    f"Bundle version {manifest.get('version')} is newer than supported version {BUNDLE_VERSION}"
+                )
+            
+            if not isinstance(manifest.get('entries'), list):
+                raise ValueError("Invalid cache bundle: manifest has no entry list")
+            
+            # Verify every entry before writing any of them
+            for entry in manifest['entries']:
+                try:
+                    namespace, key, member_name = entry['namespace'], entry['key'], entry['member']
+                    checksum, created_at = entry['sha256'], entry['created_at']
+                except (KeyError, TypeError) as e:
+                    raise ValueError(f"Bundle contains a malformed manifest entry: {entry!r}") from e
+                if namespace not in NAMESPACES:
+                    raise ValueError(f"Bundle contains unknown namespace '{namespace}'")
+                if not isinstance(key, str) or not BUNDLE_KEY_PATTERN.fullmatch(key):
+                    raise ValueError(f"Bundle contains invalid key {key!r}")
+                if not isinstance(created_at, (int, float)):
+                    raise ValueError(f"Bundle entry has an invalid write time: {member_name}")
+                try:
+                    member = tar.extractfile(member_name)
+                except KeyError as e:
+                    raise ValueError(f"Bundle entry is missing from the archive: {member_name}") from e
+                if member is None or hashlib.sha256(member.read()).hexdigest() != checksum:
+                    raise ValueError(f"Bundle entry failed integrity check: {member_name}")
+            
+            result = {'imported': 0, 'skipped': 0}
+            for entry in manifest['entries']:
+                local_created_at = self.backend.created_at(entry['namespace'], entry['key'])
+                if local_created_at is not None and local_created_at >= entry['created_at']:
+                    result['skipped'] += 1
+                    continue
+                value = tar.extractfile(entry['member']).read()
+                self.backend.set(entry['namespace'], entry['key'], value, created_at=entry['created_at'])
+                result['imported'] += 1
+        
+        return result
+    
+    def clear_namespace(self, namespace: str) -> int:
+        """Invalidate a single cache namespace, leaving the others intact.
+        
+        Args:
+            namespace: One of NAMESPACES
+            
+        Returns:
+            Number of cache entries removed
+        """
+        if namespace not in NAMESPACES:
+            raise ValueError(
+                f"Unknown cache namespace '{namespace}' (expected one of: {', '.join(NAMESPACES)})"
+            )
+        if not self.use_cache:
+            return 0
+        return self.backend.delete_namespace(namespace)
+    
+    def clear_namespaces(self, namespaces: List[str]) -> dict:
+        """Invalidate several cache namespaces.
+        
+        Args:
+            namespaces: Namespace names (see NAMESPACES)
+            
+        Returns:
+            Dict mapping namespace to number of entries removed
+        """
+        return {namespace: self.clear_namespace(namespace) for namespace in namespaces}
+    
     def clear(self) -> None:
         """Clear all cached content."""
-        if self.cache_dir.exists():
-            import shutil
-            shutil.rmtree(self.cache_dir)
-            self.markdown_dir.mkdir(parents=True, exist_ok=True)
-            self.llm_dir.mkdir(parents=True, exist_ok=True)
-
+        if self.backend:
+            self.backend.clear()
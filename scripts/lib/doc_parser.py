@@ -1,8 +1,9 @@
 """Documentation parser for Elastic docs."""
 
+import hashlib
 import re
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 from urllib.parse import urlparse
 import requests
 
@@ -87,6 +88,77 @@ def fetch_markdown(url: str) -> str:
     return response.text
 
 
+# Version of the parsed doc structure; cached parsed docs of another
+# version are parsed again
+PARSER_VERSION = 4
+
+# Patterns run over the whole markdown (see the extract_* functions)
+TITLE_PATTERN = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+TITLE_LINE_PATTERN = re.compile(r'^# ', re.MULTILINE)
+CODE_BLOCK_PATTERN = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+FENCED_CODE_PATTERN = re.compile(r'```.*?```', re.DOTALL)
+
+# Line patterns of parameter definitions (see extract_parameter_definitions)
+TERM_PATTERN = re.compile(r'^\s*\*{0,2}`([\w.<>\-]+)`\*{0,2}\s*$')
+BULLET_PATTERN = re.compile(r'^\s*[-*]\s+\*{0,2}`([\w.<>\-]+)`\*{0,2}\s*(\([^)]*\))?\s*[:\-\u2013]?\s*(.*)$')
+TABLE_PATTERN = re.compile(r'^\s*\|\s*`([\w.<>\-]+)`\s*\|(.+)\|\s*$')
+
+# Parameter mentions checked for missing examples: "### boost parameter",
+# "#### boost" headings and "`boost` (Optional, float)" signatures
+PARAMETER_MENTION_PATTERNS = [
+    re.compile(r'###\s+(\w+)\s+parameter', re.IGNORECASE),
+    re.compile(r'####\s+(\w+)', re.IGNORECASE),
+    re.compile(r'`(\w+)`\s+\(.*?\)', re.IGNORECASE),
+]
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Query type of a code block: first clause of "query", or an ES|QL source command
+CODE_QUERY_TYPE_PATTERN = re.compile(r'"query"\s*:\s*\{\s*"(\w+)"')
+CODE_ESQL_PATTERN = re.compile(r'(?:^|"query"\s*:\s*"+)\s*(?:FROM|ROW|SHOW)\s', re.MULTILINE)
+
+
+def detect_code_query_type(language: str, code: str) -> Optional[str]:
+    """Detect the query type a code block demonstrates.
+    
+    Args:
+        language: Fence language (e.g. 'console', 'json', 'esql')
+        code: Code block content
+        
+    Returns:
+        Query type (e.g. 'match', 'bool', 'esql') or None
+    """
+    if language.lower() == 'esql':
+        return 'esql'
+    # Substring checks first; most blocks need no regex search
+    if ('FROM' in code or 'ROW' in code or 'SHOW' in code) and CODE_ESQL_PATTERN.search(code):
+        return 'esql'
+    match = CODE_QUERY_TYPE_PATTERN.search(code) if '"query"' in code else None
+    return match.group(1) if match else None
+
+
+def doc_fingerprint(parsed_doc: Dict[str, Any]) -> str:
+    """Hash the parts of a parsed doc that generation prompts use.
+    
+    Changes to other prose of the page (navigation, notes, unrelated
+    sections) leave the fingerprint, and so cached generations, unchanged.
+    
+    Args:
+        parsed_doc: Parsed documentation structure
+        
+    Returns:
+        SHA256 hex digest
+    """
+    content = json.dumps({
+        'title': parsed_doc.get('title', ''),
+        'description': parsed_doc.get('description', ''),
+        'query_type': parsed_doc.get('query_type', ''),
+        'doc_url': parsed_doc.get('doc_url', ''),
+        'parameters': parsed_doc.get('parameters', []),
+        'code_examples': parsed_doc.get('code_examples', [])
+    }, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
 def extract_title(markdown: str) -> str:
     """Extract title from markdown (first H1).
     
@@ -96,7 +168,7 @@ def extract_title(markdown: str) -> str:
     Returns:
         Title or empty string
     """
-    match = re.search(r'^#\s+(.+)$', markdown, re.MULTILINE)
+    match = TITLE_PATTERN.search(markdown)
     if match:
         return match.group(1).strip()
     return ""
@@ -111,18 +183,22 @@ def extract_description(markdown: str) -> str:
     Returns:
         Description text
     """
-    # Remove title
-    lines = markdown.split('\n')
-    start_idx = 0
-    for i, line in enumerate(lines):
-        if line.startswith('# '):
-            start_idx = i + 1
-            break
+    # Start after the title
+    start = 0
+    title = TITLE_LINE_PATTERN.search(markdown)
+    if title:
+        start = markdown.find('\n', title.start()) + 1
+        if not start:
+            return ""
     
-    # Find first paragraph
+    # Find first paragraph; only the lines up to it are read, not the whole page
     description_parts = []
-    for line in lines[start_idx:]:
-        line = line.strip()
+    while start < len(markdown):
+        end = markdown.find('\n', start)
+        if end == -1:
+            end = len(markdown)
+        line = markdown[start:end].strip()
+        start = end + 1
         if not line:
             if description_parts:
                 break
@@ -137,6 +213,9 @@ def extract_description(markdown: str) -> str:
 def extract_code_examples(markdown: str) -> List[Dict[str, str]]:
     """Extract code examples from markdown.
     
+    JSON blocks mentioning a query are kept, as well as any other block
+    (e.g. console requests or ES|QL) with a detected query type.
+    
     Args:
         markdown: Markdown content
         
@@ -145,16 +224,13 @@ def extract_code_examples(markdown: str) -> List[Dict[str, str]]:
     """
     examples = []
     
-    # Match fenced code blocks
-    pattern = r'```(\w+)?\n(.*?)```'
-    matches = re.finditer(pattern, markdown, re.DOTALL | re.MULTILINE)
-    
-    for match in matches:
+    for match in CODE_BLOCK_PATTERN.finditer(markdown):
         language = match.group(1) or ''
         code = match.group(2).strip()
         
-        # Filter for JSON examples (likely Elasticsearch queries)
-        if language.lower() in ['json', ''] and ('query' in code.lower() or '{' in code):
+        # Filter for JSON examples (likely Elasticsearch queries); the query
+        # type is only detected for the other blocks
+        if (language.lower() in ['json', ''] and ('query' in code.lower() or '{' in code)) or detect_code_query_type(language, code):
             examples.append({
                 'code': code,
                 'language': language or 'json'
@@ -163,45 +239,119 @@ def extract_code_examples(markdown: str) -> List[Dict[str, str]]:
     return examples
 
 
-def identify_missing_examples(markdown: str, existing_examples: List[Dict[str, str]]) -> List[str]:
-    """Identify documented parameters without examples.
+def extract_parameter_definitions(markdown: str) -> List[Dict[str, str]]:
+    """Extract documented parameters and their descriptions.
     
-    This is a simplified version - in practice, we'd parse the doc more carefully
-    to identify parameter sections and check if examples exist.
+    Recognizes definition lists (`name` followed by a ": description" line),
+    bullet items (- `name` (Optional, string) description) and table rows
+    (| `name` | description |). Code blocks are skipped.
     
     Args:
         markdown: Markdown content
-        existing_examples: List of existing code examples
         
     Returns:
-        List of parameter names that might need examples
+        List of parameter dicts with 'name' and 'description' keys, in
+        document order
     """
-    # Look for parameter sections (e.g., "### Parameters", "#### Options")
-    # This is a heuristic - the LLM will do better analysis
-    missing = []
+    parameters = []
+    seen = set()
+    
+    def add(name: str, description: str):
+        description = ' '.join(description.split())
+        if name and description and name not in seen:
+            seen.add(name)
+            parameters.append({'name': name, 'description': description})
+    
+    # Drop fenced code so example JSON keys aren't mistaken for parameters
+    lines = FENCED_CODE_PATTERN.sub('', markdown).split('\n')
     
-    # Common parameter patterns
-    param_patterns = [
-        r'###\s+(\w+)\s+parameter',
-        r'####\s+(\w+)',
-        r'`(\w+)`\s+\(.*?\)',
-    ]
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        # Every definition pattern needs a backticked name
+        if '`' not in line:
+            i += 1
+            continue
+        
+        term = TERM_PATTERN.match(line)
+        if term:
+            # Definition list: the description starts with ":" on a following line
+            j = i + 1
+            while j < len(lines) and not lines[j].strip():
+                j += 1
+            if j < len(lines) and lines[j].lstrip().startswith(':'):
+                description = [lines[j].lstrip()[1:]]
+                j += 1
+                # Indented continuation lines, including further paragraphs
+                while j < len(lines):
+                    if lines[j].strip() and lines[j].startswith((' ', '\t')):
+                        description.append(lines[j])
+                    elif lines[j].strip() or not lines[j + 1:j + 2] or not lines[j + 1].startswith((' ', '\t')):
+                        break
+                    j += 1
+                add(term.group(1), ' '.join(description))
+                i = j
+                continue
+        
+        bullet = BULLET_PATTERN.match(line)
+        if bullet:
+            add(bullet.group(1), ' '.join(part for part in (bullet.group(2), bullet.group(3)) if part))
+        
+        row = TABLE_PATTERN.match(line)
+        if row:
+            add(row.group(1), ' '.join(cell.strip() for cell in row.group(2).split('|')))
+        
+        i += 1
     
-    found_params = set()
-    for pattern in param_patterns:
-        matches = re.finditer(pattern, markdown, re.IGNORECASE)
-        for match in matches:
-            param = match.group(1).lower()
-            found_params.add(param)
+    return parameters
+
+
+def extract_parameter_mentions(markdown: str) -> List[str]:
+    """Extract parameter names mentioned in headings or signatures.
     
-    # Check if we have examples for these params
-    example_text = ' '.join([ex['code'] for ex in existing_examples])
+    Args:
+        markdown: Markdown content
+        
+    Returns:
+        Lowercased parameter names, in document order
+    """
+    mentions = sorted(
+        (match.start(), match.group(1).lower())
+        for pattern in PARAMETER_MENTION_PATTERNS
+        for match in pattern.finditer(markdown)
+    )
+    return list(dict.fromkeys(name for _, name in mentions))
+
+
+def example_token_index(examples: List[Dict[str, str]]) -> Set[str]:
+    """Index the lowercased word tokens of code examples.
     
-    for param in found_params:
-        if param not in example_text.lower():
-            missing.append(param)
+    Args:
+        examples: Code example dicts with a 'code' key
+        
+    Returns:
+        Set of tokens (e.g. 'boost', 'minimum_should_match')
+    """
+    # One lowercase pass over all examples, not one per parameter
+    return set(TOKEN_PATTERN.findall('\n'.join(example['code'] for example in examples).lower()))
+
+
+def identify_missing_examples(markdown: str, existing_examples: List[Dict[str, str]]) -> List[str]:
+    """Identify documented parameters without examples.
     
-    return missing
+    A parameter counts as covered when its name appears as a whole token in
+    an example, so `boost_mode` does not cover `boost`. This is a heuristic
+    - the LLM will do better analysis.
+    
+    Args:
+        markdown: Markdown content
+        existing_examples: List of existing code examples
+        
+    Returns:
+        List of parameter names that might need examples, in document order
+    """
+    tokens = example_token_index(existing_examples)
+    return [param for param in extract_parameter_mentions(markdown) if param not in tokens]
 
 
 def parse_documentation(url: str, markdown: Optional[str] = None) -> Dict:
@@ -221,7 +371,10 @@ def parse_documentation(url: str, markdown: Optional[str] = None) -> Dict:
         - description: Page description
         - doc_url: Original URL (without .md)
         - code_examples: List of code examples
+        - parameters: List of documented parameters with descriptions
         - missing_examples: List of parameters needing examples
+        - parser_version: PARSER_VERSION
+        - fingerprint: Hash of the prompt-relevant content (see doc_fingerprint)
     """
     if markdown is None:
         markdown = fetch_markdown(url)
@@ -232,9 +385,10 @@ def parse_documentation(url: str, markdown: Optional[str] = None) -> Dict:
     title = extract_title(markdown)
     description = extract_description(markdown)
     code_examples = extract_code_examples(markdown)
+    parameters = extract_parameter_definitions(markdown)
     missing_examples = identify_missing_examples(markdown, code_examples)
     
-    return {
+    parsed = {
         'url': url,
         'normalized_url': normalized_url,
         'slug': slug,
@@ -243,7 +397,11 @@ def parse_documentation(url: str, markdown: Optional[str] = None) -> Dict:
         'description': description,
         'doc_url': url.replace('.md', ''),  # Original URL without .md
         'code_examples': code_examples,
+        'parameters': parameters,
         'missing_examples': missing_examples,
+        'parser_version': PARSER_VERSION,
         'raw_markdown': markdown
     }
+    parsed['fingerprint'] = doc_fingerprint(parsed)
+    return parsed
 
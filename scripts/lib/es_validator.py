@@ -1,20 +1,44 @@
 """Elasticsearch validator with auto-fix capabilities."""
 
+import hashlib
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional, List
 from dotenv import load_dotenv
 from elasticsearch import Elasticsearch
 from example_generator import ExampleGenerator
 from cache_manager import CacheManager
 from mcp_client import MCPClient, get_mcp_client
+from value_profile import ValueProfile
 
 
 # Load .env from project root (parent of scripts directory)
 project_root = Path(__file__).parent.parent.parent
 load_dotenv(project_root / ".env")
 
+# How long a dataset fingerprint is trusted before the index is re-inspected.
+# Snapshot indices rarely change, so reruns inside this window make no ES calls
+# for examples whose validation result is already cached.
+FINGERPRINT_MAX_AGE_SECONDS = float(os.getenv("VALIDATION_FINGERPRINT_TTL", "3600"))
+
+# Examples validated (and auto-fixed) at the same time. LLM/MCP fix calls made
+# from these threads are still bounded by the shared per-provider semaphores.
+VALIDATION_CONCURRENCY = int(os.getenv("VALIDATION_CONCURRENCY", "4"))
+
+# Query DSL candidates requested in one call and tested together with _msearch
+# the first time a query needs fixing (set to 1 to only use serial fixes)
+SPECULATIVE_FIX_CANDIDATES = int(os.getenv("SPECULATIVE_FIX_CANDIDATES", "3"))
+
+# Hits a candidate needs to be preferred over ones that merely return something
+MIN_REQUIRED_HITS = 3
+
+# Validate every example once without fixing, then repair all failures of a
+# lab in a single LLM call before falling back to per-example fix loops
+BATCH_REPAIR = os.getenv("BATCH_REPAIR", "true").lower() not in ("0", "false", "no")
+
 
 class ESValidator:
     """Validates queries against Elasticsearch with auto-fix."""
@@ -23,7 +47,9 @@ class ESValidator:
         self,
         example_generator: Optional[ExampleGenerator] = None,
         dataset_schemas: Optional[Dict[str, Any]] = None,
-        mcp_client: Optional[MCPClient] = None
+        mcp_client: Optional[MCPClient] = None,
+        cache_manager: Optional[CacheManager] = None,
+        value_profile: Optional[ValueProfile] = None
     ):
         """Initialize ES validator.
         
@@ -31,10 +57,16 @@ class ESValidator:
             example_generator: Optional generator for fixing queries
             dataset_schemas: Dataset schema information
             mcp_client: Optional MCP client for ES|QL validation
+            cache_manager: Optional cache manager for validation results
+            value_profile: Optional value profile for predicting hit counts
+                (default: the generator's profile, or the saved profile)
         """
         self.example_generator = example_generator
         self.dataset_schemas = dataset_schemas or {}
         self.mcp_client = mcp_client
+        self.cache_manager = cache_manager
+        self.value_profile = value_profile or getattr(example_generator, 'value_profile', None) or ValueProfile.load()
+        self._fingerprints: Dict[str, Optional[str]] = {}
         
         es_url = os.getenv("ELASTICSEARCH_URL")
         es_api_key = os.getenv("ELASTICSEARCH_APIKEY")
@@ -50,6 +82,185 @@ class ESValidator:
         
         self.es = Elasticsearch(**es_config)
     
+    def get_dataset_fingerprint(self, index: str) -> Optional[str]:
+        """Get a fingerprint of an index's contents.
+        
+        The fingerprint combines the index UUID(s), document count and a hash
+        of the mappings, so restoring or reindexing the data invalidates every
+        cached validation result for that index.
+        
+        Args:
+            index: Index name
+            
+        Returns:
+            Fingerprint string, or None if the index could not be inspected
+        """
+        if index in self._fingerprints:
+            return self._fingerprints[index]
+        
+        fingerprint = None
+        if self.cache_manager:
+            fingerprint = self.cache_manager.get_dataset_fingerprint(
+                index,
+                FINGERPRINT_MAX_AGE_SECONDS
+            )
+        
+        if fingerprint is None:
+            try:
+                indices = self.es.indices.get(index=index)
+                doc_count = self.es.count(index=index)["count"]
+                parts = {
+                    name: {
+                        'uuid': info.get('settings', {}).get('index', {}).get('uuid', ''),
+                        'mappings': hashlib.sha256(
+                            json.dumps(info.get('mappings', {}), sort_keys=True).encode('utf-8')
+                        ).hexdigest()
+                    }
+                    for name, info in dict(indices).items()
+                }
+                fingerprint = hashlib.sha256(
+                    json.dumps({'indices': parts, 'count': doc_count}, sort_keys=True).encode('utf-8')
+                ).hexdigest()
+                if self.cache_manager:
+                    self.cache_manager.set_dataset_fingerprint(index, fingerprint)
+            except Exception as e:
+                print(f"[Validation] Could not fingerprint {index}, validation cache disabled: {e}")
+        
+        self._fingerprints[index] = fingerprint
+        return fingerprint
+    
+    def clear_dataset_fingerprints(self) -> None:
+        """Forget the dataset fingerprints so they are looked up again (e.g. per daemon job)."""
+        self._fingerprints.clear()
+    
+    def predict_hits(self, query: Any, index: str) -> Optional[int]:
+        """Predict a query's hit count from the value profile without searching.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            
+        Returns:
+            Estimated hit count, or None without a current profile or estimate
+        """
+        if not self.value_profile or not self.value_profile.is_current(index, self.get_dataset_fingerprint(index)):
+            return None
+        return self.value_profile.estimate_hits(query, index)
+    
+    def _predicted_empty(self, query: Any, index: str) -> Optional[str]:
+        """Explain why a query is certain to return nothing, per the value profile.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            
+        Returns:
+            Reason, or None if the query may return hits (or there is no current profile)
+        """
+        if not self.value_profile or not self.value_profile.is_current(index, self.get_dataset_fingerprint(index)):
+            return None
+        return self.value_profile.explain_zero_hits(query, index)
+    
+    def _confirm_generated(self, query: Any) -> None:
+        """Cache the fix or variant call that produced a validated query.
+        
+        Args:
+            query: Query that returned results
+        """
+        if self.cache_manager and query is not None:
+            self.cache_manager.confirm_calls(query)
+    
+    def _validation_cache_key(
+        self,
+        query: Any,
+        index: str,
+        query_language: str
+    ) -> Optional[str]:
+        """Compute the validation cache key for a query.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            query_language: 'query_dsl' or 'esql'
+            
+        Returns:
+            Cache key, or None if caching is unavailable
+        """
+        if not self.cache_manager or not self.cache_manager.use_cache:
+            return None
+        
+        fingerprint = self.get_dataset_fingerprint(index)
+        if fingerprint is None:
+            return None
+        
+        return self.cache_manager.compute_validation_key(
+            query,
+            index,
+            fingerprint,
+            query_language
+        )
+    
+    def _speculative_fix(
+        self,
+        query: Dict[str, Any],
+        error_message: str,
+        index: str
+    ) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Request several fix candidates at once and test them in one _msearch.
+        
+        Args:
+            query: Query that failed
+            error_message: Why it failed
+            index: Target index name
+            
+        Returns:
+            Tuple of (best passing candidate, hit_count), or None if none passed
+        """
+        try:
+            candidates = self.example_generator.fix_query_candidates(
+                query,
+                error_message,
+                self.dataset_schemas,
+                index,
+                SPECULATIVE_FIX_CANDIDATES
+            )
+        except Exception as e:
+            print(f"[Validation] Speculative fix failed for {index}: {e}")
+            return None
+        
+        # Don't spend a search on candidates the value profile rules out
+        candidates = [c for c in candidates if not self._predicted_empty(c, index)]
+        if not candidates:
+            return None
+        
+        searches = []
+        for candidate in candidates:
+            searches.append({"index": index})
+            searches.append({
+                "query": candidate.get("query", candidate),
+                "size": 0,
+                "track_total_hits": True
+            })
+        
+        try:
+            responses = self.es.msearch(searches=searches)["responses"]
+        except Exception as e:
+            print(f"[Validation] _msearch of fix candidates failed for {index}: {e}")
+            return None
+        
+        passing = [
+            (candidate, response["hits"]["total"]["value"])
+            for candidate, response in zip(candidates, responses)
+            if "error" not in response and response["hits"]["total"]["value"] > 0
+        ]
+        print(f"[Validation] {len(passing)}/{len(candidates)} fix candidates returned hits on {index}")
+        if not passing:
+            return None
+        
+        # Keep the most faithful candidate with enough hits, else the one with most hits
+        preferred = [p for p in passing if p[1] >= MIN_REQUIRED_HITS]
+        return preferred[0] if preferred else max(passing, key=lambda p: p[1])
+    
     def validate_query(
         self,
         query: Dict[str, Any],
@@ -66,26 +277,66 @@ class ESValidator:
         Returns:
             Tuple of (success, hit_count, error_message, fixed_query)
         """
+        cache_key = self._validation_cache_key(query, index, 'query_dsl')
+        if cache_key:
+            cached = self.cache_manager.get_validation(cache_key)
+            if cached:
+                self._confirm_generated(cached.get('fixed_query') or query)
+                return True, cached['hit_count'], None, cached.get('fixed_query')
+        
         current_query = query
         last_error = None
+        speculated = not (self.example_generator and SPECULATIVE_FIX_CANDIDATES > 1)
         
         for attempt in range(max_retries + 1):
             try:
-                # Build search request
-                search_body = {
-                    "query": current_query.get("query", current_query),
-                    "size": 100  # Get up to 100 results for validation
-                }
-                
-                response = self.es.search(index=index, body=search_body)
-                hit_count = response["hits"]["total"]["value"]
+                # Skip the search when the value profile proves there are no hits and
+                # a fix follows; the final attempt always searches
+                can_fix = attempt < max_retries and self.example_generator
+                predicted_empty = self._predicted_empty(current_query, index) if can_fix else None
+                if predicted_empty:
+                    print(f"[Validation] Value profile predicts 0 hits on {index}: {predicted_empty}")
+                    hit_count = 0
+                else:
+                    # Build search request
+                    search_body = {
+                        "query": current_query.get("query", current_query),
+                        "size": 100  # Get up to 100 results for validation
+                    }
+                    
+                    response = self.es.search(index=index, body=search_body)
+                    hit_count = response["hits"]["total"]["value"]
                 
                 if hit_count > 0:
-                    return True, hit_count, None, current_query if attempt > 0 else None
+                    fixed_query = current_query if attempt > 0 else None
+                    if cache_key:
+                        self.cache_manager.set_validation(cache_key, {
+                            'hit_count': hit_count,
+                            'fixed_query': fixed_query
+                        })
+                    self._confirm_generated(current_query)
+                    return True, hit_count, None, fixed_query
                 
                 # If 0 hits and we have retries left, try to fix
                 if attempt < max_retries and self.example_generator:
                     error_msg = f"Query returned 0 hits (attempt {attempt + 1}/{max_retries + 1})"
+                    if predicted_empty:
+                        error_msg += f": {predicted_empty}"
+                    
+                    # First fix: try several candidates in one round trip
+                    if not speculated:
+                        speculated = True
+                        best = self._speculative_fix(current_query, error_msg, index)
+                        if best:
+                            fixed_query, hit_count = best
+                            if cache_key:
+                                self.cache_manager.set_validation(cache_key, {
+                                    'hit_count': hit_count,
+                                    'fixed_query': fixed_query
+                                })
+                            self._confirm_generated(fixed_query)
+                            return True, hit_count, None, fixed_query
+                    
                     try:
                         fixed = self.example_generator.fix_query(
                             current_query,
@@ -108,6 +359,19 @@ class ESValidator:
                 
                 # Try to fix if we have retries left
                 if attempt < max_retries and self.example_generator:
+                    if not speculated:
+                        speculated = True
+                        best = self._speculative_fix(current_query, error_msg, index)
+                        if best:
+                            fixed_query, hit_count = best
+                            if cache_key:
+                                self.cache_manager.set_validation(cache_key, {
+                                    'hit_count': hit_count,
+                                    'fixed_query': fixed_query
+                                })
+                            self._confirm_generated(fixed_query)
+                            return True, hit_count, None, fixed_query
+                    
                     try:
                         fixed = self.example_generator.fix_query(
                             current_query,
@@ -145,11 +409,26 @@ class ESValidator:
         Returns:
             Tuple of (success, row_count, error_message, fixed_query)
         """
+        cache_key = self._validation_cache_key(query, index, 'esql')
+        if cache_key:
+            cached = self.cache_manager.get_validation(cache_key)
+            if cached:
+                self._confirm_generated(cached.get('fixed_query') or query)
+                return True, cached['hit_count'], None, cached.get('fixed_query')
+        
         current_query = query
         last_error = None
         
         for attempt in range(max_retries + 1):
             try:
+                # Skip execution when the value profile proves there are no rows and
+                # a fix follows; the final attempt always runs the query
+                can_fix = attempt < max_retries and self.example_generator
+                predicted_empty = self._predicted_empty(current_query, index) if can_fix else None
+                if predicted_empty:
+                    print(f"[Validation] Value profile predicts 0 rows on {index}: {predicted_empty}")
+                    raise ValueError(f"Query returned 0 rows: {predicted_empty}")
+                
                 # Use MCP's execute_esql if available (validates on serverless cluster)
                 if use_mcp and self.mcp_client:
                     try:
@@ -178,7 +457,14 @@ class ESValidator:
                                                         f.write(json.dumps({"hypothesisId": "H_EXEC", "location": "es_validator.py", "message": "tabular_data found", "data": {"row_count": row_count, "columns": len(r['data'].get('columns', []))}, "timestamp": t.time()}) + "\n")
                                                     # #endregion
                                                     if row_count > 0:
-                                                        return True, row_count, None, current_query if attempt > 0 else None
+                                                        fixed_query = current_query if attempt > 0 else None
+                                                        if cache_key:
+                                                            self.cache_manager.set_validation(cache_key, {
+                                                                'hit_count': row_count,
+                                                                'fixed_query': fixed_query
+                                                            })
+                                                        self._confirm_generated(current_query)
+                                                        return True, row_count, None, fixed_query
                                                 # Check for error type
                                                 elif r.get('type') == 'error' and 'data' in r:
                                                     error_msg = r['data'].get('message', 'Unknown MCP error')
@@ -203,7 +489,14 @@ class ESValidator:
                 row_count = len(response.get('values', []))
                 
                 if row_count > 0:
-                    return True, row_count, None, current_query if attempt > 0 else None
+                    fixed_query = current_query if attempt > 0 else None
+                    if cache_key:
+                        self.cache_manager.set_validation(cache_key, {
+                            'hit_count': row_count,
+                            'fixed_query': fixed_query
+                        })
+                    self._confirm_generated(current_query)
+                    return True, row_count, None, fixed_query
                 
                 # If 0 rows and we have retries left, try to fix
                 if attempt < max_retries and self.example_generator:
@@ -283,6 +576,19 @@ class ESValidator:
                     total_hits = 0
                     errors = []
                     fixed_templates = {}
+                    failed_indices = {}
+                    
+                    # Validate (and fix) every index variation concurrently
+                    present = [idx for idx in indices if idx in template]
+                    with ThreadPoolExecutor(max_workers=len(indices)) as executor:
+                        outcomes = dict(zip(present, executor.map(
+                            lambda idx: self.validate_esql_query(
+                                template[idx],
+                                index=idx,
+                                max_retries=max_retries
+                            ),
+                            present
+                        )))
                     
                     for idx in indices:
                         if idx not in template:
@@ -290,12 +596,7 @@ class ESValidator:
                             all_valid = False
                             continue
                         
-                        idx_template = template[idx]
-                        success, row_count, error, fixed_query = self.validate_esql_query(
-                            idx_template,
-                            index=idx,
-                            max_retries=max_retries
-                        )
+                        success, row_count, error, fixed_query = outcomes[idx]
                         
                         MIN_REQUIRED_DOCS = 3
                         if success:
@@ -303,6 +604,7 @@ class ESValidator:
                                 # Each index must return at least 3 docs
                                 all_valid = False
                                 errors.append(f"{idx}: Query returned {row_count} rows (need >= {MIN_REQUIRED_DOCS})")
+                                failed_indices[idx] = errors[-1]
                             else:
                                 total_hits += row_count
                             if fixed_query:
@@ -311,12 +613,14 @@ class ESValidator:
                             # Syntax/execution error is a real failure
                             all_valid = False
                             errors.append(f"{idx}: {error}")
+                            failed_indices[idx] = errors[-1]
                     
                     return {
                         'valid': all_valid,
                         'hit_count': total_hits,
                         'error': '; '.join(errors) if errors else None,
-                        'fixed_template': fixed_templates if fixed_templates else None
+                        'fixed_template': fixed_templates if fixed_templates else None,
+                        'failed_indices': failed_indices
                     }
                 else:
                     # Single template (legacy or non-multi-index)
@@ -370,6 +674,121 @@ class ESValidator:
                 'fixed_template': None
             }
     
+    def repair_failed_examples(
+        self,
+        examples: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        query_language: str = 'query_dsl'
+    ) -> Dict[int, Dict[str, Any]]:
+        """Repair every failing example of a lab with one batched LLM call.
+        
+        Repaired templates that validate are written back to their examples.
+        
+        Args:
+            examples: Example dicts
+            results: First-pass validation results, aligned with examples
+            query_language: 'query_dsl', 'esql', or 'eql'
+            
+        Returns:
+            Dict mapping example position to its new (valid) validation result;
+            examples missing from it are still failing
+        """
+        failures = []
+        for position, (example, result) in enumerate(zip(examples, results)):
+            if result.get('valid'):
+                continue
+            template = example.get('template', '')
+            if query_language == 'esql' and isinstance(template, dict):
+                targets = [
+                    (idx, template[idx], error)
+                    for idx, error in (result.get('failed_indices') or {}).items()
+                    if idx in template
+                ]
+            elif query_language == 'esql':
+                targets = [(example.get('index', 'products'), template, result.get('error'))]
+            else:
+                try:
+                    query = json.loads(template) if isinstance(template, str) else template
+                except json.JSONDecodeError:
+                    continue
+                targets = [(example.get('index', 'product_reviews'), query, result.get('error'))]
+            
+            for idx, query, error in targets:
+                failures.append({
+                    'key': f"{example.get('id', position)}::{idx}",
+                    'position': position,
+                    'index': idx,
+                    'query': query,
+                    'error': error or 'Query returned 0 hits'
+                })
+        
+        if not failures or not self.example_generator:
+            return {}
+        
+        try:
+            fixes = self.example_generator.repair_queries(
+                [{k: v for k, v in f.items() if k != 'position'} for f in failures],
+                self.dataset_schemas,
+                query_language
+            )
+        except Exception as e:
+            print(f"[Validation] Batch repair failed: {e}")
+            return {}
+        
+        # Build repaired templates per example
+        repaired_templates = {}
+        for failure in failures:
+            fixed = fixes.get(failure['key'])
+            if not fixed:
+                continue
+            example = examples[failure['position']]
+            template = example.get('template', '')
+            if query_language == 'esql' and isinstance(template, dict):
+                repaired = repaired_templates.setdefault(failure['position'], dict(template))
+                repaired[failure['index']] = fixed
+            elif query_language == 'esql':
+                repaired_templates[failure['position']] = fixed
+            else:
+                repaired_templates[failure['position']] = json.dumps(fixed, indent=2)
+        
+        print(f"[Validation] Batch repair proposed fixes for {len(repaired_templates)}/{len({f['position'] for f in failures})} failing example(s)")
+        
+        def revalidate(position):
+            candidate = dict(examples[position], template=repaired_templates[position])
+            return position, self.validate_example(candidate, 0, query_language)
+        
+        repaired_results = {}
+        with ThreadPoolExecutor(max_workers=max(1, VALIDATION_CONCURRENCY)) as executor:
+            for position, result in executor.map(revalidate, repaired_templates):
+                # Cache the fixes that validated; failed ones get a fresh repair on reruns
+                failed_indices = result.get('failed_indices') or {}
+                for failure in failures:
+                    if failure['position'] == position and failure['key'] in fixes and \
+                            (result.get('valid') or (failed_indices and failure['index'] not in failed_indices)):
+                        self._confirm_generated(fixes[failure['key']])
+                if result.get('valid'):
+                    examples[position]['template'] = repaired_templates[position]
+                    result['fixed_template'] = result.get('fixed_template') or repaired_templates[position]
+                    repaired_results[position] = result
+        
+        print(f"[Validation] Batch repair fixed {len(repaired_results)} example(s)")
+        return repaired_results
+    
+    def start_streaming_validation(self, max_retries: int = 5) -> 'StreamingValidation':
+        """Start validating examples as they are handed over during generation.
+        
+        Pass the returned object's submit method as the generator's
+        on_example callback, then call its results method with the final
+        examples.
+        
+        Args:
+            max_retries: Maximum retry attempts per example
+            
+        Returns:
+            StreamingValidation accepting examples
+        """
+        return StreamingValidation(self, max_retries)
+    
     def validate_all_examples(
         self,
         examples: list,
@@ -390,12 +809,112 @@ class ESValidator:
             - invalid: int
             - results: List of validation results
         """
+        return StreamingValidation(self, max_retries).results(examples, query_language)
+
+
+class StreamingValidation:
+    """Validates examples concurrently as they are submitted.
+    
+    Examples handed over while the lab config is still streaming start
+    validating immediately; results() validates anything not yet submitted
+    and waits for the rest. With BATCH_REPAIR the first pass does not fix:
+    all failures are repaired together in one LLM call, and only examples
+    that are still failing go through the per-example fix loops.
+    """
+    
+    def __init__(self, validator: ESValidator, max_retries: int = 5):
+        """Initialize streaming validation.
+        
+        Args:
+            validator: Validator used for each example
+            max_retries: Maximum retry attempts per example
+        """
+        self.validator = validator
+        self.max_retries = max_retries
+        self.batch_repair = BATCH_REPAIR and validator.example_generator is not None and max_retries > 0
+        self._first_pass_retries = 0 if self.batch_repair else max_retries
+        self._executor = ThreadPoolExecutor(max_workers=max(1, VALIDATION_CONCURRENCY))
+        self._submitted: Dict[int, Tuple[Dict[str, Any], str, Future]] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, example: Dict[str, Any], query_language: str = 'query_dsl') -> None:
+        """Start validating an example in the background.
+        
+        Args:
+            example: Example dict with 'template' and 'index' keys
+            query_language: 'query_dsl', 'esql', or 'eql'
+        """
+        with self._lock:
+            if id(example) in self._submitted:
+                return
+            future = self._executor.submit(
+                self.validator.validate_example,
+                example,
+                self._first_pass_retries,
+                query_language
+            )
+            self._submitted[id(example)] = (example, query_language, future)
+    
+    def results(self, examples: List[Dict[str, Any]], query_language: str = 'query_dsl') -> Dict[str, Any]:
+        """Validate any remaining examples and collect all results.
+        
+        Args:
+            examples: Final list of example dicts
+            query_language: 'query_dsl', 'esql', or 'eql'
+            
+        Returns:
+            Validation summary with:
+            - total: int
+            - valid: int
+            - invalid: int
+            - results: List of validation results
+        """
+        futures = []
+        for example in examples:
+            with self._lock:
+                submitted = self._submitted.get(id(example))
+            if submitted and submitted[0] is example and submitted[1] == query_language:
+                futures.append(submitted[2])
+            else:
+                futures.append(self._executor.submit(
+                    self.validator.validate_example,
+                    example,
+                    self._first_pass_retries,
+                    query_language
+                ))
+        
+        try:
+            example_results = [future.result() for future in futures]
+            
+            if self.batch_repair and not all(r.get('valid') for r in example_results):
+                repaired = self.validator.repair_failed_examples(examples, example_results, query_language)
+                for position, result in repaired.items():
+                    example_results[position] = result
+                
+                # Anything the batch could not repair gets the per-example fix loops
+                retry_positions = [
+                    position for position, result in enumerate(example_results)
+                    if not result.get('valid')
+                ]
+                retry_futures = [
+                    self._executor.submit(
+                        self.validator.validate_example,
+                        examples[position],
+                        self.max_retries,
+                        query_language
+                    )
+                    for position in retry_positions
+                ]
+                for position, future in zip(retry_positions, retry_futures):
+                    example_results[position] = future.result()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        
         results = []
         valid_count = 0
         invalid_count = 0
         
-        for example in examples:
-            result = self.validate_example(example, max_retries, query_language)
+        for example, result in zip(examples, example_results):
             results.append({
                 'example_id': example.get('id', 'unknown'),
                 **result
@@ -412,4 +931,3 @@ class ESValidator:
             'invalid': invalid_count,
             'results': results
         }
-
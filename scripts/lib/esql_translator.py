@@ -0,0 +1,428 @@
+"""Rule-based translation of ES|QL queries between dataset indices."""
+
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# String literals (triple-quoted first), numbers, identifiers, operators
+TOKEN_PATTERN = re.compile(
+    r'"""[\s\S]*?"""|"(?:[^"\\]|\\.)*"|\d+(?:\.\d+)?|[A-Za-z_@][\w.]*|==|!=|>=|<=|\s+|.',
+    re.DOTALL
+)
+LIKE_TERM_PATTERN = re.compile(r'\bR?LIKE\s+"([^"]+)"', re.IGNORECASE)
+COMPARISON_OPERATORS = ('==', '!=', '>=', '<=', '>', '<')
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_@][\w.]*')
+# Columns named in DISSECT (%{name}) and GROK (%{PATTERN:name}) patterns
+PATTERN_COLUMN_PATTERN = re.compile(r'%\{(?:\w+:)?([\w.]+)(?::\w+)?\}')
+
+# Identifiers that are not columns: commands, clause keywords, literals,
+# time span units and metadata fields. Function names are recognized by the
+# call parenthesis that follows them.
+ESQL_KEYWORDS = {
+    'FROM', 'ROW', 'SHOW', 'WHERE', 'KEEP', 'DROP', 'SORT', 'LIMIT', 'EVAL', 'STATS', 'BY',
+    'RENAME', 'AS', 'DISSECT', 'GROK', 'ENRICH', 'ON', 'WITH', 'MV_EXPAND', 'METADATA',
+    'LOOKUP', 'JOIN', 'ASC', 'DESC', 'NULLS', 'FIRST', 'LAST', 'AND', 'OR', 'NOT', 'IN',
+    'LIKE', 'RLIKE', 'IS', 'NULL', 'TRUE', 'FALSE', 'APPEND_SEPARATOR',
+    'MILLISECOND', 'MILLISECONDS', 'MS', 'SECOND', 'SECONDS', 'SEC', 'S', 'MINUTE', 'MINUTES',
+    'MIN', 'HOUR', 'HOURS', 'H', 'DAY', 'DAYS', 'D', 'WEEK', 'WEEKS', 'W', 'MONTH', 'MONTHS',
+    'MO', 'QUARTER', 'QUARTERS', 'Q', 'YEAR', 'YEARS', 'YR', 'Y'
+}
+METADATA_FIELDS = {'_id', '_index', '_score', '_source', '_version', '_ignored'}
+# Commands whose assignments (name = ...) create columns
+ASSIGNING_COMMANDS = ('EVAL', 'STATS')
+
+
+class ESQLTranslator:
+    """Rewrites ES|QL queries from one dataset index to another.
+    
+    Fields are mapped by the role they play in `dataset_schemas.json`
+    (display, id, searchable text, keyword, numeric) and literal values are
+    swapped for values known to exist in the target index. Queries that use
+    a field or construct without a mapping, or an identifier that is neither
+    a source field, a keyword, a function nor a column the query creates
+    (EVAL, STATS, RENAME, DISSECT, GROK), are not translated, so callers
+    can fall back to an LLM.
+    """
+    
+    def __init__(self, dataset_schemas: Dict[str, Any]):
+        """Initialize translator.
+        
+        Args:
+            dataset_schemas: Dataset schema information
+        """
+        self.dataset_schemas = dataset_schemas
+        self.roles = {
+            index: self._field_roles(schema)
+            for index, schema in dataset_schemas.items()
+            if isinstance(schema, dict) and 'fields' in schema
+        }
+    
+    def _field_roles(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify an index's fields by role.
+        
+        Args:
+            schema: Schema for a single index
+            
+        Returns:
+            Dict with fields, display, id, text, keyword, numeric, values and
+            like_terms entries
+        """
+        fields = schema.get('fields', [])
+        display = schema.get('key_display_field')
+        values = schema.get('keyword_field_values', {})
+        text = list(schema.get('searchable_text_fields', []))
+        
+        keyword = []
+        numeric = []
+        for field, field_values in values.items():
+            if field == display or not field_values:
+                continue
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in field_values):
+                numeric.append(field)
+            else:
+                keyword.append(field)
+        
+        like_terms = []
+        for example in schema.get('esql_examples', []):
+            for term in LIKE_TERM_PATTERN.findall(example):
+                if term not in like_terms:
+                    like_terms.append(term)
+        
+        return {
+            'fields': set(fields),
+            'display': display,
+            'id': next((f for f in fields if f.endswith('_id')), None),
+            'text': text,
+            'keyword': keyword,
+            'numeric': numeric,
+            'values': values,
+            'like_terms': like_terms
+        }
+    
+    def _by_position(self, field: str, source: List[str], target: List[str]) -> Optional[str]:
+        """Map a field to the target field holding the same position in its role."""
+        if field not in source or not target:
+            return None
+        return target[source.index(field) % len(target)]
+    
+    def _projection_field(self, field: str, source: Dict[str, Any], target: Dict[str, Any]) -> Optional[str]:
+        """Map a field used outside a predicate (KEEP, SORT, STATS, EVAL...).
+        
+        Args:
+            field: Source field name
+            source: Source index roles
+            target: Target index roles
+            
+        Returns:
+            Target field name, or None if there is no counterpart
+        """
+        if field in target['fields']:
+            return field
+        if field == source['display']:
+            return target['display']
+        if field == source['id']:
+            return target['id']
+        
+        for role in ('text', 'keyword', 'numeric'):
+            source_fields = [f for f in source[role] if f != source['display']]
+            target_fields = [f for f in target[role] if f != target['display']]
+            if field in source_fields:
+                return self._by_position(field, source_fields, target_fields)
+        return None
+    
+    def _next_significant(self, tokens: List[str], position: int) -> int:
+        """Return the index of the next non-whitespace token after position."""
+        position += 1
+        while position < len(tokens) and tokens[position].isspace():
+            position += 1
+        return position
+    
+    def _previous_significant(self, tokens: List[str], position: int) -> int:
+        """Return the index of the previous non-whitespace token before position."""
+        position -= 1
+        while position >= 0 and tokens[position].isspace():
+            position -= 1
+        return position
+    
+    def _map_like_term(self, literal: str, target: Dict[str, Any], term_map: Dict[str, str]) -> Optional[str]:
+        """Swap a LIKE pattern for one known to match in the target index."""
+        if not target['like_terms']:
+            return None
+        if literal not in term_map:
+            term_map[literal] = target['like_terms'][len(term_map) % len(target['like_terms'])]
+        return f'"{term_map[literal]}"'
+    
+    def _map_keyword_value(
+        self,
+        literal: str,
+        field: str,
+        target_field: str,
+        source: Dict[str, Any],
+        target: Dict[str, Any],
+        used: Optional[set] = None
+    ) -> Optional[str]:
+        """Swap a keyword value for the target value at the same position.
+        
+        Values the source index doesn't list have no counterpart. Values
+        already used in the same IN list are skipped, so distinct source
+        values stay distinct.
+        """
+        target_values = [str(v) for v in target['values'].get(target_field) or []]
+        source_values = [str(v) for v in source['values'].get(field, [])]
+        value = literal.strip('"')
+        if not target_values or value not in source_values:
+            return None
+        
+        used = used if used is not None else set()
+        position = source_values.index(value)
+        for offset in range(len(target_values)):
+            candidate = target_values[(position + offset) % len(target_values)]
+            if candidate not in used:
+                used.add(candidate)
+                return f'"{candidate}"'
+        return None
+    
+    def _map_numeric_value(
+        self,
+        number: str,
+        field: str,
+        target_field: str,
+        source: Dict[str, Any],
+        target: Dict[str, Any],
+        operator: str
+    ) -> Optional[str]:
+        """Swap a numeric threshold for the target value at the same quantile.
+        
+        Lower bounds are kept below the target's maximum and upper bounds
+        above its minimum, so the predicate can still match rows.
+        """
+        source_values = sorted(source['values'].get(field) or [])
+        target_values = sorted(set(target['values'].get(target_field) or []))
+        if not source_values or not target_values:
+            return None
+        
+        below = sum(1 for v in source_values if v < float(number))
+        quantile = below / max(len(source_values) - 1, 1)
+        position = min(round(quantile * (len(target_values) - 1)), len(target_values) - 1)
+        if operator in ('>', '>='):
+            position = min(position, len(target_values) - 2)
+        elif operator in ('<', '<='):
+            position = max(position, 1)
+        if not 0 <= position < len(target_values):
+            return None
+        return str(target_values[position])
+    
+    def _translate_field(
+        self,
+        tokens: List[str],
+        position: int,
+        source: Dict[str, Any],
+        target: Dict[str, Any],
+        term_map: Dict[str, str]
+    ) -> bool:
+        """Rewrite the field at position, and any literal it is compared to.
+        
+        Args:
+            tokens: Query tokens (modified in place)
+            position: Index of the field token
+            source: Source index roles
+            target: Target index roles
+            term_map: Source LIKE literal -> target term, shared across the query
+            
+        Returns:
+            False if the field or its value has no mapping
+        """
+        field = tokens[position]
+        after = self._next_significant(tokens, position)
+        operator = tokens[after] if after < len(tokens) else ''
+        before = self._previous_significant(tokens, position)
+        
+        # field LIKE "..." / field NOT LIKE "..." / field RLIKE "..."
+        like_at = after
+        if operator.upper() == 'NOT':
+            like_at = self._next_significant(tokens, after)
+        if like_at < len(tokens) and tokens[like_at].upper() in ('LIKE', 'RLIKE'):
+            literal_at = self._next_significant(tokens, like_at)
+            target_field = self._by_position(field, source['text'], target['text'])
+            if tokens[like_at].upper() == 'RLIKE' or not target_field or literal_at >= len(tokens):
+                return False
+            literal = self._map_like_term(tokens[literal_at], target, term_map)
+            if not literal:
+                return False
+            tokens[position] = target_field
+            tokens[literal_at] = literal
+            return True
+        
+        # MATCH(field, "...") and field : "..."
+        is_match_call = before >= 1 and tokens[before] == '(' and \
+            tokens[self._previous_significant(tokens, before)].upper() == 'MATCH'
+        if is_match_call or operator == ':':
+            literal_at = self._next_significant(tokens, after)
+            target_field = self._by_position(field, source['text'], target['text'])
+            if not target_field or literal_at >= len(tokens) or not tokens[literal_at].startswith('"'):
+                return False
+            literal = self._map_like_term(tokens[literal_at], target, term_map)
+            if not literal:
+                return False
+            tokens[position] = target_field
+            tokens[literal_at] = literal.replace('*', '')
+            return True
+        
+        # field == "value" / field IN ("a", "b")
+        literal_at = self._next_significant(tokens, after)
+        is_keyword_compare = operator in ('==', '!=') and literal_at < len(tokens) and \
+            tokens[literal_at].startswith('"')
+        is_in_list = operator.upper() == 'IN' or (
+            operator.upper() == 'NOT' and literal_at < len(tokens) and tokens[literal_at].upper() == 'IN'
+        )
+        if is_keyword_compare or is_in_list:
+            target_field = field if field in target['fields'] and field in target['values'] else \
+                self._by_position(field, source['keyword'], target['keyword'])
+            if not target_field:
+                return False
+            
+            if is_keyword_compare:
+                literal_positions = [literal_at]
+            else:
+                open_at = self._next_significant(tokens, literal_at if operator.upper() == 'NOT' else after)
+                if open_at >= len(tokens) or tokens[open_at] != '(':
+                    return False
+                literal_positions = []
+                cursor = open_at + 1
+                while cursor < len(tokens) and tokens[cursor] != ')':
+                    if tokens[cursor].startswith('"'):
+                        literal_positions.append(cursor)
+                    cursor += 1
+            
+            used = set()
+            for literal_position in literal_positions:
+                value = self._map_keyword_value(tokens[literal_position], field, target_field, source, target, used)
+                if not value:
+                    return False
+                tokens[literal_position] = value
+            tokens[position] = target_field
+            return True
+        
+        # field > 50
+        if operator in COMPARISON_OPERATORS and literal_at < len(tokens) and \
+                re.fullmatch(r'\d+(?:\.\d+)?', tokens[literal_at]):
+            target_field = field if field in target['fields'] else \
+                self._by_position(field, source['numeric'], target['numeric'])
+            if not target_field:
+                return False
+            if target_field != field:
+                value = self._map_numeric_value(tokens[literal_at], field, target_field, source, target, operator)
+                if not value:
+                    return False
+                tokens[literal_at] = value
+            tokens[position] = target_field
+            return True
+        
+        target_field = self._projection_field(field, source, target)
+        if not target_field:
+            return False
+        tokens[position] = target_field
+        return True
+    
+    def _dedupe_keep(self, query: str) -> str:
+        """Drop fields repeated in a KEEP clause after several map to one."""
+        def dedupe(match):
+            fields = []
+            for field in match.group(2).split(','):
+                if field.strip() and field.strip() not in fields:
+                    fields.append(field.strip())
+            return f"{match.group(1)}{', '.join(fields)}{match.group(3)}"
+        return re.sub(r'(\bKEEP\s+)([^|]+?)(\s*(?:\||$))', dedupe, query, flags=re.IGNORECASE)
+    
+    def _is_known_identifier(self, tokens: List[str], position: int, command: Optional[str], created: set) -> bool:
+        """Check whether a non-field identifier is a keyword, function or created column.
+        
+        Columns assigned in EVAL/STATS (name = ...) and renamed with
+        RENAME (... AS name) are added to created.
+        """
+        token = tokens[position]
+        if token.upper() in ESQL_KEYWORDS or token in METADATA_FIELDS or token in created:
+            return True
+        
+        after = self._next_significant(tokens, position)
+        next_token = tokens[after] if after < len(tokens) else ''
+        if next_token == '(':
+            return True
+        
+        before = self._previous_significant(tokens, position)
+        if (command in ASSIGNING_COMMANDS and next_token == '=') or \
+                (command == 'RENAME' and before >= 0 and tokens[before].upper() == 'AS'):
+            created.add(token)
+            return True
+        return False
+    
+    def translate(self, query: str, target_index: str) -> Optional[str]:
+        """Translate an ES|QL query to run against another index.
+        
+        Args:
+            query: ES|QL query starting with `FROM <index>`
+            target_index: Index to translate the query to
+            
+        Returns:
+            Translated query, or None if it cannot be translated by rule
+        """
+        match = re.match(r'^\s*FROM\s+([\w-]+)\s*(\||$)', query, re.IGNORECASE)
+        if not match or match.group(1) not in self.roles or target_index not in self.roles:
+            return None
+        
+        source_index = match.group(1)
+        if source_index == target_index:
+            return query
+        
+        source = self.roles[source_index]
+        target = self.roles[target_index]
+        tokens = TOKEN_PATTERN.findall(query)
+        term_map = {}
+        from_rewritten = False
+        # Columns the query creates, and the command of the current pipe segment
+        created = set()
+        command = None
+        
+        for position, token in enumerate(tokens):
+            previous = self._previous_significant(tokens, position)
+            if previous < 0 or tokens[previous] == '|':
+                command = token.upper()
+            
+            if token == source_index and not from_rewritten:
+                tokens[position] = target_index
+                from_rewritten = True
+            elif token in source['fields']:
+                if not self._translate_field(tokens, position, source, target, term_map):
+                    return None
+            elif token == '*' and position > 0 and IDENTIFIER_PATTERN.fullmatch(tokens[position - 1]):
+                # Field wildcards (KEEP product_*) have no reliable mapping
+                return None
+            elif token.startswith('"') and command in ('DISSECT', 'GROK'):
+                created.update(PATTERN_COLUMN_PATTERN.findall(token))
+            elif IDENTIFIER_PATTERN.fullmatch(token) and not self._is_known_identifier(
+                tokens, position, command, created
+            ):
+                # Copying an unmapped field would produce a query that finds nothing
+                return None
+        
+        return self._dedupe_keep(''.join(tokens))
+    
+    def translate_all(self, query: str, indices: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        """Translate a query to each of several indices.
+        
+        Args:
+            query: ES|QL query starting with `FROM <index>`
+            indices: Target indices
+            
+        Returns:
+            Tuple of ({index: translated query}, [indices that need an LLM])
+        """
+        translated = {}
+        untranslated = []
+        for index in indices:
+            result = self.translate(query, index)
+            if result:
+                translated[index] = result
+            else:
+                untranslated.append(index)
+        return translated, untranslated
@@ -1,12 +1,45 @@
 """LLM-powered example generator for lab configs."""
 
+import asyncio
+import copy
 import json
 import os
+import re
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    BadRequestError,
+    RateLimitError,
+    APIConnectionError,
+    InternalServerError
+)
+from async_engine import get_engine, parse_retry_after, backoff_delay
 from cache_manager import CacheManager
+from esql_translator import ESQLTranslator
+from value_profile import ValueProfile
+from template_synthesizer import TemplateSynthesizer, synthesized_query_type
+from prompt_builder import PromptBuilder, PROMPT_TOKEN_BUDGET, count_tokens
+from prompt_context import get_prompt_context
+from doc_parser import doc_fingerprint, extract_parameter_definitions
+from llm_json import (
+    LAB_CONFIG_SCHEMA,
+    EXAMPLES_SCHEMA,
+    EXAMPLE_PROSE_SCHEMA,
+    FIXED_QUERY_SCHEMA,
+    FIXED_QUERY_CANDIDATES_SCHEMA,
+    ESQL_QUERY_SCHEMA,
+    ESQL_VARIANTS_SCHEMA,
+    REPAIR_QUERIES_SCHEMA,
+    REPAIR_ESQL_SCHEMA,
+    response_format,
+    parse_json_response,
+    strip_code_fences,
+    IncrementalExampleParser
+)
 from mcp_client import get_mcp_client, MCPClient
 
 
@@ -14,17 +47,131 @@ from mcp_client import get_mcp_client, MCPClient
 project_root = Path(__file__).parent.parent.parent
 load_dotenv(project_root / ".env")
 
+# Bump a task's version whenever its prompt template changes so cached
+# responses produced by the old prompt are no longer served.
+PROMPT_VERSIONS = {
+    'generate': '3',
+    'generate_esql': '3',
+    'fix_query': '2',
+    'fix_query_candidates': '1',
+    'fix_esql': '2',
+    'esql_variant': '1',
+    'esql_batch': '2',
+    'repair_batch': '1',
+    'top_up': '1',
+    'describe': '1',
+}
+
+# Indices every ES|QL example needs a variant for
+ESQL_INDICES = ['products', 'product_reviews', 'product_users']
+
+# Request all per-index ES|QL variants for a lab in one call (set to "false"
+# to go back to one MCP/OpenAI call per index per example)
+ESQL_BATCH_VARIANTS = os.getenv("ESQL_BATCH_VARIANTS", "true").lower() not in ("0", "false", "no")
+
+# Translate ES|QL variants between indices by schema role before asking an LLM
+ESQL_RULE_TRANSLATION = os.getenv("ESQL_RULE_TRANSLATION", "true").lower() not in ("0", "false", "no")
+
+# Structured output mode for JSON responses: 'json_schema' (schema derived
+# from LabConfig), 'json_object', or 'none'. A provider that rejects a mode is
+# downgraded to the next one for the rest of the run.
+JSON_MODES = ['json_schema', 'json_object', 'none']
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "json_schema")
+
+# Stream the main generation call so finished examples can be validated while
+# the rest of the lab config is still being generated
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() not in ("0", "false", "no")
+
+# Retries of a rate-limited (429) or transiently failing OpenAI request, with
+# jittered exponential backoff that honors Retry-After
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+# Model per task route (each defaults to OPENAI_MODEL), so cheap, frequent
+# fix calls can go to a faster model than lab generation
+MODEL_ROUTES = {
+    'generate': 'OPENAI_MODEL_GENERATE',
+    'fix_query': 'OPENAI_MODEL_FIX_QUERY',
+    'fix_esql': 'OPENAI_MODEL_FIX_ESQL',
+    'esql_variant': 'OPENAI_MODEL_ESQL_VARIANT',
+}
+
+# Route of each cached task (repair_batch follows the query language)
+TASK_ROUTES = {
+    'generate': 'generate',
+    'generate_esql': 'generate',
+    'top_up': 'generate',
+    'describe': 'generate',
+    'fix_query': 'fix_query',
+    'fix_query_candidates': 'fix_query',
+    'fix_esql': 'fix_esql',
+    'esql_variant': 'esql_variant',
+    'esql_batch': 'esql_variant',
+}
+
+# Build examples for the basic Query DSL labs (term, terms, range, exists,
+# prefix, wildcard, fuzzy, match) from schema values and the value profile,
+# using the LLM only for their prose
+TEMPLATE_SYNTHESIS = os.getenv("TEMPLATE_SYNTHESIS", "true").lower() not in ("0", "false", "no")
+SYNTHESIZED_EXAMPLE_COUNT = 5
+
+# Sampling parameters for the main lab config generation call
+GENERATION_TEMPERATURE = 0.7
+GENERATION_MAX_TOKENS = 4000
+
+
+def merge_confirmed(cached: Optional[Dict[str, Any]], confirmed: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a validated part of a batched call result into its cached value.
+    
+    Used with CacheManager.defer_call for batched calls whose entries
+    validate one at a time; nested dicts are merged key by key.
+    
+    Args:
+        cached: Value cached so far, or None
+        confirmed: Newly validated part, e.g. {key: fix} or {position: {index: esql}}
+        
+    Returns:
+        Merged value
+    """
+    merged = dict(cached or {})
+    for key, value in confirmed.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def append_confirmed(cached: Optional[List[Any]], confirmed: List[Any]) -> List[Any]:
+    """Append validated items to a cached list result (see merge_confirmed).
+    
+    Args:
+        cached: List cached so far, or None
+        confirmed: Newly validated items
+        
+    Returns:
+        Merged list
+    """
+    merged = list(cached or [])
+    merged.extend(item for item in confirmed if item not in merged)
+    return merged
+
 
 class ExampleGenerator:
     """Generates lab examples using OpenAI and MCP (for ES|QL)."""
     
-    def __init__(self, cache_manager: Optional[CacheManager] = None):
+    def __init__(
+        self,
+        cache_manager: Optional[CacheManager] = None,
+        value_profile: Optional[ValueProfile] = None
+    ):
         """Initialize example generator.
         
         Args:
             cache_manager: Optional cache manager for LLM responses
+            value_profile: Optional value profile (default: the saved profile, if built)
         """
         self.cache_manager = cache_manager
+        self.value_profile = value_profile or ValueProfile.load()
         
         base_url = os.getenv("OPENAI_BASE_URL")
         api_key = os.getenv("OPENAI_API_KEY")
@@ -37,36 +184,303 @@ class ExampleGenerator:
             base_url=base_url,
             api_key=api_key
         )
+        # Retries are handled by _call_openai so the shared limiter sees every 429
+        self.async_client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            max_retries=0
+        )
         self.model = model
+        self.models = {route: os.getenv(env_var) or model for route, env_var in MODEL_ROUTES.items()}
+        self.json_mode = LLM_JSON_MODE if LLM_JSON_MODE in JSON_MODES else 'json_schema'
+        
+        # Few-shot lab configs and rendered schemas, shared by every generator
+        self.context = get_prompt_context()
+        
+        # Token counts of the generation prompts built by this generator
+        self.prompt_stats: List[Dict[str, Any]] = []
+        
+        # Top-up examples waiting for validation: id(example) -> (example, confirm token)
+        self.pending_top_ups: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        
+        # Shared event loop that runs LLM/MCP calls concurrently behind the sync API
+        self.engine = get_engine()
         
         # Initialize MCP client for ES|QL (optional - falls back to OpenAI if not configured)
-        self.mcp_client = get_mcp_client()
+        self.mcp_client = get_mcp_client(cache_manager)
         if self.mcp_client:
             print("[MCP] Agent Builder MCP client initialized for ES|QL generation")
         else:
             print("[MCP] No MCP configuration found - using OpenAI for ES|QL generation")
     
-    def _load_existing_config_example(self) -> str:
-        """Load an existing lab config as a few-shot example.
+    async def _call_openai(
+        self,
+        request: Callable[[], Awaitable[Tuple[Any, Any, int]]],
+        task: str,
+        model: str
+    ) -> Any:
+        """Run an OpenAI request under the shared adaptive limiter.
+        
+        Rate limits (429) and transient connection/server errors are retried
+        up to LLM_MAX_RETRIES times with jittered backoff, waiting at least
+        as long as the provider's Retry-After asks. Latency, tokens and the
+        outcome are recorded per task route and model.
         
+        Args:
+            request: Coroutine function performing the request and returning
+                (result, response headers, tokens used)
+            task: Task route, for the model statistics
+            model: Model the request is sent to
+                
         Returns:
-            Example config as string
+            The request's result
+        """
+        limiter = self.engine.limit('openai')
+        call_stats = self.engine.call_stats(task, model)
+        started = time.monotonic()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                async with limiter:
+                    result, headers, tokens = await request()
+                limiter.record_success(headers, tokens)
+                call_stats.record(time.monotonic() - started, tokens)
+                return result
+            except RateLimitError as e:
+                if e.code == 'insufficient_quota':
+                    call_stats.record(time.monotonic() - started, ok=False)
+                    raise
+                retry_after = parse_retry_after(e.response.headers)
+                limiter.record_rate_limit(retry_after)
+                error = e
+            except (APIConnectionError, InternalServerError) as e:
+                error = e
+            except Exception:
+                call_stats.record(time.monotonic() - started, ok=False)
+                raise
+            
+            if attempt == LLM_MAX_RETRIES:
+                call_stats.record(time.monotonic() - started, ok=False)
+                raise error
+            delay = backoff_delay(attempt, retry_after)
+            limiter.record_retry()
+            print(f"[LLM] {type(error).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{LLM_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+    
+    async def _chat(self, task: str, **kwargs) -> Any:
+        """Create a chat completion through the shared adaptive limiter.
+        
+        Args:
+            task: Task route selecting the model (key of MODEL_ROUTES)
+            **kwargs: Arguments for chat.completions.create (model defaults
+                to the task's route)
+            
+        Returns:
+            Chat completion response
+        """
+        kwargs.setdefault('model', self.models[task])
+        
+        async def request():
+            raw = await self.async_client.chat.completions.with_raw_response.create(**kwargs)
+            response = await raw.parse()
+            usage = getattr(response, 'usage', None)
+            return response, raw.headers, getattr(usage, 'total_tokens', 0) or 0
+        
+        return await self._call_openai(request, task, kwargs['model'])
+    
+    async def _chat_json(
+        self,
+        schema_name: str,
+        schema: Dict[str, Any],
+        task: str,
+        **kwargs
+    ) -> Any:
+        """Create a chat completion in structured output mode and parse it.
+        
+        Args:
+            schema_name: Name of the response schema
+            schema: JSON schema for the response
+            task: Task route selecting the model (key of MODEL_ROUTES)
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            Parsed JSON response
+            
+        Raises:
+            ValueError: If no JSON could be recovered from the response
+        """
+        while True:
+            request = dict(kwargs)
+            if self.json_mode != 'none':
+                request['response_format'] = response_format(self.json_mode, schema_name, schema)
+            try:
+                response = await self._chat(task, **request)
+            except BadRequestError as e:
+                if not self._downgrade_json_mode(e):
+                    raise
+                continue
+            return parse_json_response(response.choices[0].message.content)
+    
+    async def _chat_json_stream(
+        self,
+        schema_name: str,
+        schema: Dict[str, Any],
+        task: str,
+        on_example: Callable[[Dict[str, Any]], None],
+        **kwargs
+    ) -> Any:
+        """Stream a structured chat completion, handing off examples as they close.
+        
+        Args:
+            schema_name: Name of the response schema
+            schema: JSON schema for the response
+            task: Task route selecting the model (key of MODEL_ROUTES)
+            on_example: Called with each item of the "examples" array as soon
+                as it is complete
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            Parsed JSON response
+            
+        Raises:
+            ValueError: If no JSON could be recovered from the response
+        """
+        kwargs.setdefault('model', self.models[task])
+        while True:
+            request = dict(kwargs, stream=True)
+            if self.json_mode != 'none':
+                request['response_format'] = response_format(self.json_mode, schema_name, schema)
+            chunks = []
+            
+            async def stream_request():
+                # A retried attempt starts over
+                parser = IncrementalExampleParser()
+                chunks.clear()
+                raw = await self.async_client.chat.completions.with_raw_response.create(**request)
+                stream = await raw.parse()
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content or ''
+                        chunks.append(delta)
+                        for example in parser.feed(delta):
+                            on_example(example)
+                except (APIConnectionError, InternalServerError) as e:
+                    if parser.examples:
+                        # Examples were already handed off; a retry would repeat them
+                        raise RuntimeError(f"Stream interrupted after {len(parser.examples)} example(s): {e}")
+                    raise
+                
+                # Streams carry no usage, so estimate it
+                prompt = ''.join(str(message.get('content', '')) for message in request.get('messages', []))
+                return None, raw.headers, count_tokens(prompt + ''.join(chunks), request['model'])
+            
+            try:
+                await self._call_openai(stream_request, task, request['model'])
+            except BadRequestError as e:
+                if not self._downgrade_json_mode(e):
+                    raise
+                continue
+            return parse_json_response(''.join(chunks))
+    
+    def _downgrade_json_mode(self, error: BadRequestError) -> bool:
+        """Fall back to the next JSON mode if the provider rejected the current one.
+        
+        Only errors that name response_format or json_schema (in the
+        error's param, code or message) count; other bad requests that
+        mention JSON, such as invalid JSON in a message, are not about the
+        output mode.
+        
+        Args:
+            error: Error returned by the provider
+            
+        Returns:
+            True if the mode was downgraded and the request should be retried
+        """
+        named = ' '.join(
+            str(part) for part in (getattr(error, 'param', None), getattr(error, 'code', None), str(error)) if part
+        ).lower()
+        if self.json_mode == 'none' or ('response_format' not in named and 'json_schema' not in named):
+            return False
+        downgraded = JSON_MODES[JSON_MODES.index(self.json_mode) + 1]
+        print(f"[LLM] Provider rejected {self.json_mode} output, falling back to {downgraded}")
+        self.json_mode = downgraded
+        return True
+    
+    def _call_cache_key(
+        self,
+        task: str,
+        inputs: Dict[str, Any],
+        temperature: float,
+        route: Optional[str] = None
+    ) -> Optional[str]:
+        """Compute the cache key for an individual LLM call.
+        
+        Args:
+            task: Task name (key into PROMPT_VERSIONS, also the cache namespace)
+            inputs: Prompt inputs that determine the response
+            temperature: Sampling temperature
+            route: Task route of the call's model (default: TASK_ROUTES[task])
+            
+        Returns:
+            Cache key, or None if caching is disabled
+        """
+        if not self.cache_manager or not self.cache_manager.use_cache:
+            return None
+        if self.value_profile:
+            inputs = {**inputs, 'value_profile': self.value_profile.fingerprint}
+        return self.cache_manager.compute_call_key(
+            inputs,
+            model=self.models[route or TASK_ROUTES[task]],
+            temperature=temperature,
+            prompt_version=PROMPT_VERSIONS[task]
+        )
+    
+    def _value_profile_section(self, indices: Optional[List[str]] = None) -> str:
+        """Format the value profile for a prompt.
+        
+        Args:
+            indices: Indices to include (default: all)
+            
+        Returns:
+            Prompt section to append after the schemas, or '' without a profile
         """
-        # Load match-query config as example
-        example_path = os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "..",
-            "shared",
-            "frontend",
-            "src",
-            "config",
-            "labConfig.ts"
+        if not self.value_profile:
+            return ''
+        context = self.value_profile.prompt_context(indices)
+        if not context:
+            return ''
+        return (
+            "\n\nValue Profile (values that actually exist in the indices, with document counts; "
+            "prefer these so queries return results):\n"
+            f"{json.dumps(context, indent=2)}"
         )
+    
+    def _normalize_error(self, error_message: str) -> str:
+        """Strip attempt counters from an error so equivalent failures share a cache key.
+        
+        Args:
+            error_message: Error message from the validator
+            
+        Returns:
+            Normalized error message
+        """
+        error_message = re.sub(r'\s*\(attempt \d+/\d+\)', '', error_message)
+        return re.sub(r' after \d+ attempts', '', error_message)
+    
+    def _load_existing_config_example(self, query_type: str = '') -> str:
+        """Load the most relevant existing lab config as a few-shot example.
         
-        if os.path.exists(example_path):
-            with open(example_path, 'r', encoding='utf-8') as f:
-                return f.read()
+        Args:
+            query_type: Query type of the lab being generated
+            
+        Returns:
+            Example config as string
+        """
+        few_shot = self.context.few_shot(query_type)
+        if few_shot:
+            return few_shot['text']
         
         # Fallback to a minimal example
         return """
@@ -108,6 +522,144 @@ export const labConfig: LabConfig = {
 };
 """
     
+    def _build_generation_prompt(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        existing_examples: Optional[List[Dict[str, str]]],
+        query_language: str,
+        few_shot_example: str
+    ) -> Tuple[str, str]:
+        """Build the lab generation prompt within PROMPT_TOKEN_BUDGET.
+        
+        Only the relevant parts of the doc are sent: the description,
+        parameter definitions and code examples. Parts shared by every lab
+        come first so the provider can cache the prompt prefix; code
+        examples, then parameter definitions, then the few-shot example are
+        shortened when the prompt is over budget. Token counts are appended
+        to self.prompt_stats.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            existing_examples: Optional existing code examples from doc
+            query_language: 'query_dsl' or 'esql'
+            few_shot_example: Few-shot LabConfig source ('' for none)
+            
+        Returns:
+            Tuple of (system prompt, user prompt)
+        """
+        title = parsed_doc.get('title', '')
+        query_type = parsed_doc.get('query_type', '')
+        
+        parameters = parsed_doc.get('parameters')
+        if parameters is None:
+            # Parsed docs cached before parameters were extracted
+            parameters = extract_parameter_definitions(parsed_doc.get('raw_markdown', ''))
+        
+        code_examples = []
+        for example in existing_examples or parsed_doc.get('code_examples', []):
+            block = f"```{example.get('language', '')}\n{example.get('code', '')}\n```"
+            if block not in code_examples:
+                code_examples.append(block)
+        
+        if query_language == 'esql':
+            system_prompt = """You are an expert at creating interactive Elasticsearch ES|QL query lab examples.
+Your task is to generate a LabConfig structure that will be used to create an interactive lab.
+
+The LabConfig should:
+1. Include 4-6 diverse examples that demonstrate different ES|QL commands (FROM, WHERE, KEEP, SORT, LIMIT, etc.)
+2. Use realistic ES|QL queries that will return results from the provided datasets
+3. Include helpful "tryThis" suggestions for each example
+4. Include tooltips for key ES|QL commands and parameters
+5. Use appropriate fields from the dataset schemas provided
+6. For ES|QL, templates should be ES|QL query strings, not JSON
+
+Return ONLY valid JSON matching the LabConfig structure. Do not include markdown code blocks or explanations."""
+            reference = """ES|QL Query Examples for Datasets:
+- products: FROM products | WHERE product_description LIKE '*wireless*' | LIMIT 10
+- product_reviews: FROM product_reviews | WHERE review_text LIKE '*comfortable*' | LIMIT 10
+- product_users: FROM product_users | WHERE interests LIKE '*Electronics*' | LIMIT 10"""
+            page_kind = "Elasticsearch ES|QL documentation page"
+            instructions = f"""Generate a complete LabConfig JSON object with:
+- queryLanguage: "esql"
+- queryType: "{query_type}"
+- displayName: Derive from title "{title}" - use a clear, concise name like "ES|QL Commands", "ES|QL REST API", "ES|QL Syntax"
+- description: The description from the doc
+- docUrl: The doc URL
+- keyDisplayFields: Use the key_display_field from dataset_schemas
+- searchFields: Use the searchable_text_fields from dataset_schemas (for reference, not used in ES|QL)
+- sampleQueries: Realistic ES|QL query strings that will return results (e.g., "FROM product_reviews | WHERE review_text LIKE '*comfortable*'")
+- examples: 4-6 diverse ES|QL examples with id, title, description, template (ES|QL query string, NOT JSON), index, tryThis, and tooltips
+
+For ES|QL templates, use the ES|QL query string format directly, not wrapped in JSON.
+
+Return ONLY the JSON object, no markdown formatting."""
+        else:
+            system_prompt = """You are an expert at creating interactive Elasticsearch query lab examples.
+Your task is to generate a LabConfig structure that will be used to create an interactive lab.
+
+The LabConfig should:
+1. Include 4-6 diverse examples that demonstrate different aspects of the query type
+2. Use realistic queries that will return results from the provided datasets
+3. Include helpful "tryThis" suggestions for each example
+4. Include tooltips for key parameters
+5. Use appropriate fields from the dataset schemas provided
+
+Return ONLY valid JSON matching the LabConfig structure. Do not include markdown code blocks or explanations."""
+            reference = f"Example LabConfig Structure (for reference):\n{few_shot_example}" if few_shot_example else ''
+            page_kind = "Elasticsearch documentation page"
+            instructions = f"""Generate a complete LabConfig JSON object with:
+- queryLanguage: "query_dsl"
+- queryType: "{query_type}"
+- displayName: Human-readable name (e.g., "Match Query")
+- description: The description from the doc
+- docUrl: The doc URL
+- keyDisplayFields: Use the key_display_field from dataset_schemas
+- searchFields: Use the searchable_text_fields from dataset_schemas
+- sampleQueries: Realistic query strings that will return results
+- queryStructure: Determine the fieldPath based on query type (inline, default_field, fields, or nested)
+- examples: 4-6 diverse examples with id, title, description, template (JSON string), index, tryThis, and tooltips
+
+Return ONLY the JSON object, no markdown formatting."""
+        
+        builder = PromptBuilder(model=self.models['generate'])
+        builder.reserve(system_prompt)
+        builder.add(
+            'datasets',
+            f"Available Datasets:\n{self.context.schema_block(dataset_schemas)}{self._value_profile_section()}",
+            stable=True
+        )
+        builder.add('reference', reference, stable=True, trim_priority=3)
+        builder.add('page', f"""Generate a LabConfig for the following {page_kind}:
+
+Title: {title}
+Description: {parsed_doc.get('description', '')}
+Query Type: {query_type}
+URL: {parsed_doc.get('doc_url', '')}""")
+        if parameters:
+            builder.add(
+                'parameters',
+                "Parameter Definitions from Documentation:\n" + "\n".join(
+                    f"- `{parameter['name']}`: {parameter['description']}" for parameter in parameters
+                ),
+                trim_priority=2
+            )
+        if code_examples:
+            builder.add(
+                'code_examples',
+                "Existing Code Examples from Documentation:\n" + "\n\n".join(code_examples),
+                trim_priority=1
+            )
+        builder.add('instructions', instructions)
+        
+        user_prompt, stats = builder.build()
+        self.prompt_stats.append({'task': 'generate_esql' if query_language == 'esql' else 'generate', **stats})
+        if stats['trimmed']:
+            print(f"[LLM] Prompt over {stats['budget']} token budget, trimmed: {', '.join(stats['trimmed'])}")
+        
+        return system_prompt, user_prompt
+    
     def _detect_query_language(self, parsed_doc: Dict[str, Any]) -> str:
         """Detect query language from doc URL and content.
         
@@ -134,11 +686,121 @@ export const labConfig: LabConfig = {
         # Default to Query DSL
         return 'query_dsl'
     
-    def generate_lab_config(
+    def _generation_cache_key(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        query_language: str,
+        few_shot_example: str
+    ) -> Optional[str]:
+        """Compute the cache key of a lab config generation call.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            query_language: 'query_dsl' or 'esql'
+            few_shot_example: Few-shot LabConfig source ('' for none)
+            
+        Returns:
+            Content hash, or None without a cache manager
+        """
+        if not self.cache_manager:
+            return None
+        prompt_task = 'generate_esql' if query_language == 'esql' else 'generate'
+        return self.cache_manager.compute_content_hash(
+            parsed_doc.get('fingerprint') or doc_fingerprint(parsed_doc),
+            dataset_schemas,
+            model=self.models['generate'],
+            prompt_version=PROMPT_VERSIONS[prompt_task],
+            few_shot_hash=self.cache_manager.hash_text(few_shot_example),
+            generation_params={
+                'temperature': GENERATION_TEMPERATURE,
+                'max_tokens': GENERATION_MAX_TOKENS,
+                'json_mode': self.json_mode,
+                'prompt_budget': PROMPT_TOKEN_BUDGET,
+                **({'value_profile': self.value_profile.fingerprint} if self.value_profile else {})
+            }
+        )
+    
+    def _generation_request(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        existing_examples: Optional[List[Dict[str, str]]],
+        query_language: str,
+        few_shot_example: str
+    ) -> Dict[str, Any]:
+        """Build the chat completion arguments of a lab config generation call."""
+        system_prompt, user_prompt = self._build_generation_prompt(
+            parsed_doc,
+            dataset_schemas,
+            existing_examples,
+            query_language,
+            few_shot_example
+        )
+        return dict(
+            model=self.models['generate'],
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=GENERATION_TEMPERATURE,
+            max_tokens=GENERATION_MAX_TOKENS
+        )
+    
+    def prepare_batch_request(
         self,
         parsed_doc: Dict[str, Any],
         dataset_schemas: Dict[str, Any],
         existing_examples: Optional[List[Dict[str, str]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Build the offline batch request for a lab config generation call.
+        
+        The request's custom_id is the generation cache key, so its result
+        can be ingested with CacheManager.set_call('batch', ...) and picked up
+        by generate_lab_config without a live LLM call.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            existing_examples: Optional existing code examples from doc
+            
+        Returns:
+            Dict with custom_id and body (chat completion arguments), or None
+            if the lab is synthesized or its config or a batch result is
+            already cached
+            
+        Raises:
+            ValueError: If no cache manager is configured
+        """
+        if not self.cache_manager or not self.cache_manager.use_cache:
+            raise ValueError("Batch generation requires the cache")
+        
+        query_language = self._detect_query_language(parsed_doc)
+        if TEMPLATE_SYNTHESIS and query_language == 'query_dsl' and synthesized_query_type(parsed_doc):
+            return None
+        few_shot_example = self._load_existing_config_example(parsed_doc.get('query_type', '')) if query_language != 'esql' else ''
+        content_hash = self._generation_cache_key(parsed_doc, dataset_schemas, query_language, few_shot_example)
+        if self.cache_manager.get_llm_response(content_hash) or self.cache_manager.get_call('batch', content_hash):
+            return None
+        
+        body = self._generation_request(
+            parsed_doc,
+            dataset_schemas,
+            existing_examples,
+            query_language,
+            few_shot_example
+        )
+        if self.json_mode != 'none':
+            body['response_format'] = response_format(self.json_mode, 'lab_config', LAB_CONFIG_SCHEMA)
+        return {'custom_id': content_hash, 'body': body}
+    
+    def generate_lab_config(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        existing_examples: Optional[List[Dict[str, str]]] = None,
+        on_example: Optional[Callable[[Dict[str, Any], str], None]] = None
     ) -> Dict[str, Any]:
         """Generate lab config using LLM.
         
@@ -146,302 +808,664 @@ export const labConfig: LabConfig = {
             parsed_doc: Parsed documentation structure
             dataset_schemas: Dataset schema information
             existing_examples: Optional existing code examples from doc
+            on_example: Optional callback receiving (example, query_language)
+                for each example as soon as it is generated (ES|QL examples
+                after their per-index variants are built). Examples in the
+                returned config are the same objects.
+                
+        Returns:
+            Generated LabConfig dict
+        """
+        return self.engine.run(self.generate_lab_config_async(
+            parsed_doc,
+            dataset_schemas,
+            existing_examples,
+            on_example
+        ))
+    
+    async def generate_lab_config_async(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        existing_examples: Optional[List[Dict[str, str]]] = None,
+        on_example: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ) -> Dict[str, Any]:
+        """Generate lab config using LLM (async version of generate_lab_config).
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            existing_examples: Optional existing code examples from doc
+            on_example: Optional callback for early example hand-off
             
         Returns:
             Generated LabConfig dict
         """
+        # Detect query language
+        query_language = self._detect_query_language(parsed_doc)
+        few_shot_example = self._load_existing_config_example(parsed_doc.get('query_type', '')) if query_language != 'esql' else ''
+        
+        # Basic Query DSL labs don't need the LLM to write queries
+        if TEMPLATE_SYNTHESIS and query_language == 'query_dsl':
+            lab_config = await self._synthesize_lab_config(parsed_doc, dataset_schemas)
+            if lab_config:
+                return lab_config
+        
         # Check cache first
-        if self.cache_manager:
-            content_hash = self.cache_manager.compute_content_hash(
-                parsed_doc.get('raw_markdown', ''),
-                dataset_schemas
-            )
+        content_hash = self._generation_cache_key(parsed_doc, dataset_schemas, query_language, few_shot_example)
+        batch_result = None
+        if content_hash:
             cached = self.cache_manager.get_llm_response(content_hash)
             if cached:
                 return cached
+            
+            # A result ingested from an offline batch replaces the live call
+            batch_result = self.cache_manager.get_call('batch', content_hash)
         
-        # Detect query language
-        query_language = self._detect_query_language(parsed_doc)
+        try:
+            if batch_result:
+                print("[LLM] Using lab config from offline batch")
+                lab_config = batch_result
+            elif on_example and LLM_STREAMING:
+                request = self._generation_request(
+                    parsed_doc,
+                    dataset_schemas,
+                    existing_examples,
+                    query_language,
+                    few_shot_example
+                )
+                streamed = []
+                needs_variants = []
+                translator = ESQLTranslator(dataset_schemas) if query_language == 'esql' and ESQL_RULE_TRANSLATION else None
+                
+                def hand_off(example):
+                    if not isinstance(example, dict) or not example.get('template'):
+                        return
+                    streamed.append(example)
+                    if query_language == 'esql' and isinstance(example['template'], str):
+                        # Examples the rules fully translate go now; the rest wait
+                        # for one batched variant call after the stream
+                        _, translated = self._translate_esql_example(example, translator)
+                        if len(translated) < len(ESQL_INDICES):
+                            needs_variants.append(example)
+                            return
+                        example['template'] = {index: translated[index] for index in ESQL_INDICES}
+                    print(f"[LLM] Example '{example.get('id', '?')}' ready, handing off to validation")
+                    on_example(example, query_language)
+                
+                lab_config = await self._chat_json_stream('lab_config', LAB_CONFIG_SCHEMA, 'generate', hand_off, **request)
+                
+                # Keep the handed-off objects so validation results line up;
+                # streamed examples are a prefix of the complete list
+                complete = [e for e in lab_config.get('examples') or [] if isinstance(e, dict) and e.get('template')]
+                lab_config['examples'] = streamed + complete[len(streamed):]
+                
+                if needs_variants:
+                    # One variant call covers the waiting and any unstreamed examples
+                    await self._expand_esql_examples(lab_config['examples'], dataset_schemas)
+                    for example in needs_variants:
+                        print(f"[LLM] Example '{example.get('id', '?')}' ready, handing off to validation")
+                        on_example(example, query_language)
+            else:
+                request = self._generation_request(
+                    parsed_doc,
+                    dataset_schemas,
+                    existing_examples,
+                    query_language,
+                    few_shot_example
+                )
+                lab_config = await self._chat_json('lab_config', LAB_CONFIG_SCHEMA, 'generate', **request)
+            
+            # Post-process: ensure required fields exist with defaults
+            self._apply_config_defaults(lab_config)
+            
+            # Ensure examples field exists (even if empty)
+            lab_config['examples'] = self._normalize_examples(lab_config.get('examples'))
+            
+            # Post-process: Fix ES|QL queries - convert single quotes to double quotes
+            # ES|QL requires double quotes for string literals, but LLMs often generate single quotes
+            # Also generate multi-index templates for ES|QL
+            if query_language == 'esql':
+                await self._expand_esql_examples(lab_config.get('examples', []), dataset_schemas)
+            
+            # RETRY IF NO EXAMPLES GENERATED
+            examples = lab_config.get('examples', [])
+            if len(examples) == 0:
+                # Don't cache empty results - keep the rest of the config and
+                # ask only for examples, up to 3 times
+                for retry in range(3):
+                    print(f"[LLM] No examples generated, requesting examples only ({retry + 1}/3)...")
+                    try:
+                        retry_examples = await self.generate_additional_examples_async(
+                            parsed_doc,
+                            dataset_schemas,
+                            lab_config,
+                            4
+                        )
+                    except RuntimeError:
+                        continue
+                    if retry_examples:
+                        lab_config['examples'] = retry_examples
+                        print(f"[LLM] Retry successful - got {len(lab_config['examples'])} examples")
+                        break
+                
+                # Final check - if still no examples, raise error
+                if len(lab_config.get('examples', [])) == 0:
+                    raise ValueError("LLM failed to generate examples after 3 retries")
+            
+            # Only cache if we have examples
+            if content_hash and len(lab_config.get('examples', [])) > 0:
+                self.cache_manager.set_llm_response(content_hash, lab_config)
+            
+            return lab_config
+            
+        except Exception as e:
+            raise RuntimeError(f"LLM generation failed: {e}")
+    
+    def _apply_config_defaults(self, lab_config: Dict[str, Any]) -> None:
+        """Fill in missing per-index display fields, search fields and sample queries.
         
-        # Build prompt based on query language
-        if query_language == 'esql':
-            system_prompt = """You are an expert at creating interactive Elasticsearch ES|QL query lab examples.
-Your task is to generate a LabConfig structure that will be used to create an interactive lab.
-
-The LabConfig should:
-1. Include 4-6 diverse examples that demonstrate different ES|QL commands (FROM, WHERE, KEEP, SORT, LIMIT, etc.)
-2. Use realistic ES|QL queries that will return results from the provided datasets
-3. Include helpful "tryThis" suggestions for each example
-4. Include tooltips for key ES|QL commands and parameters
-5. Use appropriate fields from the dataset schemas provided
-6. For ES|QL, templates should be ES|QL query strings, not JSON
-
-Return ONLY valid JSON matching the LabConfig structure. Do not include markdown code blocks or explanations."""
+        Args:
+            lab_config: Lab config (modified in place)
+        """
+        if 'keyDisplayFields' not in lab_config or not lab_config['keyDisplayFields']:
+            lab_config['keyDisplayFields'] = {
+                'products': 'product_name',
+                'product_reviews': 'review_title',
+                'product_users': 'username'
+            }
+        
+        if 'searchFields' not in lab_config or not lab_config['searchFields']:
+            lab_config['searchFields'] = {
+                'products': 'product_name',
+                'product_reviews': 'review_text',
+                'product_users': 'interests'
+            }
+        
+        if 'sampleQueries' not in lab_config or not lab_config['sampleQueries']:
+            lab_config['sampleQueries'] = {
+                'products': 'wireless',
+                'product_reviews': 'comfortable',
+                'product_users': 'Electronics'
+            }
+        
+        if 'queryStructure' not in lab_config or not lab_config['queryStructure']:
+            lab_config['queryStructure'] = {
+                'type': 'inline',
+                'fieldPath': ''
+            }
+    
+    async def _synthesize_lab_config(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Build a basic Query DSL lab from schema values, with LLM-written prose.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            
+        Returns:
+            Lab config, or None if the page's query type can't be synthesized
+            or too few examples could be built
+        """
+        query_type = synthesized_query_type(parsed_doc)
+        if not query_type:
+            return None
+        
+        synthesizer = TemplateSynthesizer(dataset_schemas, self.value_profile)
+        examples = synthesizer.synthesize(query_type, SYNTHESIZED_EXAMPLE_COUNT)
+        if len(examples) < 3:
+            print(f"[Synth] Only {len(examples)} {query_type} example(s) could be built, using the LLM")
+            return None
+        print(f"[Synth] Built {len(examples)} {query_type} examples from schema values")
+        
+        title = parsed_doc.get('title', '') or f"{query_type} query"
+        lab_config = {
+            'queryLanguage': 'query_dsl',
+            'queryType': parsed_doc.get('query_type') or f"{query_type}_query",
+            'displayName': ' '.join(word[:1].upper() + word[1:] for word in title.split()),
+            'description': parsed_doc.get('description', ''),
+            'docUrl': parsed_doc.get('doc_url', ''),
+            'examples': examples
+        }
+        self._apply_config_defaults(lab_config)
+        
+        try:
+            prose = await self._describe_examples(parsed_doc, examples)
+        except Exception as e:
+            print(f"[Synth] ⚠ Could not generate prose, keeping the built-in text: {e}")
+            return lab_config
+        
+        if prose.get('displayName'):
+            lab_config['displayName'] = prose['displayName']
+        if prose.get('description'):
+            lab_config['description'] = prose['description']
+        written = {str(e.get('id')): e for e in prose.get('examples') or [] if isinstance(e, dict)}
+        for example in examples:
+            text = written.get(example['id'])
+            if not text:
+                continue
+            for key in ('title', 'description', 'tooltips'):
+                if text.get(key):
+                    example[key] = text[key]
+            try_this = self._normalize_examples([{'template': '-', 'tryThis': text.get('tryThis')}])[0]['tryThis']
+            if try_this:
+                example['tryThis'] = try_this
+        return lab_config
+    
+    async def _describe_examples(
+        self,
+        parsed_doc: Dict[str, Any],
+        examples: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Ask the LLM for the lab and example prose of synthesized examples.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            examples: Synthesized examples (templates are not changed)
             
-            user_prompt = f"""Generate a LabConfig for the following Elasticsearch ES|QL documentation page:
+        Returns:
+            Dict with displayName, description and examples (id, title,
+            description, tryThis, tooltips)
+        """
+        summaries = [
+            {'id': e['id'], 'index': e['index'], 'template': e['template']}
+            for e in examples
+        ]
+        system_prompt = """You are an expert at writing interactive Elasticsearch query lab content.
+The queries of the lab are fixed. Write the text around them: a short lab display name and
+description, and for each example a title, a one-sentence description of what it finds,
+2-3 tryThis suggestions for modifying the query, and tooltips explaining its key fields or parameters.
+
+Return ONLY a JSON object of the form {"displayName": "...", "description": "...", "examples": [...]}
+with one entry per example id. Do not include markdown code blocks or explanations."""
+        
+        user_prompt = f"""Documentation page:
 
 Title: {parsed_doc.get('title', '')}
 Description: {parsed_doc.get('description', '')}
 Query Type: {parsed_doc.get('query_type', '')}
 URL: {parsed_doc.get('doc_url', '')}
 
-Available Datasets:
-{json.dumps(dataset_schemas, indent=2)}
-
-ES|QL Query Examples for Datasets:
-- products: FROM products | WHERE product_description LIKE '*wireless*' | LIMIT 10
-- product_reviews: FROM product_reviews | WHERE review_text LIKE '*comfortable*' | LIMIT 10
-- product_users: FROM product_users | WHERE interests LIKE '*Electronics*' | LIMIT 10
-
-Existing Code Examples from Documentation:
-{json.dumps(existing_examples or parsed_doc.get('code_examples', []), indent=2)}
-
-Generate a complete LabConfig JSON object with:
-- queryLanguage: "esql"
-- queryType: "{parsed_doc.get('query_type', '')}"
-- displayName: Derive from title "{parsed_doc.get('title', '')}" - use a clear, concise name like "ES|QL Commands", "ES|QL REST API", "ES|QL Syntax"
-- description: The description from the doc
-- docUrl: The doc URL
-- keyDisplayFields: Use the key_display_field from dataset_schemas
-- searchFields: Use the searchable_text_fields from dataset_schemas (for reference, not used in ES|QL)
-- sampleQueries: Realistic ES|QL query strings that will return results (e.g., "FROM product_reviews | WHERE review_text LIKE '*comfortable*'")
-- examples: 4-6 diverse ES|QL examples with id, title, description, template (ES|QL query string, NOT JSON), index, tryThis, and tooltips
-
-For ES|QL templates, use the ES|QL query string format directly, not wrapped in JSON.
-
-Return ONLY the JSON object, no markdown formatting."""
+Examples:
+{json.dumps(summaries, indent=2)}"""
+        
+        cache_key = self._call_cache_key('describe', {
+            'title': parsed_doc.get('title', ''),
+            'description': parsed_doc.get('description', ''),
+            'query_type': parsed_doc.get('query_type', ''),
+            'examples': summaries
+        }, temperature=GENERATION_TEMPERATURE)
+        if cache_key:
+            cached = self.cache_manager.get_call('describe', cache_key)
+            if cached:
+                return cached
+        
+        prose = await self._chat_json(
+            'example_prose',
+            EXAMPLE_PROSE_SCHEMA,
+            'generate',
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=GENERATION_TEMPERATURE,
+            max_tokens=min(GENERATION_MAX_TOKENS, 400 * len(examples))
+        )
+        if not isinstance(prose, dict):
+            raise ValueError("Prose response is not a JSON object")
+        if cache_key:
+            self.cache_manager.set_call('describe', cache_key, prose)
+        return prose
+    
+    def _normalize_examples(self, examples: Any) -> List[Dict[str, Any]]:
+        """Drop unusable examples and clean up common LLM formatting slips.
+        
+        Args:
+            examples: Examples from an LLM response
+            
+        Returns:
+            Examples that have a template, with tryThis as a list of strings
+        """
+        # Drop any example cut off by a truncated response
+        examples = [
+            example for example in examples or []
+            if isinstance(example, dict) and example.get('template')
+        ]
+        
+        # Ensure tryThis is always an array of strings
+        for example in examples:
+            if 'tryThis' in example:
+                try_this = example['tryThis']
+                if isinstance(try_this, str):
+                    # LLM returned a single string - wrap in array
+                    example['tryThis'] = [try_this]
+                elif isinstance(try_this, list):
+                    # Filter out any single-character entries (LLM bug)
+                    example['tryThis'] = [
+                        s for s in try_this 
+                        if isinstance(s, str) and len(s) > 5
+                    ]
+        
+        return examples
+    
+    def _summarize_example(self, example: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce an example to what a prompt needs to avoid duplicating it."""
+        template = example.get('template', '')
+        if isinstance(template, dict):
+            # Multi-index ES|QL: the source index variant is enough
+            template = template.get(example.get('index')) or next(iter(template.values()), '')
+        return {
+            'id': example.get('id'),
+            'title': example.get('title'),
+            'index': example.get('index'),
+            'template': template
+        }
+    
+    def generate_additional_examples(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        lab_config: Dict[str, Any],
+        count: int,
+        rejected_examples: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate only new examples for an existing lab config.
+        
+        Used to top up a lab whose examples were partly dropped by
+        validation: the kept examples are sent as context so the new ones
+        don't duplicate them, and the rest of the config is not regenerated.
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            lab_config: Lab config whose examples are kept
+            count: Number of new examples to generate
+            rejected_examples: Optional examples that failed validation
+            
+        Returns:
+            New examples (ES|QL examples with their per-index variants), with
+            ids that don't collide with existing or rejected examples
+        """
+        return self.engine.run(self.generate_additional_examples_async(
+            parsed_doc,
+            dataset_schemas,
+            lab_config,
+            count,
+            rejected_examples
+        ))
+    
+    async def generate_additional_examples_async(
+        self,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        lab_config: Dict[str, Any],
+        count: int,
+        rejected_examples: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate only new examples (async version of generate_additional_examples).
+        
+        Args:
+            parsed_doc: Parsed documentation structure
+            dataset_schemas: Dataset schema information
+            lab_config: Lab config whose examples are kept
+            count: Number of new examples to generate
+            rejected_examples: Optional examples that failed validation
+            
+        Returns:
+            New examples
+        """
+        query_language = lab_config.get('queryLanguage') or self._detect_query_language(parsed_doc)
+        existing = [self._summarize_example(e) for e in lab_config.get('examples', [])]
+        rejected = [self._summarize_example(e) for e in rejected_examples or []]
+        
+        if query_language == 'esql':
+            language_rules = """Templates are ES|QL query strings (NOT JSON) using FROM, WHERE, KEEP, SORT, LIMIT, etc.
+ES|QL uses DOUBLE QUOTES for string literals and LIKE "*term*" for text search."""
         else:
-            # Query DSL prompt (existing)
-            system_prompt = """You are an expert at creating interactive Elasticsearch query lab examples.
-Your task is to generate a LabConfig structure that will be used to create an interactive lab.
-
-The LabConfig should:
-1. Include 4-6 diverse examples that demonstrate different aspects of the query type
-2. Use realistic queries that will return results from the provided datasets
-3. Include helpful "tryThis" suggestions for each example
-4. Include tooltips for key parameters
-5. Use appropriate fields from the dataset schemas provided
+            language_rules = "Templates are Query DSL request bodies serialized as a JSON string with a top-level \"query\" key."
+        
+        system_prompt = f"""You are an expert at creating interactive Elasticsearch query lab examples.
+Your task is to add examples to an existing lab without repeating the examples it already has.
 
-Return ONLY valid JSON matching the LabConfig structure. Do not include markdown code blocks or explanations."""
+Each example needs id, title, description, template, index, tryThis and tooltips.
+{language_rules}
+Use fields and values from the dataset schemas so every query returns results.
 
-            user_prompt = f"""Generate a LabConfig for the following Elasticsearch documentation page:
+Return ONLY a JSON object of the form {{"examples": [...]}}. Do not include markdown code blocks or explanations."""
+        
+        user_prompt = f"""Add {count} new example(s) to the lab for this Elasticsearch documentation page:
 
 Title: {parsed_doc.get('title', '')}
 Description: {parsed_doc.get('description', '')}
 Query Type: {parsed_doc.get('query_type', '')}
 URL: {parsed_doc.get('doc_url', '')}
 
-Available Datasets:
-{json.dumps(dataset_schemas, indent=2)}
+Available Datasets:
+{self.context.schema_block(dataset_schemas)}{self._value_profile_section()}
+
+Examples already in the lab (do NOT duplicate them; demonstrate other aspects):
+{json.dumps(existing, indent=2)}
+"""
+        if rejected:
+            user_prompt += f"""
+Examples that returned no results (do NOT reuse their fields or values):
+{json.dumps(rejected, indent=2)}
+"""
+        user_prompt += f"""
+Return exactly {count} example(s) with ids different from the ones above."""
+        
+        cache_key = self._call_cache_key('top_up', {
+            'doc': parsed_doc.get('fingerprint') or doc_fingerprint(parsed_doc),
+            'language': query_language,
+            'existing': existing,
+            'rejected': rejected,
+            'count': count,
+            'schemas': dataset_schemas
+        }, temperature=GENERATION_TEMPERATURE)
+        cached = self.cache_manager.get_call('top_up', cache_key) if cache_key else None
+        
+        if cached:
+            examples = cached
+        else:
+            try:
+                parsed = await self._chat_json(
+                    'lab_examples',
+                    EXAMPLES_SCHEMA,
+                    'generate',
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=GENERATION_TEMPERATURE,
+                    max_tokens=min(GENERATION_MAX_TOKENS, 1000 * count)
+                )
+            except Exception as e:
+                raise RuntimeError(f"Example top-up failed: {e}")
+            
+            examples = self._normalize_examples(parsed.get('examples') if isinstance(parsed, dict) else None)[:count]
+            if cache_key:
+                # Each example is cached by confirm_top_up once it validates, so a
+                # rerun doesn't get back examples that were already rejected
+                for example in examples:
+                    snapshot = copy.deepcopy(example)
+                    token = {'top_up': cache_key, 'example': snapshot}
+                    self.cache_manager.defer_call('top_up', cache_key, [snapshot], query=token, merge=append_confirmed)
+                    self.pending_top_ups[id(example)] = (example, token)
+        
+        # Keep ids unique so results and drops can still be matched by id
+        taken = {str(e.get('id')) for e in existing + rejected}
+        for position, example in enumerate(examples):
+            base_id = str(example.get('id') or f"example-{len(existing) + position + 1}")
+            example_id = base_id
+            suffix = 2
+            while example_id in taken:
+                example_id = f"{base_id}-{suffix}"
+                suffix += 1
+            example['id'] = example_id
+            taken.add(example_id)
+        
+        if query_language == 'esql':
+            await self._expand_esql_examples(examples, dataset_schemas)
+        
+        print(f"[LLM] Generated {len(examples)} additional example(s)")
+        return examples
+    
+    def confirm_top_up(self, example: Dict[str, Any]) -> None:
+        """Cache a top-up example after it validated.
+        
+        Args:
+            example: Example returned by generate_additional_examples
+        """
+        entry = self.pending_top_ups.pop(id(example), None)
+        if entry and entry[0] is example:
+            self.cache_manager.confirm_calls(entry[1])
+    
+    def fix_query(
+        self,
+        query: Dict[str, Any],
+        error_message: str,
+        dataset_schemas: Dict[str, Any],
+        target_index: str
+    ) -> Dict[str, Any]:
+        """Ask LLM to fix a query that returned 0 hits.
+        
+        Args:
+            query: The query that failed
+            error_message: Error message or description
+            dataset_schemas: Dataset schema information
+            target_index: Target index name
+            
+        Returns:
+            Fixed query dict
+        """
+        return self.engine.run(self.fix_query_async(
+            query,
+            error_message,
+            dataset_schemas,
+            target_index
+        ))
+    
+    async def fix_query_async(
+        self,
+        query: Dict[str, Any],
+        error_message: str,
+        dataset_schemas: Dict[str, Any],
+        target_index: str
+    ) -> Dict[str, Any]:
+        """Ask LLM to fix a query that returned 0 hits (async version of fix_query).
+        
+        Args:
+            query: The query that failed
+            error_message: Error message or description
+            dataset_schemas: Dataset schema information
+            target_index: Target index name
+            
+        Returns:
+            Fixed query dict
+        """
+        system_prompt = """You are an expert at fixing Elasticsearch queries.
+Your task is to fix queries that return 0 results by adjusting fields, query text, or structure."""
+
+        user_prompt = f"""Fix this Elasticsearch query that returned 0 results:
 
-Existing Code Examples from Documentation:
-{json.dumps(existing_examples or parsed_doc.get('code_examples', []), indent=2)}
+Query:
+{json.dumps(query, indent=2)}
 
-Example LabConfig Structure (for reference):
-{self._load_existing_config_example()}
+Error/Issue: {error_message}
 
-Generate a complete LabConfig JSON object with:
-- queryLanguage: "query_dsl"
-- queryType: "{parsed_doc.get('query_type', '')}"
-- displayName: Human-readable name (e.g., "Match Query")
-- description: The description from the doc
-- docUrl: The doc URL
-- keyDisplayFields: Use the key_display_field from dataset_schemas
-- searchFields: Use the searchable_text_fields from dataset_schemas
-- sampleQueries: Realistic query strings that will return results
-- queryStructure: Determine the fieldPath based on query type (inline, default_field, fields, or nested)
-- examples: 4-6 diverse examples with id, title, description, template (JSON string), index, tryThis, and tooltips
+Target Index: {target_index}
 
-Return ONLY the JSON object, no markdown formatting."""
+Available Fields for {target_index}:
+{self.context.schema_block(dataset_schemas, target_index)}{self._value_profile_section([target_index])}
+
+Return ONLY the fixed query as a JSON object with a top-level "query" key. Do not include explanations or markdown."""
+        
+        cache_key = self._call_cache_key('fix_query', {
+            'query': query,
+            'error': self._normalize_error(error_message),
+            'index': target_index,
+            'schema': dataset_schemas.get(target_index, {})
+        }, temperature=0.3)
+        if cache_key:
+            cached = self.cache_manager.get_call('fix_query', cache_key)
+            if cached:
+                return cached
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            fixed_query = await self._chat_json(
+                'fixed_query',
+                FIXED_QUERY_SCHEMA,
+                'fix_query',
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                temperature=0.7,
-                max_tokens=4000
+                temperature=0.3,
+                max_tokens=2000
             )
+            if cache_key:
+                # Cached once ESValidator confirms the fix returns hits
+                self.cache_manager.defer_call('fix_query', cache_key, fixed_query)
+            return fixed_query
             
-            content = response.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if content.startswith('```'):
-                # Extract JSON from code block
-                lines = content.split('\n')
-                json_lines = []
-                in_code_block = False
-                for line in lines:
-                    if line.strip().startswith('```'):
-                        in_code_block = not in_code_block
-                        continue
-                    if in_code_block:
-                        json_lines.append(line)
-                content = '\n'.join(json_lines)
-            
-            # Parse JSON
-            lab_config = json.loads(content)
-            
-            # Post-process: ensure required fields exist with defaults
-            if 'keyDisplayFields' not in lab_config or not lab_config['keyDisplayFields']:
-                lab_config['keyDisplayFields'] = {
-                    'products': 'product_name',
-                    'product_reviews': 'review_title',
-                    'product_users': 'username'
-                }
-            
-            if 'searchFields' not in lab_config or not lab_config['searchFields']:
-                lab_config['searchFields'] = {
-                    'products': 'product_name',
-                    'product_reviews': 'review_text',
-                    'product_users': 'interests'
-                }
-            
-            if 'sampleQueries' not in lab_config or not lab_config['sampleQueries']:
-                lab_config['sampleQueries'] = {
-                    'products': 'wireless',
-                    'product_reviews': 'comfortable',
-                    'product_users': 'Electronics'
-                }
-            
-            if 'queryStructure' not in lab_config or not lab_config['queryStructure']:
-                lab_config['queryStructure'] = {
-                    'type': 'inline',
-                    'fieldPath': ''
-                }
-            
-            # Ensure examples field exists (even if empty)
-            if 'examples' not in lab_config:
-                lab_config['examples'] = []
-            
-            # Post-process: ensure tryThis is always an array of strings
-            for example in lab_config.get('examples', []):
-                if 'tryThis' in example:
-                    try_this = example['tryThis']
-                    if isinstance(try_this, str):
-                        # LLM returned a single string - wrap in array
-                        example['tryThis'] = [try_this]
-                    elif isinstance(try_this, list):
-                        # Filter out any single-character entries (LLM bug)
-                        example['tryThis'] = [
-                            s for s in try_this 
-                            if isinstance(s, str) and len(s) > 5
-                        ]
-            
-            # Post-process: Fix ES|QL queries - convert single quotes to double quotes
-            # ES|QL requires double quotes for string literals, but LLMs often generate single quotes
-            # Also generate multi-index templates for ES|QL
-            if query_language == 'esql':
-                import re
-                for example in lab_config.get('examples', []):
-                    if 'template' in example and isinstance(example['template'], str):
-                        # Replace single-quoted strings with double-quoted strings
-                        # Match 'value' and replace with "value"
-                        original_template = re.sub(r"'([^']*)'", r'"\1"', example['template'])
-                        
-                        # Generate multi-index templates
-                        multi_index_template = self._generate_multi_index_esql_template(
-                            original_template,
-                            example,
-                            dataset_schemas
-                        )
-                        example['template'] = multi_index_template
-            
-            # RETRY IF NO EXAMPLES GENERATED
-            examples = lab_config.get('examples', [])
-            if len(examples) == 0:
-                # Don't cache empty results - retry up to 3 times
-                for retry in range(3):
-                    print(f"[LLM] No examples generated, retrying ({retry + 1}/3)...")
-                    retry_response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=[
-                            {"role": "system", "content": system_prompt + "\n\nIMPORTANT: You MUST generate at least 4 examples. Do not return an empty examples array."},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        temperature=0.8,  # Slightly higher temperature for variety
-                        max_tokens=4000
-                    )
-                    retry_content = retry_response.choices[0].message.content.strip()
-                    
-                    # Remove markdown if present
-                    if retry_content.startswith('```'):
-                        lines = retry_content.split('\n')
-                        json_lines = []
-                        in_block = False
-                        for line in lines:
-                            if line.strip().startswith('```'):
-                                in_block = not in_block
-                                continue
-                            if in_block:
-                                json_lines.append(line)
-                        retry_content = '\n'.join(json_lines)
-                    
-                    try:
-                        retry_config = json.loads(retry_content)
-                        if len(retry_config.get('examples', [])) > 0:
-                            # Merge retry examples into lab_config
-                            lab_config['examples'] = retry_config.get('examples', [])
-                            print(f"[LLM] Retry successful - got {len(lab_config['examples'])} examples")
-                            
-                            # Apply ES|QL multi-index template processing for retried examples
-                            if query_language == 'esql':
-                                for example in lab_config['examples']:
-                                    if 'template' in example and isinstance(example['template'], str):
-                                        # Fix single quotes to double quotes
-                                        import re
-                                        original_template = re.sub(r"'([^']*)'", r'"\1"', example['template'])
-                                        
-                                        # Generate multi-index templates
-                                        multi_index_template = self._generate_multi_index_esql_template(
-                                            original_template,
-                                            example,
-                                            dataset_schemas
-                                        )
-                                        example['template'] = multi_index_template
-                            
-                            break
-                    except json.JSONDecodeError:
-                        continue
-                
-                # Final check - if still no examples, raise error
-                if len(lab_config.get('examples', [])) == 0:
-                    raise ValueError("LLM failed to generate examples after 3 retries")
-            
-            # Only cache if we have examples
-            if self.cache_manager and len(lab_config.get('examples', [])) > 0:
-                self.cache_manager.set_llm_response(content_hash, lab_config)
-            
-            return lab_config
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse LLM response as JSON: {e}\nResponse: {content}")
         except Exception as e:
-            raise RuntimeError(f"LLM generation failed: {e}")
+            raise RuntimeError(f"Query fix failed: {e}")
     
-    def fix_query(
+    def fix_query_candidates(
         self,
         query: Dict[str, Any],
         error_message: str,
         dataset_schemas: Dict[str, Any],
-        target_index: str
-    ) -> Dict[str, Any]:
-        """Ask LLM to fix a query that returned 0 hits.
+        target_index: str,
+        count: int = 3
+    ) -> List[Dict[str, Any]]:
+        """Ask LLM for several alternative fixes of a query in one call.
         
         Args:
             query: The query that failed
             error_message: Error message or description
             dataset_schemas: Dataset schema information
             target_index: Target index name
+            count: Number of candidate queries to request
             
         Returns:
-            Fixed query dict
+            List of candidate query dicts, most promising first
+        """
+        return self.engine.run(self.fix_query_candidates_async(
+            query,
+            error_message,
+            dataset_schemas,
+            target_index,
+            count
+        ))
+    
+    async def fix_query_candidates_async(
+        self,
+        query: Dict[str, Any],
+        error_message: str,
+        dataset_schemas: Dict[str, Any],
+        target_index: str,
+        count: int = 3
+    ) -> List[Dict[str, Any]]:
+        """Ask LLM for several alternative fixes (async version of fix_query_candidates).
+        
+        Args:
+            query: The query that failed
+            error_message: Error message or description
+            dataset_schemas: Dataset schema information
+            target_index: Target index name
+            count: Number of candidate queries to request
+            
+        Returns:
+            List of candidate query dicts, most promising first
         """
         system_prompt = """You are an expert at fixing Elasticsearch queries.
-Your task is to fix queries that return 0 results by adjusting fields, query text, or structure."""
-
+Your task is to fix queries that return 0 results by adjusting fields, query text, or structure.
+You propose several DIFFERENT fixes at once so they can be tested together."""
+        
         user_prompt = f"""Fix this Elasticsearch query that returned 0 results:
 
 Query:
@@ -452,41 +1476,52 @@ Error/Issue: {error_message}
 Target Index: {target_index}
 
 Available Fields for {target_index}:
-{json.dumps(dataset_schemas.get(target_index, {}), indent=2)}
+{self.context.schema_block(dataset_schemas, target_index)}{self._value_profile_section([target_index])}
 
-Return ONLY the fixed query as a JSON object. Do not include explanations or markdown."""
+Propose {count} different fixed queries that keep the same learning objective. Vary the
+fields, values (prefer values from keyword_field_values) and how strict the query is, so
+that at least one of them is very likely to return results. Order them from most to least
+faithful to the original query.
 
+Return ONLY a JSON object of the form {{"candidates": [{{"query": ...}}, ...]}}. Do not include explanations or markdown."""
+        
+        cache_key = self._call_cache_key('fix_query_candidates', {
+            'query': query,
+            'error': self._normalize_error(error_message),
+            'index': target_index,
+            'schema': dataset_schemas.get(target_index, {}),
+            'count': count
+        }, temperature=0.7)
+        if cache_key:
+            cached = self.cache_manager.get_call('fix_query', cache_key)
+            if cached:
+                return cached
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            parsed = await self._chat_json(
+                'fixed_query_candidates',
+                FIXED_QUERY_CANDIDATES_SCHEMA,
+                'fix_query',
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                temperature=0.3,
-                max_tokens=2000
+                temperature=0.7,  # Higher temperature so candidates differ
+                max_tokens=3000
             )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if content.startswith('```'):
-                lines = content.split('\n')
-                json_lines = []
-                in_code_block = False
-                for line in lines:
-                    if line.strip().startswith('```'):
-                        in_code_block = not in_code_block
-                        continue
-                    if in_code_block:
-                        json_lines.append(line)
-                content = '\n'.join(json_lines)
-            
-            fixed_query = json.loads(content)
-            return fixed_query
-            
         except Exception as e:
             raise RuntimeError(f"Query fix failed: {e}")
+        
+        candidates = [
+            candidate for candidate in (parsed.get('candidates') or [] if isinstance(parsed, dict) else [])
+            if isinstance(candidate, dict) and candidate
+        ][:count]
+        if cache_key:
+            # Only the candidate ESValidator keeps is cached, so reruns don't
+            # replay candidates that already failed
+            for candidate in candidates:
+                self.cache_manager.defer_call('fix_query', cache_key, [candidate], query=candidate)
+        return candidates
     
     def fix_esql_query(
         self,
@@ -508,13 +1543,36 @@ Return ONLY the fixed query as a JSON object. Do not include explanations or mar
         Returns:
             Fixed ES|QL query string
         """
-        import re
+        return self.engine.run(self.fix_esql_query_async(
+            query,
+            error_message,
+            dataset_schemas,
+            target_index
+        ))
+    
+    async def fix_esql_query_async(
+        self,
+        query: str,
+        error_message: str,
+        dataset_schemas: Dict[str, Any],
+        target_index: str
+    ) -> str:
+        """Ask MCP or LLM to fix an ES|QL query (async version of fix_esql_query).
         
+        Args:
+            query: The ES|QL query string that failed
+            error_message: Error message or description
+            dataset_schemas: Dataset schema information
+            target_index: Target index name
+            
+        Returns:
+            Fixed ES|QL query string
+        """
         # Use MCP for fixing if available - it has access to actual data
         if self.mcp_client and "0 rows" in error_message.lower():
             try:
                 # Ask MCP to generate a DIFFERENT query that will return data
-                fixed = self.mcp_client.generate_esql(
+                fixed = await self.mcp_client.generate_esql_async(
                     query=f"Generate an ES|QL query for {target_index} that returns at least 3 documents. "
                           f"The previous query returned 0 results: {query}. "
                           f"Use DIFFERENT field values that actually exist in the data. "
@@ -540,7 +1598,7 @@ CRITICAL ES|QL RULES:
 4. Check field names match the schema exactly
 5. If a query returns 0 results, try BROADER search terms or DIFFERENT field values
 
-Return ONLY the fixed ES|QL query string. No explanations, no markdown, no code blocks."""
+Return ONLY a JSON object of the form {"esql": "<fixed ES|QL query>"}. No explanations, no markdown, no code blocks."""
 
         user_prompt = f"""Fix this ES|QL query that returned 0 results:
 
@@ -554,18 +1612,31 @@ Schema for {target_index}:
 - Fields: {schema_info.get('fields', [])}
 - Searchable text fields: {schema_info.get('searchable_text_fields', [])}
 - Keyword field values: {json.dumps(schema_info.get('keyword_field_values', {}), indent=2)}
-- Working ES|QL examples: {schema_info.get('esql_examples', [])}
+- Working ES|QL examples: {schema_info.get('esql_examples', [])}{self._value_profile_section([target_index])}
 
 IMPORTANT: If the query uses specific field values that don't exist, try:
 - Using wildcards (LIKE "*pattern*") instead of exact matches
 - Removing restrictive WHERE clauses
 - Using different field values from the keyword_field_values above
 
-Return ONLY the fixed ES|QL query string (no quotes around it, no explanations)."""
+Return ONLY the JSON object with the fixed ES|QL query in "esql" (no explanations)."""
+        
+        cache_key = self._call_cache_key('fix_esql', {
+            'query': query,
+            'error': self._normalize_error(error_message),
+            'index': target_index,
+            'schema': schema_info
+        }, temperature=0.5)
+        if cache_key:
+            cached = self.cache_manager.get_call('fix_esql', cache_key)
+            if cached:
+                return cached
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            parsed = await self._chat_json(
+                'fixed_esql',
+                ESQL_QUERY_SCHEMA,
+                'fix_esql',
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -574,56 +1645,410 @@ Return ONLY the fixed ES|QL query string (no quotes around it, no explanations).
                 max_tokens=500
             )
             
-            content = response.choices[0].message.content.strip()
-            
-            # Remove any markdown code blocks
-            if content.startswith('```'):
-                lines = content.split('\n')
-                content_lines = []
-                in_block = False
-                for line in lines:
-                    if line.strip().startswith('```'):
-                        in_block = not in_block
-                        continue
-                    if in_block:
-                        content_lines.append(line)
-                content = '\n'.join(content_lines).strip()
-            
-            # Remove surrounding quotes if LLM added them
-            if (content.startswith('"') and content.endswith('"')) or \
-               (content.startswith("'") and content.endswith("'")):
-                content = content[1:-1]
+            content = self._clean_esql_response(parsed.get('esql', '') if isinstance(parsed, dict) else '')
             
-            # Ensure double quotes for string literals (fix any single quotes)
-            content = re.sub(r"'([^']*)'", r'"\1"', content)
+            if cache_key and content:
+                # Cached once ESValidator confirms the fix returns rows
+                self.cache_manager.defer_call('fix_esql', cache_key, content)
             
             return content
             
         except Exception as e:
             raise RuntimeError(f"ES|QL query fix failed: {e}")
     
-    def _generate_multi_index_esql_template(
+    def repair_queries(
+        self,
+        failures: List[Dict[str, Any]],
+        dataset_schemas: Dict[str, Any],
+        query_language: str = 'query_dsl'
+    ) -> Dict[str, Any]:
+        """Ask LLM to fix several failing queries of one lab in a single call.
+        
+        Args:
+            failures: Dicts with key, index, query and error entries
+            dataset_schemas: Dataset schema information
+            query_language: 'query_dsl' or 'esql'
+            
+        Returns:
+            Dict mapping failure key to its fixed query (a query dict with a
+            top-level "query" key, or an ES|QL string); keys without a fix
+            are omitted
+        """
+        return self.engine.run(self.repair_queries_async(
+            failures,
+            dataset_schemas,
+            query_language
+        ))
+    
+    async def repair_queries_async(
+        self,
+        failures: List[Dict[str, Any]],
+        dataset_schemas: Dict[str, Any],
+        query_language: str = 'query_dsl'
+    ) -> Dict[str, Any]:
+        """Ask LLM to fix several failing queries (async version of repair_queries).
+        
+        Args:
+            failures: Dicts with key, index, query and error entries
+            dataset_schemas: Dataset schema information
+            query_language: 'query_dsl' or 'esql'
+            
+        Returns:
+            Dict mapping failure key to its fixed query
+        """
+        if not failures:
+            return {}
+        
+        is_esql = query_language == 'esql'
+        namespace = 'fix_esql' if is_esql else 'fix_query'
+        indices = sorted({failure['index'] for failure in failures})
+        
+        # Each index schema is sent once, however many failures target it
+        schema_context = "\n\n".join(
+            f"Schema for {index}:\n{self.context.schema_block(dataset_schemas, index)}"
+            for index in indices
+        )
+        failure_context = "\n\n".join(
+            f"Key: {failure['key']}\n"
+            f"Index: {failure['index']}\n"
+            f"Query: {failure['query'] if is_esql else json.dumps(failure['query'], indent=2)}\n"
+            f"Error/Issue: {failure['error']}"
+            for failure in failures
+        )
+        
+        if is_esql:
+            system_prompt = """You are an expert at fixing ES|QL queries.
+Your task is to fix queries that return 0 results or have errors.
+
+CRITICAL ES|QL RULES:
+1. ES|QL uses DOUBLE QUOTES for string literals, NOT single quotes
+2. Use LIKE with wildcards for text search: LIKE "*term*"
+3. For exact matches on keyword fields, use == with double quotes
+4. Check field names match the schema exactly
+5. If a query returns 0 results, try BROADER search terms or DIFFERENT field values"""
+            answer_format = '{"fixes": {"<key>": {"esql": "<fixed ES|QL query>"}, ...}}'
+        else:
+            system_prompt = """You are an expert at fixing Elasticsearch queries.
+Your task is to fix queries that return 0 results by adjusting fields, query text, or structure."""
+            answer_format = '{"fixes": {"<key>": {"query": {...}}, ...}}'
+        
+        user_prompt = f"""Fix each of these queries. Each one failed against the index it names.
+
+{failure_context}
+
+{schema_context}{self._value_profile_section(indices)}
+
+Keep each query's learning objective. Prefer field values from keyword_field_values so the
+fixed queries return results.
+
+Return ONLY a JSON object of the form {answer_format} with one entry per key above. Do not include explanations or markdown."""
+        
+        route = 'fix_esql' if is_esql else 'fix_query'
+        cache_key = self._call_cache_key('repair_batch', {
+            'language': query_language,
+            'failures': [
+                {
+                    'key': failure['key'],
+                    'index': failure['index'],
+                    'query': failure['query'],
+                    'error': self._normalize_error(failure['error'])
+                }
+                for failure in failures
+            ],
+            'schemas': {index: dataset_schemas.get(index, {}) for index in indices}
+        }, temperature=0.3, route=route)
+        if cache_key:
+            cached = self.cache_manager.get_call(namespace, cache_key)
+            if cached:
+                return cached
+        
+        try:
+            parsed = await self._chat_json(
+                'repaired_queries',
+                REPAIR_ESQL_SCHEMA if is_esql else REPAIR_QUERIES_SCHEMA,
+                route,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.3,
+                max_tokens=min(GENERATION_MAX_TOKENS, 600 * len(failures))
+            )
+        except Exception as e:
+            raise RuntimeError(f"Batch repair failed: {e}")
+        
+        fixes = {}
+        raw_fixes = parsed.get('fixes') if isinstance(parsed, dict) else None
+        for key, value in (raw_fixes or {}).items():
+            if not isinstance(value, dict):
+                continue
+            if is_esql:
+                esql = self._clean_esql_response(value.get('esql') or '')
+                if esql:
+                    fixes[key] = esql
+            elif isinstance(value.get('query'), dict):
+                fixes[key] = value
+        
+        if cache_key:
+            # Each fix is cached once it validates, so reruns don't replay failed fixes
+            for key, fix in fixes.items():
+                self.cache_manager.defer_call(namespace, cache_key, {key: fix}, query=fix, merge=merge_confirmed)
+        return fixes
+    
+    def _clean_esql_response(self, content: str) -> str:
+        """Strip code fences and surrounding quotes from an ES|QL response.
+        
+        Args:
+            content: Raw LLM response text
+            
+        Returns:
+            ES|QL query string using double-quoted string literals
+        """
+        # Remove any markdown code blocks
+        content = strip_code_fences(content)
+        
+        # Remove surrounding quotes if LLM added them
+        if (content.startswith('"') and content.endswith('"')) or \
+           (content.startswith("'") and content.endswith("'")):
+            content = content[1:-1]
+        
+        # Ensure double quotes for string literals (fix any single quotes)
+        return re.sub(r"'([^']*)'", r'"\1"', content)
+    
+    def _is_usable_esql_variant(self, esql: Any, target_index: str) -> bool:
+        """Check that a generated variant is a non-empty query on the right index.
+        
+        Args:
+            esql: Generated variant
+            target_index: Index the variant must query
+            
+        Returns:
+            True if the variant can be used as-is
+        """
+        if not isinstance(esql, str) or not esql.strip():
+            return False
+        return re.match(rf'^\s*FROM\s+{re.escape(target_index)}\b', esql, re.IGNORECASE) is not None
+    
+    def _translate_esql_example(
         self,
-        original_template: str,
         example: Dict[str, Any],
+        translator: Optional[ESQLTranslator]
+    ) -> Tuple[str, Dict[str, str]]:
+        """Normalize an ES|QL example's quotes and translate it to the indices by rule.
+        
+        Args:
+            example: Example with a string ES|QL template
+            translator: Rule translator, or None when rule translation is off
+            
+        Returns:
+            Tuple of (original template, {index: translated query})
+        """
+        # Replace single-quoted strings with double-quoted strings
+        # Match 'value' and replace with "value"
+        original_template = re.sub(r"'([^']*)'", r'"\1"', example['template'])
+        translated = {}
+        if translator:
+            translated, _ = translator.translate_all(original_template, ESQL_INDICES)
+        return original_template, translated
+    
+    async def _expand_esql_examples(
+        self,
+        examples: List[Dict[str, Any]],
+        dataset_schemas: Dict[str, Any]
+    ) -> None:
+        """Replace each ES|QL example template with per-index variants, in place.
+        
+        Variants are first translated by rule from the original query. In
+        batch mode every variant the translator could not produce is then
+        requested in a single JSON call; only variants that are still
+        missing or unusable fall back to per-index generation, which runs
+        concurrently across examples.
+        
+        Args:
+            examples: Examples with string ES|QL templates
+            dataset_schemas: Dataset schema information
+        """
+        translator = ESQLTranslator(dataset_schemas) if ESQL_RULE_TRANSLATION else None
+        
+        pending = []
+        translated_count = 0
+        for example in examples:
+            if 'template' in example and isinstance(example['template'], str):
+                original_template, translated = self._translate_esql_example(example, translator)
+                translated_count += len(translated)
+                pending.append((example, original_template, translated))
+        
+        if not pending:
+            return
+        
+        if translator:
+            print(f"[ES|QL] Translated {translated_count}/{len(pending) * len(ESQL_INDICES)} index variants by rule")
+        
+        needs_llm = [
+            (position, example, original_template)
+            for position, (example, original_template, translated) in enumerate(pending)
+            if len(translated) < len(ESQL_INDICES)
+        ]
+        
+        batch_variants = {}
+        if ESQL_BATCH_VARIANTS and needs_llm:
+            batch_results = await self._generate_esql_variants_batch(
+                [(example, template) for _, example, template in needs_llm],
+                dataset_schemas
+            )
+            # Re-key batch results from position in needs_llm to position in pending
+            batch_variants = {
+                str(position): batch_results.get(str(batch_position), {})
+                for batch_position, (position, _, _) in enumerate(needs_llm)
+            }
+        
+        async def expand(position, example, original_template, translated):
+            variants = dict(translated)
+            for index, esql in batch_variants.get(str(position), {}).items():
+                if index in ESQL_INDICES and index not in variants and self._is_usable_esql_variant(esql, index):
+                    variants[index] = esql
+            missing = [index for index in ESQL_INDICES if index not in variants]
+            if missing:
+                if batch_variants:
+                    print(f"[LLM] Batch missing {', '.join(missing)} for '{example.get('title', '')}', generating individually")
+                variants.update(await self._generate_multi_index_esql_template(
+                    original_template,
+                    example,
+                    dataset_schemas,
+                    indices=missing
+                ))
+            example['template'] = {index: variants[index] for index in ESQL_INDICES}
+        
+        await asyncio.gather(*(
+            expand(position, example, original_template, translated)
+            for position, (example, original_template, translated) in enumerate(pending)
+        ))
+    
+    async def _generate_esql_variants_batch(
+        self,
+        pending: List[Any],
         dataset_schemas: Dict[str, Any]
+    ) -> Dict[str, Dict[str, str]]:
+        """Generate per-index ES|QL variants for several examples in one call.
+        
+        Args:
+            pending: List of (example, original_template) tuples
+            dataset_schemas: Dataset schema information
+            
+        Returns:
+            Dict mapping example position (as a string) to {index: esql};
+            empty if the call failed
+        """
+        example_specs = [
+            {
+                'key': str(position),
+                'title': example.get('title', ''),
+                'description': example.get('description', ''),
+                'original_index': example.get('index', 'products'),
+                'original_query': original_template
+            }
+            for position, (example, original_template) in enumerate(pending)
+        ]
+        schema_specs = {
+            index: {
+                'fields': dataset_schemas.get(index, {}).get('fields', []),
+                'searchable_text_fields': dataset_schemas.get(index, {}).get('searchable_text_fields', []),
+                'keyword_field_values': dataset_schemas.get(index, {}).get('keyword_field_values', {}),
+                'esql_examples': dataset_schemas.get(index, {}).get('esql_examples', [])
+            }
+            for index in ESQL_INDICES
+        }
+        
+        temperature = 0.5
+        cache_key = self._call_cache_key('esql_batch', {
+            'examples': example_specs,
+            'schemas': schema_specs
+        }, temperature=temperature)
+        if cache_key:
+            cached = self.cache_manager.get_call('esql_batch', cache_key)
+            if cached:
+                return cached
+        
+        system_prompt = f"""You are an expert at creating equivalent ES|QL queries for different Elasticsearch indices.
+For each example you receive, write one ES|QL query per index ({', '.join(ESQL_INDICES)}) that achieves the same learning objective as the original query.
+
+CRITICAL ES|QL RULES:
+1. ES|QL uses DOUBLE QUOTES for string literals, NOT single quotes
+2. Use LIKE with wildcards for text search: LIKE "*term*"
+3. For exact matches on keyword fields, use == with double quotes
+4. Each query must start with FROM <index> and only use fields that exist in that index's schema
+5. Preserve the same query structure and operations (WHERE, KEEP, SORT, LIMIT, etc.)
+6. Every query must return results: use realistic values from keyword_field_values or LIKE patterns
+
+Return ONLY a JSON object of the form:
+{{"variants": {{"<example key>": {{"products": "<ES|QL>", "product_reviews": "<ES|QL>", "product_users": "<ES|QL>"}}}}}}"""
+        
+        user_prompt = f"""Examples:
+{json.dumps(example_specs, indent=2)}
+
+Index schemas:
+{json.dumps(schema_specs, indent=2)}
+
+Return the variants for every example key."""
+        
+        try:
+            parsed = await self._chat_json(
+                'esql_variants',
+                ESQL_VARIANTS_SCHEMA,
+                'esql_variant',
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=min(4000, 400 * len(ESQL_INDICES) * len(pending))
+            )
+        except Exception as e:
+            print(f"[LLM] Batched ES|QL variant generation failed, generating per index: {e}")
+            return {}
+        
+        variants = {}
+        for key, per_index in (parsed.get('variants') or {}).items():
+            if isinstance(per_index, dict):
+                variants[str(key)] = {
+                    index: self._clean_esql_response(esql)
+                    for index, esql in per_index.items()
+                    if isinstance(esql, str)
+                }
+        
+        print(f"[LLM] Generated ES|QL variants for {len(variants)}/{len(pending)} examples in one call")
+        if cache_key:
+            # Each variant is cached once it validates, like esql_variant
+            for key, per_index in variants.items():
+                for index, esql in per_index.items():
+                    self.cache_manager.defer_call(
+                        'esql_batch', cache_key, {key: {index: esql}}, query=esql, merge=merge_confirmed
+                    )
+        return variants
+    
+    async def _generate_multi_index_esql_template(
+        self,
+        original_template: str,
+        example: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        indices: Optional[List[str]] = None
     ) -> Dict[str, str]:
         """Generate ES|QL query variations for all three indices.
         
         Uses MCP Agent Builder when available for better query generation.
-        Falls back to OpenAI if MCP is not configured.
+        Falls back to OpenAI if MCP is not configured. Indices are generated
+        concurrently.
         
         Args:
             original_template: The original ES|QL query template
             example: The example dict (for context like title, description)
             dataset_schemas: Dataset schema information
+            indices: Indices to generate variants for (defaults to all three)
             
         Returns:
             Dict mapping index names to ES|QL query strings
         """
-        indices = ['products', 'product_reviews', 'product_users']
-        multi_template = {}
-        
+        indices = indices or ESQL_INDICES
         # Get the original index from the example
         original_index = example.get('index', 'products')
         
@@ -632,12 +2057,12 @@ Return ONLY the fixed ES|QL query string (no quotes around it, no explanations).
         
         # Generate query for each index using MCP or OpenAI
         # Each index gets its own query with data that EXISTS in that index
-        for target_index in indices:
+        async def generate_variant(target_index: str) -> str:
             # Use MCP for better query generation - ask for queries that WILL return data
             if self.mcp_client:
                 try:
                     # Ask MCP to generate a query that demonstrates the concept AND returns data
-                    esql = self.mcp_client.generate_esql(
+                    esql = await self.mcp_client.generate_esql_async(
                         query=f"Generate an ES|QL query on the {target_index} index that demonstrates: {example_title}. "
                               f"The query MUST return at least 3 documents. Use field values that exist in the actual data.",
                         index=target_index,
@@ -645,9 +2070,8 @@ Return ONLY the fixed ES|QL query string (no quotes around it, no explanations).
                                 f"Look at the actual data in the index and use real field values. "
                                 f"Pattern to demonstrate: {original_template}"
                     )
-                    multi_template[target_index] = esql
                     print(f"[MCP] Generated ES|QL for {target_index}")
-                    continue
+                    return esql
                 except Exception as e:
                     print(f"[MCP] Failed for {target_index}, falling back to OpenAI: {e}")
             
@@ -691,9 +2115,22 @@ Generate an equivalent query that:
 
 Return ONLY the ES|QL query string (no quotes around it, no explanations)."""
             
+            cache_key = self._call_cache_key('esql_variant', {
+                'original_template': original_template,
+                'original_index': original_index,
+                'title': example.get('title', ''),
+                'description': example.get('description', ''),
+                'target_index': target_index,
+                'schema': schema_info
+            }, temperature=0.5)
+            if cache_key:
+                cached = self.cache_manager.get_call('esql_variant', cache_key)
+                if cached:
+                    return cached
+            
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
+                response = await self._chat(
+                    'esql_variant',
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
@@ -702,36 +2139,19 @@ Return ONLY the ES|QL query string (no quotes around it, no explanations)."""
                     max_tokens=500
                 )
                 
-                content = response.choices[0].message.content.strip()
-                
-                # Remove any markdown code blocks
-                if content.startswith('```'):
-                    lines = content.split('\n')
-                    content_lines = []
-                    in_block = False
-                    for line in lines:
-                        if line.strip().startswith('```'):
-                            in_block = not in_block
-                            continue
-                        if in_block:
-                            content_lines.append(line)
-                    content = '\n'.join(content_lines).strip()
-                
-                # Remove surrounding quotes if LLM added them
-                if (content.startswith('"') and content.endswith('"')) or \
-                   (content.startswith("'") and content.endswith("'")):
-                    content = content[1:-1]
+                content = self._clean_esql_response(response.choices[0].message.content)
                 
-                # Ensure double quotes for string literals (fix any single quotes)
-                import re
-                content = re.sub(r"'([^']*)'", r'"\1"', content)
+                if cache_key and content:
+                    # Cached once ESValidator confirms the variant returns rows
+                    self.cache_manager.defer_call('esql_variant', cache_key, content)
                 
-                multi_template[target_index] = content
+                return content
                 
             except Exception as e:
                 # If generation fails, fall back to a simple FROM-only query
                 print(f"[WARNING] Failed to generate {target_index} variation: {e}")
-                multi_template[target_index] = f"FROM {target_index} | LIMIT 10"
+                return f"FROM {target_index} | LIMIT 10"
         
-        return multi_template
+        variants = await asyncio.gather(*(generate_variant(target_index) for target_index in indices))
+        return dict(zip(indices, variants))
 
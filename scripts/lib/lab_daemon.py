@@ -0,0 +1,212 @@
+"""Job socket for the long-running generation daemon.
+
+Only the standard library is imported here, so the thin client
+(labctl.py) starts in milliseconds instead of importing the generation
+stack.
+"""
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+
+# Unix socket the daemon listens on
+DEFAULT_SOCKET_PATH = os.getenv("GENERATE_LABS_SOCKET", ".generate-labs.sock")
+
+# Commands a client can send
+COMMANDS = ('ping', 'generate', 'shutdown')
+
+
+class _EventStream(io.TextIOBase):
+    """Stdout replacement that sends every printed line to the job's client.
+    
+    Lines are also written to the daemon's own stdout.
+    """
+    
+    def __init__(self, emit: Callable[[Dict[str, Any]], None], echo: Any):
+        self.emit = emit
+        self.echo = echo
+        self._buffer = ''
+        self._lock = threading.Lock()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, text: str) -> int:
+        self.echo.write(text)
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self.emit({'event': 'log', 'line': line})
+        return len(text)
+    
+    def flush(self) -> None:
+        self.echo.flush()
+    
+    def close_stream(self) -> None:
+        """Send a trailing partial line."""
+        with self._lock:
+            line, self._buffer = self._buffer, ''
+        if line:
+            self.emit({'event': 'log', 'line': line})
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Accepts jobs on a Unix socket and runs them one at a time.
+    
+    A client sends one JSON request line ({"command": ...}) and receives
+    JSON event lines until the connection closes:
+    - {"event": "queued"} while another job runs
+    - {"event": "log", "line": ...} for every line the job prints
+    - {"event": "result", ...} events emitted by the job handler
+    - {"event": "done", ...} or {"event": "error", "message": ...}
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, handler: Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Dict[str, Any]]):
+        """Bind the socket.
+        
+        Args:
+            socket_path: Path of the Unix socket (a stale socket file is replaced)
+            handler: Function running a 'generate' request; called with the
+                request and an emit function, returns the 'done' event fields
+                
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket
+        """
+        self.socket_path = str(socket_path)
+        self.job_handler = handler
+        self.job_lock = threading.Lock()
+        self.started_at = time.time()
+        self.jobs_run = 0
+        
+        if os.path.exists(self.socket_path):
+            if ping(self.socket_path) is not None:
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        super().__init__(self.socket_path, _RequestHandler)
+    
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection."""
+    
+    def emit(self, event: Dict[str, Any]) -> None:
+        # A client that went away doesn't stop the job
+        try:
+            self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+            self.wfile.flush()
+        except OSError:
+            pass
+    
+    def handle(self) -> None:
+        server: JobServer = self.server
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8') or '{}')
+        except json.JSONDecodeError as e:
+            self.emit({'event': 'error', 'message': f"Invalid request: {e}"})
+            return
+        
+        command = request.get('command')
+        if command == 'ping':
+            self.emit({
+                'event': 'done',
+                'pid': os.getpid(),
+                'uptime': round(time.time() - server.started_at, 1),
+                'jobs_run': server.jobs_run,
+                'busy': server.job_lock.locked()
+            })
+        elif command == 'shutdown':
+            self.emit({'event': 'done', 'message': 'Shutting down'})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        elif command == 'generate':
+            self._run_job(request)
+        else:
+            self.emit({'event': 'error', 'message': f"Unknown command '{command}' (expected one of: {', '.join(COMMANDS)})"})
+    
+    def _run_job(self, request: Dict[str, Any]) -> None:
+        server: JobServer = self.server
+        if server.job_lock.locked():
+            self.emit({'event': 'queued'})
+        
+        with server.job_lock:
+            # Jobs run one at a time, so all output of the process belongs to this job
+            stream = _EventStream(self.emit, sys.__stdout__)
+            stdout = sys.stdout
+            sys.stdout = stream
+            try:
+                done = server.job_handler(request, self.emit)
+                stream.close_stream()
+                self.emit({'event': 'done', **(done or {})})
+            except Exception as e:
+                stream.close_stream()
+                self.emit({'event': 'error', 'message': str(e)})
+            finally:
+                sys.stdout = stdout
+                server.jobs_run += 1
+
+
+def send_request(
+    socket_path: str,
+    request: Dict[str, Any],
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timeout: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Send a request to the daemon and stream its events.
+    
+    Args:
+        socket_path: Path of the daemon's Unix socket
+        request: Request dict ({"command": ...})
+        on_event: Called with every event, in order
+        timeout: Socket timeout in seconds (None waits for the job)
+        
+    Returns:
+        The final 'done' or 'error' event, or None if the connection closed
+        without one
+        
+    Raises:
+        OSError: If the daemon is not running
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(socket_path))
+        client.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        final = None
+        with client.makefile('r', encoding='utf-8') as events:
+            for line in events:
+                event = json.loads(line)
+                if on_event:
+                    on_event(event)
+                if event.get('event') in ('done', 'error'):
+                    final = event
+        return final
+
+
+def ping(socket_path: str = DEFAULT_SOCKET_PATH) -> Optional[Dict[str, Any]]:
+    """Check whether a daemon is listening.
+    
+    Args:
+        socket_path: Path of the daemon's Unix socket
+        
+    Returns:
+        Daemon status (pid, uptime, jobs_run, busy) or None if not running
+    """
+    if not Path(socket_path).exists():
+        return None
+    try:
+        return send_request(socket_path, {'command': 'ping'}, timeout=5)
+    except OSError:
+        return None
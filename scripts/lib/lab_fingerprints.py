@@ -0,0 +1,126 @@
+"""Fingerprints of the inputs each lab was generated from, for --changed-only runs."""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+from doc_parser import doc_fingerprint
+
+
+# Manifest stored next to the dataset schemas, committed with the labs
+FINGERPRINTS_FILE = Path(__file__).parent.parent / "data" / "lab_fingerprints.json"
+
+
+def schema_fingerprint(dataset_schemas: Dict[str, Any]) -> str:
+    """Hash dataset schemas.
+    
+    Args:
+        dataset_schemas: Dataset schema information
+        
+    Returns:
+        SHA256 hex digest
+    """
+    return hashlib.sha256(json.dumps(dataset_schemas, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class LabFingerprints:
+    """Records the source, schema and prompt fingerprints of generated labs.
+    
+    The source fingerprint only covers the parts of the doc page the
+    generation prompt uses (see doc_fingerprint), so unrelated edits to a
+    page don't count as a change.
+    """
+    
+    def __init__(self, fingerprints_file: Path = FINGERPRINTS_FILE):
+        """Initialize fingerprint manifest.
+        
+        Args:
+            fingerprints_file: Path to the manifest
+        """
+        self.fingerprints_file = Path(fingerprints_file)
+        self._lock = threading.Lock()
+        self.labs = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.fingerprints_file.exists():
+            return {}
+        try:
+            return json.loads(self.fingerprints_file.read_text(encoding='utf-8')).get('labs', {})
+        except (json.JSONDecodeError, IOError):
+            return {}
+    
+    def has_record(self, slug: str) -> bool:
+        """Check whether a lab has recorded fingerprints."""
+        with self._lock:
+            return slug in self.labs
+    
+    def changes(
+        self,
+        slug: str,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        prompt_versions: Dict[str, str]
+    ) -> List[str]:
+        """List what changed since a lab was generated.
+        
+        Args:
+            slug: Lab slug
+            parsed_doc: Current parsed documentation structure
+            dataset_schemas: Current dataset schemas
+            prompt_versions: Current prompt versions by task
+            
+        Returns:
+            Reasons to regenerate the lab (empty if nothing changed)
+        """
+        with self._lock:
+            entry = self.labs.get(slug)
+        if entry is None:
+            return ['no fingerprint recorded (seed with --record-fingerprints)']
+        
+        prompt_task = 'generate_esql' if entry.get('query_language') == 'esql' else 'generate'
+        reasons = []
+        if entry.get('source') != (parsed_doc.get('fingerprint') or doc_fingerprint(parsed_doc)):
+            reasons.append('source doc changed')
+        if entry.get('schemas') != schema_fingerprint(dataset_schemas):
+            reasons.append('dataset schemas changed')
+        if entry.get('prompt_version') != prompt_versions.get(prompt_task):
+            reasons.append(f"{prompt_task} prompt version changed")
+        return reasons
+    
+    def record(
+        self,
+        slug: str,
+        url: str,
+        parsed_doc: Dict[str, Any],
+        dataset_schemas: Dict[str, Any],
+        query_language: str,
+        prompt_versions: Dict[str, str]
+    ) -> None:
+        """Record the fingerprints of a generated lab and save the manifest.
+        
+        Args:
+            slug: Lab slug
+            url: Source URL
+            parsed_doc: Parsed documentation structure the lab was generated from
+            dataset_schemas: Dataset schemas the lab was generated for
+            query_language: Query language of the lab
+            prompt_versions: Prompt versions by task
+        """
+        prompt_task = 'generate_esql' if query_language == 'esql' else 'generate'
+        with self._lock:
+            self.labs[slug] = {
+                'url': url,
+                'source': parsed_doc.get('fingerprint') or doc_fingerprint(parsed_doc),
+                'schemas': schema_fingerprint(dataset_schemas),
+                'prompt_version': prompt_versions.get(prompt_task),
+                'query_language': query_language,
+                'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            }
+            self.fingerprints_file.parent.mkdir(parents=True, exist_ok=True)
+            self.fingerprints_file.write_text(
+                json.dumps({'labs': dict(sorted(self.labs.items()))}, indent=2) + '\n',
+                encoding='utf-8'
+            )
@@ -0,0 +1,350 @@
+"""JSON schemas and tolerant parsing for structured LLM responses."""
+
+import json
+import re
+from typing import Any, Dict, List
+
+
+INDEX_NAMES = ['products', 'product_reviews', 'product_users']
+
+# Mirrors LabConfig / QueryExample in shared/frontend/src/types/index.ts.
+# Templates are always strings in the LLM response (a JSON string for
+# Query DSL, an ES|QL query for ES|QL); multi-index ES|QL templates are
+# built afterwards.
+QUERY_EXAMPLE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'string'},
+        'title': {'type': 'string'},
+        'description': {'type': 'string'},
+        'template': {'type': 'string'},
+        'index': {'type': 'string', 'enum': INDEX_NAMES},
+        'tryThis': {'type': 'array', 'items': {'type': 'string'}},
+        'tooltips': {'type': 'object', 'additionalProperties': {'type': 'string'}}
+    },
+    'required': ['id', 'title', 'description', 'template', 'index', 'tryThis', 'tooltips']
+}
+
+PER_INDEX_STRING_SCHEMA = {
+    'type': 'object',
+    'properties': {index: {'type': 'string'} for index in INDEX_NAMES},
+    'required': INDEX_NAMES
+}
+
+LAB_CONFIG_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'queryLanguage': {'type': 'string', 'enum': ['query_dsl', 'esql', 'eql']},
+        'queryType': {'type': 'string'},
+        'displayName': {'type': 'string'},
+        'description': {'type': 'string'},
+        'docUrl': {'type': 'string'},
+        'examples': {'type': 'array', 'items': QUERY_EXAMPLE_SCHEMA},
+        'keyDisplayFields': PER_INDEX_STRING_SCHEMA,
+        'searchFields': {
+            'type': 'object',
+            'properties': {
+                index: {'anyOf': [{'type': 'string'}, {'type': 'array', 'items': {'type': 'string'}}]}
+                for index in INDEX_NAMES
+            },
+            'required': INDEX_NAMES
+        },
+        'sampleQueries': PER_INDEX_STRING_SCHEMA,
+        'queryStructure': {
+            'type': 'object',
+            'properties': {
+                'type': {'type': 'string'},
+                'fieldPath': {'type': 'string', 'enum': ['inline', 'default_field', 'fields', 'nested', '']}
+            },
+            'required': ['type', 'fieldPath']
+        }
+    },
+    'required': [
+        'queryLanguage', 'queryType', 'displayName', 'description', 'docUrl',
+        'examples', 'keyDisplayFields', 'searchFields', 'sampleQueries'
+    ]
+}
+
+# Top-up requests ask for examples only; the rest of the config is kept
+EXAMPLES_SCHEMA = {
+    'type': 'object',
+    'properties': {'examples': {'type': 'array', 'items': QUERY_EXAMPLE_SCHEMA}},
+    'required': ['examples']
+}
+
+# Prose for synthesized examples; their templates are kept as built
+EXAMPLE_PROSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'displayName': {'type': 'string'},
+        'description': {'type': 'string'},
+        'examples': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'string'},
+                    'title': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'tryThis': {'type': 'array', 'items': {'type': 'string'}},
+                    'tooltips': {'type': 'object', 'additionalProperties': {'type': 'string'}}
+                },
+                'required': ['id', 'title', 'description', 'tryThis', 'tooltips']
+            }
+        }
+    },
+    'required': ['displayName', 'description', 'examples']
+}
+
+# fix_query returns an arbitrary Query DSL object, so it is wrapped
+FIXED_QUERY_SCHEMA = {
+    'type': 'object',
+    'properties': {'query': {'type': 'object'}},
+    'required': ['query']
+}
+
+FIXED_QUERY_CANDIDATES_SCHEMA = {
+    'type': 'object',
+    'properties': {'candidates': {'type': 'array', 'items': FIXED_QUERY_SCHEMA}},
+    'required': ['candidates']
+}
+
+ESQL_QUERY_SCHEMA = {
+    'type': 'object',
+    'properties': {'esql': {'type': 'string'}},
+    'required': ['esql']
+}
+
+ESQL_VARIANTS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'variants': {'type': 'object', 'additionalProperties': PER_INDEX_STRING_SCHEMA}
+    },
+    'required': ['variants']
+}
+
+# Batch repair: one fix per failure key ("<example id>::<index>")
+REPAIR_QUERIES_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'fixes': {'type': 'object', 'additionalProperties': FIXED_QUERY_SCHEMA}
+    },
+    'required': ['fixes']
+}
+
+REPAIR_ESQL_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'fixes': {'type': 'object', 'additionalProperties': ESQL_QUERY_SCHEMA}
+    },
+    'required': ['fixes']
+}
+
+
+def response_format(mode: str, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the response_format argument for a chat completion.
+    
+    Args:
+        mode: 'json_schema' or 'json_object'
+        name: Schema name reported to the provider
+        schema: JSON schema for the response
+        
+    Returns:
+        response_format dict
+    """
+    if mode == 'json_schema':
+        return {
+            'type': 'json_schema',
+            'json_schema': {'name': name, 'schema': schema, 'strict': False}
+        }
+    return {'type': 'json_object'}
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding markdown code fence, if any.
+    
+    Args:
+        text: Raw LLM response text
+        
+    Returns:
+        Text inside the first fenced block, or the stripped text
+    """
+    text = text.strip()
+    match = re.search(r'```[\w-]*\s*\n(.*?)(?:```|$)', text, re.DOTALL)
+    if match and text.startswith('```'):
+        return match.group(1).strip()
+    return text
+
+
+def _close_truncated(text: str) -> List[str]:
+    """Build candidate completions for a JSON value cut off mid-stream.
+    
+    Args:
+        text: JSON text starting at the opening brace/bracket
+        
+    Returns:
+        Candidate strings to try parsing, most faithful first
+    """
+    closers = []
+    in_string = False
+    escaped = False
+    end = len(text)
+    
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+        elif char in '}]' and closers:
+            closers.pop()
+            if not closers:
+                end = position + 1
+                break
+    
+    body = text[:end]
+    if not closers:
+        return [body]
+    
+    if in_string:
+        body += '"'
+    body = body.rstrip().rstrip(',:').rstrip()
+    suffix = ''.join(reversed(closers))
+    
+    # Also try without the last (possibly partial) member or dangling key
+    trimmed = re.sub(r',?\s*("(?:[^"\\]|\\.)*"\s*:?\s*)?("(?:[^"\\]|\\.)*"|[\w.+-]+)?$', '', body).rstrip().rstrip(',')
+    return [body + suffix, trimmed + suffix]
+
+
+def parse_json_response(text: str) -> Any:
+    """Parse a JSON object from an LLM response, tolerating common defects.
+    
+    Handles markdown fences, prose before or after the JSON, trailing
+    commas and responses truncated at the token limit (open strings,
+    arrays and objects are closed and a partial last member is dropped).
+    
+    Args:
+        text: Raw LLM response text
+        
+    Returns:
+        Parsed JSON value
+        
+    Raises:
+        ValueError: If no JSON value can be recovered
+    """
+    if text is None:
+        raise ValueError("Empty LLM response")
+    
+    text = strip_code_fences(text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    
+    starts = [position for position in (text.find('{'), text.find('[')) if position >= 0]
+    if not starts:
+        raise ValueError(f"No JSON found in LLM response: {text[:200]}")
+    text = text[min(starts):]
+    
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text)
+        return value
+    except json.JSONDecodeError:
+        pass
+    
+    for candidate in _close_truncated(text):
+        for attempt in (candidate, re.sub(r',\s*([}\]])', r'\1', candidate)):
+            try:
+                return json.loads(attempt)
+            except json.JSONDecodeError:
+                continue
+    
+    raise ValueError(f"Could not recover JSON from LLM response: {text[:200]}")
+
+
+class IncrementalExampleParser:
+    """Extracts finished objects from a JSON array while the response streams.
+    
+    Feed response chunks as they arrive; each object in the top-level array
+    named `array_key` (default "examples") is returned as soon as its closing
+    brace is seen, before the rest of the response has been generated.
+    """
+    
+    def __init__(self, array_key: str = 'examples'):
+        """Initialize parser.
+        
+        Args:
+            array_key: Top-level key of the array whose items to extract
+        """
+        self.array_key = array_key
+        self.examples: List[Dict[str, Any]] = []
+        self._text = ''
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        self._pending_key = None
+        self._array_depth = None
+        self._object_start = None
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of the streamed response.
+        
+        Args:
+            chunk: Next piece of response text
+            
+        Returns:
+            Objects completed by this chunk, in order
+        """
+        self._text += chunk
+        completed = []
+        
+        while self._position < len(self._text):
+            char = self._text[self._position]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = self._text[self._string_start:self._position + 1]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._position
+            elif char == ':':
+                self._pending_key = self._last_string if self._depth == 1 else None
+            elif char in '{[':
+                self._depth += 1
+                if char == '[' and self._array_depth is None and self._depth == 2 and \
+                        self._pending_key == json.dumps(self.array_key):
+                    self._array_depth = self._depth
+                elif char == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = self._position
+                self._pending_key = None
+            elif char in '}]':
+                if char == '}' and self._object_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        item = json.loads(self._text[self._object_start:self._position + 1])
+                        self.examples.append(item)
+                        completed.append(item)
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+                elif char == ']' and self._array_depth is not None and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+            
+            self._position += 1
+        
+        return completed
@@ -6,18 +6,28 @@ MCP server to generate and execute ES|QL queries.
 Based on: https://www.elastic.co/docs/solutions/search/agent-builder/mcp-server
 """
 
+import asyncio
 import os
 import json
 import httpx
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
+from cache_manager import CacheManager
+from async_engine import get_engine, parse_retry_after, backoff_delay
 
 
 # Load .env from project root
 project_root = Path(__file__).parent.parent.parent
 load_dotenv(project_root / ".env")
 
+# Bump when the way generate_esql arguments are built or parsed changes,
+# so cached generations from older behavior are not reused.
+GENERATE_ESQL_VERSION = "1"
+
+# Retries of a rate-limited (429) tool call, with jittered backoff
+MCP_MAX_RETRIES = int(os.getenv("MCP_MAX_RETRIES", "3"))
+
 
 class MCPClient:
     """Client for Elastic Agent Builder MCP server.
@@ -34,16 +44,19 @@ class MCPClient:
     def __init__(
         self,
         server_url: Optional[str] = None,
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        cache_manager: Optional[CacheManager] = None
     ):
         """Initialize MCP client.
         
         Args:
             server_url: MCP server URL (defaults to MCP_SERVER_URL env var)
             api_key: API key for authentication (defaults to MCP_API_KEY env var)
+            cache_manager: Optional cache manager for generate_esql results
         """
         self.server_url = server_url or os.getenv("MCP_SERVER_URL")
         self.api_key = api_key or os.getenv("MCP_API_KEY")
+        self.cache_manager = cache_manager
         
         if not self.server_url:
             raise ValueError(
@@ -69,6 +82,14 @@ class MCPClient:
             timeout=httpx.Timeout(60.0, connect=10.0)
         )
         
+        # Async client for tool calls, run on the shared engine loop so
+        # concurrent generations are bounded by the MCP semaphore
+        self.async_client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        self.engine = get_engine()
+        
         # #region agent log
         # List available tools at initialization for debugging
         import json as json_mod
@@ -90,6 +111,22 @@ class MCPClient:
     ) -> Dict[str, Any]:
         """Call an MCP tool.
         
+        Args:
+            tool_name: Name of the tool (e.g., "platform.core.generate_esql")
+            arguments: Tool arguments
+            
+        Returns:
+            Tool response
+        """
+        return self.engine.run(self._call_tool_async(tool_name, arguments))
+    
+    async def _call_tool_async(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Call an MCP tool (async version of _call_tool).
+        
         Args:
             tool_name: Name of the tool (e.g., "platform.core.generate_esql")
             arguments: Tool arguments
@@ -119,7 +156,18 @@ class MCPClient:
         # #endregion
         
         try:
-            response = self.client.post(self.server_url, json=payload)
+            limiter = self.engine.limit('mcp')
+            for attempt in range(MCP_MAX_RETRIES + 1):
+                async with limiter:
+                    response = await self.async_client.post(self.server_url, json=payload)
+                if response.status_code != 429 or attempt == MCP_MAX_RETRIES:
+                    break
+                retry_after = parse_retry_after(response.headers)
+                limiter.record_rate_limit(retry_after)
+                limiter.record_retry()
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+            if response.status_code < 400:
+                limiter.record_success(response.headers)
             result = response.json()
             
             # #region agent log
@@ -145,6 +193,26 @@ class MCPClient:
     ) -> str:
         """Generate an ES|QL query from natural language.
         
+        Sync wrapper around generate_esql_async.
+        
+        Args:
+            query: Natural language query description
+            index: Optional index to search (if not provided, uses index explorer)
+            context: Optional additional context
+            
+        Returns:
+            Generated ES|QL query string
+        """
+        return self.engine.run(self.generate_esql_async(query, index, context))
+    
+    async def generate_esql_async(
+        self,
+        query: str,
+        index: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> str:
+        """Generate an ES|QL query from natural language.
+        
         This uses Elastic's trained ES|QL generation model which produces
         significantly better queries than generic LLMs:
         - Uses proper MATCH() for full-text search
@@ -170,8 +238,37 @@ class MCPClient:
         if context:
             arguments["context"] = context
         
-        result = self._call_tool("platform_core_generate_esql", arguments)
+        cache_key = None
+        if self.cache_manager:
+            cache_key = self.cache_manager.compute_call_key(
+                arguments,
+                model=f"{self.server_url}#platform_core_generate_esql",
+                temperature=None,
+                prompt_version=GENERATE_ESQL_VERSION
+            )
+            cached = self.cache_manager.get_call('mcp_esql', cache_key)
+            if cached:
+                return cached
+        
+        esql = self._parse_generate_esql_result(
+            await self._call_tool_async("platform_core_generate_esql", arguments)
+        )
+        
+        if cache_key and esql:
+            # Cached once the query is confirmed to return rows
+            self.cache_manager.defer_call('mcp_esql', cache_key, esql)
+        
+        return esql
+    
+    def _parse_generate_esql_result(self, result: Dict[str, Any]) -> str:
+        """Extract the ES|QL string from a generate_esql tool response.
         
+        Args:
+            result: Raw tool response
+            
+        Returns:
+            Generated ES|QL query string
+        """
         # Extract ES|QL from response
         # Actual format: {"result": {"content": [{"type": "text", "text": "{\"results\":[{\"type\":\"query\",\"data\":{\"esql\":\"...\"}}]}"}]}}
         try:
@@ -276,6 +373,8 @@ class MCPClient:
                                 break
                 
                 if row_count > 0:
+                    if self.cache_manager:
+                        self.cache_manager.confirm_calls(esql)
                     return esql, row_count
                 
                 # No results, retry with modified context
@@ -347,8 +446,9 @@ class MCPClient:
     # #endregion
     
     def close(self):
-        """Close the HTTP client."""
+        """Close the HTTP clients."""
         self.client.close()
+        self.engine.run(self.async_client.aclose())
     
     def __enter__(self):
         return self
@@ -357,9 +457,12 @@ class MCPClient:
         self.close()
 
 
-def get_mcp_client() -> Optional[MCPClient]:
+def get_mcp_client(cache_manager: Optional[CacheManager] = None) -> Optional[MCPClient]:
     """Get MCP client if configured.
     
+    Args:
+        cache_manager: Optional cache manager for generate_esql results
+        
     Returns:
         MCPClient instance or None if not configured
     """
@@ -368,7 +471,7 @@ def get_mcp_client() -> Optional[MCPClient]:
     
     if server_url and api_key:
         try:
-            return MCPClient(server_url, api_key)
+            return MCPClient(server_url, api_key, cache_manager)
         except Exception as e:
             print(f"[MCP] Warning: Could not initialize MCP client: {e}")
             return None
@@ -0,0 +1,172 @@
+"""Token-budgeted prompt assembly for lab generation."""
+
+import os
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token counts fall back to an estimate
+    tiktoken = None
+
+
+# Upper bound for the system + user prompt of a generation call
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
+# Rough characters per token when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "... (truncated to fit the prompt budget)"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    """Get the tiktoken encoding for a model, or None without tiktoken."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or '')
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count the tokens in a piece of prompt text.
+    
+    Args:
+        text: Prompt text
+        model: Optional model name used to pick the tokenizer
+        
+    Returns:
+        Token count (estimated from length if tiktoken is not installed)
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class PromptBuilder:
+    """Assembles a prompt from named sections within a token budget.
+    
+    Stable sections (the same for every lab, e.g. dataset schemas and the
+    few-shot example) are placed first so providers that cache prompt
+    prefixes can reuse them across calls. Sections with a trim priority are
+    shortened, lowest priority first, until the prompt fits the budget;
+    sections without one are always kept whole.
+    """
+    
+    def __init__(self, budget: int = PROMPT_TOKEN_BUDGET, model: Optional[str] = None):
+        """Initialize builder.
+        
+        Args:
+            budget: Maximum tokens for the system prompt plus the built prompt
+            model: Optional model name used to pick the tokenizer
+        """
+        self.budget = budget
+        self.model = model
+        self.sections: List[Dict[str, Any]] = []
+        self.reserved = 0
+    
+    def reserve(self, text: str) -> None:
+        """Count text sent alongside the prompt (e.g. the system prompt) against the budget.
+        
+        Args:
+            text: Text that is not part of the built prompt
+        """
+        self.reserved += count_tokens(text, self.model)
+    
+    def add(
+        self,
+        name: str,
+        text: str,
+        stable: bool = False,
+        trim_priority: Optional[int] = None
+    ) -> None:
+        """Add a section.
+        
+        Args:
+            name: Section name used in the stats
+            text: Section text (skipped if empty)
+            stable: True if the section is identical across labs
+            trim_priority: Order in which sections are shortened to fit the
+                budget (1 first); None to never shorten the section
+        """
+        if not text:
+            return
+        self.sections.append({
+            'name': name,
+            'text': text,
+            'stable': stable,
+            'trim_priority': trim_priority,
+            'tokens': count_tokens(text, self.model)
+        })
+    
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text at a line boundary so it fits in max_tokens.
+        
+        Args:
+            text: Section text
+            max_tokens: Tokens available for the section
+            
+        Returns:
+            Truncated text ending with a marker, or '' if nothing fits
+        """
+        available = max_tokens - count_tokens(TRUNCATION_MARKER + '\n```', self.model)
+        kept = []
+        used = 0
+        for line in text.split('\n'):
+            line_tokens = count_tokens(line + '\n', self.model)
+            if used + line_tokens > available:
+                break
+            kept.append(line)
+            used += line_tokens
+        
+        # A lone heading is not worth keeping
+        if len(kept) <= 1:
+            return ''
+        if sum(line.startswith('```') for line in kept) % 2:
+            kept.append('```')
+        return '\n'.join(kept) + '\n' + TRUNCATION_MARKER
+    
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """Assemble the prompt.
+        
+        Returns:
+            Tuple of (prompt text, stats) where stats has budget, total_tokens
+            (including reserved text), stable_prefix_tokens, per-section
+            tokens and the names of trimmed or dropped sections
+        """
+        separator_tokens = count_tokens('\n\n', self.model)
+        sections = sorted(self.sections, key=lambda s: not s['stable'])
+        
+        def total():
+            return self.reserved + sum(s['tokens'] + separator_tokens for s in sections)
+        
+        trimmed = []
+        trimmable = sorted(
+            (s for s in sections if s['trim_priority'] is not None),
+            key=lambda s: s['trim_priority']
+        )
+        for section in trimmable:
+            overflow = total() - self.budget
+            if overflow <= 0:
+                break
+            section['text'] = self._truncate(section['text'], section['tokens'] - overflow)
+            section['tokens'] = count_tokens(section['text'], self.model) if section['text'] else 0
+            trimmed.append(section['name'])
+        
+        sections = [s for s in sections if s['text']]
+        prompt = '\n\n'.join(s['text'] for s in sections)
+        
+        stats = {
+            'budget': self.budget,
+            'total_tokens': total(),
+            'stable_prefix_tokens': self.reserved + sum(
+                s['tokens'] + separator_tokens for s in sections if s['stable']
+            ),
+            'sections': {s['name']: s['tokens'] for s in sections},
+            'trimmed': trimmed,
+            'exact': tiktoken is not None
+        }
+        return prompt, stats
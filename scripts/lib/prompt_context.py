@@ -0,0 +1,180 @@
+"""Per-process cache of few-shot lab configs and rendered schema blocks."""
+
+import hashlib
+import json
+import re
+import threading
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# Existing lab configs used as few-shot examples
+LABS_DIR = Path(__file__).parent.parent.parent / "shared" / "frontend" / "src" / "config" / "labs"
+
+# Few-shot example for query types with no related lab
+DEFAULT_FEW_SHOT_TYPE = 'match'
+
+# Query types whose labs share a structure, so one is a good example for another
+QUERY_FAMILIES = {
+    'term_level': ('term', 'terms', 'terms_set', 'range', 'exists', 'prefix', 'wildcard', 'regexp', 'fuzzy', 'ids'),
+    'full_text': (
+        'match', 'match_phrase', 'match_phrase_prefix', 'match_bool_prefix', 'multi_match',
+        'combined_fields', 'query_string', 'simple_query_string', 'intervals'
+    ),
+    'compound': ('bool', 'boosting', 'constant_score', 'dis_max', 'function_score'),
+}
+
+QUERY_TYPE_PATTERN = re.compile(r'''queryType:\s*['"]([\w-]+)['"]''')
+QUERY_LANGUAGE_PATTERN = re.compile(r'''queryLanguage:\s*['"](\w+)['"]''')
+
+
+def _normalize_query_type(query_type: str) -> str:
+    """Reduce 'term_query' / 'term-query' to 'term'."""
+    query_type = (query_type or '').lower().replace('-', '_')
+    return query_type[:-len('_query')] if query_type.endswith('_query') else query_type
+
+
+def _family(query_type: str) -> Optional[str]:
+    """Get the family of a normalized query type."""
+    return next((name for name, members in QUERY_FAMILIES.items() if query_type in members), None)
+
+
+class PromptContext:
+    """Caches prompt context that is identical across calls.
+    
+    Lab configs under LABS_DIR are indexed once; each file is only re-read
+    when its mtime changes, and its parsed entry is only replaced when its
+    content hash changes. Rendered schema blocks are kept per schema dict,
+    so the schemas are serialized once per process instead of once per
+    prompt.
+    """
+    
+    def __init__(self, labs_dir: Path = LABS_DIR):
+        """Initialize context and index the lab configs.
+        
+        Args:
+            labs_dir: Directory of existing *Config.ts lab configs
+        """
+        self.labs_dir = Path(labs_dir)
+        self._lock = threading.Lock()
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._schema_blocks: Dict[Tuple[int, Optional[str]], Tuple[Any, str]] = {}
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """Re-index lab configs that were added, changed or removed."""
+        paths = sorted(self.labs_dir.glob('*Config.ts')) if self.labs_dir.exists() else []
+        with self._lock:
+            seen = set()
+            for path in paths:
+                key = str(path)
+                seen.add(key)
+                try:
+                    mtime = path.stat().st_mtime
+                except OSError:
+                    continue
+                entry = self._configs.get(key)
+                if entry and entry['mtime'] == mtime:
+                    continue
+                
+                text = path.read_text(encoding='utf-8')
+                content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+                if entry and entry['hash'] == content_hash:
+                    entry['mtime'] = mtime
+                    continue
+                
+                query_type = QUERY_TYPE_PATTERN.search(text)
+                query_language = QUERY_LANGUAGE_PATTERN.search(text)
+                self._configs[key] = {
+                    'mtime': mtime,
+                    'hash': content_hash,
+                    'text': text,
+                    'query_type': _normalize_query_type(query_type.group(1) if query_type else path.stem),
+                    'query_language': query_language.group(1) if query_language else 'query_dsl'
+                }
+            
+            for key in set(self._configs) - seen:
+                del self._configs[key]
+    
+    def _score(self, query_type: str, candidate: str) -> Tuple[bool, float]:
+        """Rank a lab's query type as a few-shot example for another type."""
+        family = _family(query_type)
+        return (family is not None and family == _family(candidate), SequenceMatcher(None, query_type, candidate).ratio())
+    
+    def few_shot(self, query_type: str, query_language: str = 'query_dsl') -> Optional[Dict[str, Any]]:
+        """Choose the most relevant existing lab config for a query type.
+        
+        Labs of the same family (term-level, full-text, compound) rank
+        first, then labs with the most similar query type name. The lab of
+        the query type itself is skipped so a regeneration isn't anchored to
+        the config it replaces; without a related lab the match lab is used.
+        
+        Args:
+            query_type: Query type of the lab being generated (e.g. 'term_query')
+            query_language: Query language of the lab being generated
+            
+        Returns:
+            Dict with text, hash and query_type of the chosen config, or None
+            if no lab config exists
+        """
+        self.refresh()
+        target = _normalize_query_type(query_type)
+        with self._lock:
+            candidates = [
+                entry for entry in self._configs.values()
+                if entry['query_language'] == query_language and entry['query_type'] != target
+            ]
+        if not candidates:
+            return None
+        
+        best = max(candidates, key=lambda entry: (self._score(target, entry['query_type']), entry['query_type']))
+        in_family, similarity = self._score(target, best['query_type'])
+        if not in_family and similarity < 0.6:
+            best = next((e for e in candidates if e['query_type'] == DEFAULT_FEW_SHOT_TYPE), best)
+        return {'text': best['text'], 'hash': best['hash'], 'query_type': best['query_type']}
+    
+    def schema_block(self, dataset_schemas: Dict[str, Any], index: Optional[str] = None) -> str:
+        """Render dataset schemas (or one index's schema) as indented JSON, once.
+        
+        Args:
+            dataset_schemas: Dataset schema information (not modified after use)
+            index: Optional index to render only its schema
+            
+        Returns:
+            Rendered JSON
+        """
+        key = (id(dataset_schemas), index)
+        with self._lock:
+            cached = self._schema_blocks.get(key)
+            # The dict is kept alive in the cache, so its id is not reused
+            if cached and cached[0] is dataset_schemas:
+                return cached[1]
+        
+        value = dataset_schemas if index is None else dataset_schemas.get(index, {})
+        rendered = json.dumps(value, indent=2)
+        with self._lock:
+            self._schema_blocks[key] = (dataset_schemas, rendered)
+        return rendered
+    
+    def labs(self) -> List[str]:
+        """List the indexed lab query types."""
+        with self._lock:
+            return sorted(entry['query_type'] for entry in self._configs.values())
+
+
+_context: Optional[PromptContext] = None
+_context_lock = threading.Lock()
+
+
+def get_prompt_context() -> PromptContext:
+    """Get the process-wide prompt context, indexing lab configs on first use.
+    
+    Returns:
+        Shared PromptContext instance
+    """
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = PromptContext()
+        return _context
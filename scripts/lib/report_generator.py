@@ -28,7 +28,8 @@ class ReportGenerator:
             'created_labs': [],
             'skipped_labs': [],
             'failed_labs': [],
-            'validation_warnings': []
+            'validation_warnings': [],
+            'prompt_tokens': []
         }
     
     def add_created_lab(
@@ -148,6 +149,15 @@ class ReportGenerator:
         
         self.report_data['validation_warnings'].append(entry)
     
+    def add_prompt_stats(self, slug: str, stats: Dict[str, Any]) -> None:
+        """Record the token counts of a generation prompt.
+        
+        Args:
+            slug: Lab slug
+            stats: Stats from PromptBuilder.build (plus the task name)
+        """
+        self.report_data['prompt_tokens'].append({'slug': slug, **stats})
+    
     def set_summary(
         self,
         total_urls: int,
@@ -162,6 +172,46 @@ class ReportGenerator:
         self.report_data['summary']['total_urls'] = total_urls
         self.report_data['summary']['total_time_seconds'] = total_time_seconds
     
+    def set_cache_stats(self, cache_stats: Dict[str, Any]) -> None:
+        """Record cache hit/miss/byte statistics for the run.
+        
+        Args:
+            cache_stats: Stats dict from CacheManager.stats()
+        """
+        self.report_data['cache'] = cache_stats
+    
+    def set_rate_stats(self, rate_stats: Dict[str, Dict[str, Any]]) -> None:
+        """Record per-provider request throughput for the run.
+        
+        Args:
+            rate_stats: Stats dict from AsyncEngine.rate_stats()
+        """
+        self.report_data['rate_limits'] = rate_stats
+    
+    def set_model_stats(self, model_stats: List[Dict[str, Any]]) -> None:
+        """Record per-task, per-model LLM latency, tokens and success rate.
+        
+        Args:
+            model_stats: Stats list from AsyncEngine.model_stats()
+        """
+        self.report_data['models'] = model_stats
+    
+    def format_bytes(self, num_bytes: int) -> str:
+        """Format a byte count as human-readable size.
+        
+        Args:
+            num_bytes: Size in bytes
+            
+        Returns:
+            Formatted size string
+        """
+        if num_bytes < 1024:
+            return f"{num_bytes} B"
+        elif num_bytes < 1024 * 1024:
+            return f"{num_bytes / 1024:.1f} KB"
+        else:
+            return f"{num_bytes / (1024 * 1024):.1f} MB"
+    
     def format_time(self, seconds: float) -> str:
         """Format seconds as human-readable time.
         
@@ -266,6 +316,108 @@ class ReportGenerator:
             self.console.print(failed_table)
             self.console.print()
         
+        # Cache statistics
+        cache_stats = self.report_data.get('cache')
+        if cache_stats and cache_stats.get('enabled') and cache_stats.get('namespaces'):
+            cache_table = Table(
+                title=f"Cache ({cache_stats['backend']}, {self.format_bytes(cache_stats['stored_bytes'])} stored)",
+                show_header=True,
+                header_style="bold"
+            )
+            cache_table.add_column("Namespace", style="cyan")
+            cache_table.add_column("Hits", style="green")
+            cache_table.add_column("Misses", style="yellow")
+            cache_table.add_column("Read", style="green")
+            cache_table.add_column("Written", style="green")
+            
+            for namespace, counters in sorted(cache_stats['namespaces'].items()):
+                cache_table.add_row(
+                    namespace,
+                    str(counters['hits']),
+                    str(counters['misses']),
+                    self.format_bytes(counters['bytes_read']),
+                    self.format_bytes(counters['bytes_written'])
+                )
+            
+            self.console.print(cache_table)
+            self.console.print()
+        
+        # Provider throughput
+        rate_stats = {
+            provider: stats for provider, stats in (self.report_data.get('rate_limits') or {}).items()
+            if stats.get('requests')
+        }
+        if rate_stats:
+            rate_table = Table(title="Provider Throughput", show_header=True, header_style="bold")
+            rate_table.add_column("Provider", style="cyan")
+            rate_table.add_column("Requests", style="green")
+            rate_table.add_column("Req/min", style="green")
+            rate_table.add_column("Tokens/min", style="green")
+            rate_table.add_column("Rate Limited", style="yellow")
+            rate_table.add_column("Retries", style="yellow")
+            rate_table.add_column("Final Limit", style="green")
+            
+            for provider, stats in sorted(rate_stats.items()):
+                rate_table.add_row(
+                    provider,
+                    str(stats['requests']),
+                    str(stats['requests_per_minute'] or "—"),
+                    str(stats['tokens_per_minute'] or "—"),
+                    str(stats['rate_limited']),
+                    str(stats['retries']),
+                    str(stats['limit'])
+                )
+            
+            self.console.print(rate_table)
+            self.console.print()
+        
+        # Per-model LLM usage
+        if self.report_data.get('models'):
+            model_table = Table(title="Model Usage", show_header=True, header_style="bold")
+            model_table.add_column("Task", style="cyan")
+            model_table.add_column("Model", style="cyan")
+            model_table.add_column("Calls", style="green")
+            model_table.add_column("Success", style="green")
+            model_table.add_column("Avg Latency", style="green")
+            model_table.add_column("p95 Latency", style="green")
+            model_table.add_column("Tokens", style="green")
+            
+            for stats in self.report_data['models']:
+                model_table.add_row(
+                    stats['task'],
+                    stats['model'],
+                    str(stats['calls']),
+                    f"{stats['success_rate']:.0%}" if stats['success_rate'] is not None else "—",
+                    f"{stats['avg_latency']:.2f}s" if stats['avg_latency'] is not None else "—",
+                    f"{stats['p95_latency']:.2f}s" if stats['p95_latency'] is not None else "—",
+                    str(stats['tokens'])
+                )
+            
+            self.console.print(model_table)
+            self.console.print()
+        
+        # Prompt token counts
+        if self.report_data['prompt_tokens']:
+            prompt_table = Table(title="Prompt Tokens", show_header=True, header_style="bold")
+            prompt_table.add_column("Lab", style="cyan")
+            prompt_table.add_column("Task", style="cyan")
+            prompt_table.add_column("Tokens", style="green")
+            prompt_table.add_column("Cacheable Prefix", style="green")
+            prompt_table.add_column("Trimmed", style="yellow")
+            
+            for entry in self.report_data['prompt_tokens']:
+                approx = "" if entry.get('exact') else "~"
+                prompt_table.add_row(
+                    f"docs-lab-{entry['slug']}",
+                    entry.get('task', ''),
+                    f"{approx}{entry['total_tokens']} / {entry['budget']}",
+                    f"{approx}{entry['stable_prefix_tokens']}",
+                    ', '.join(entry['trimmed']) or "—"
+                )
+            
+            self.console.print(prompt_table)
+            self.console.print()
+        
         # Validation warnings
         if self.report_data['validation_warnings']:
             warnings_table = Table(title="Validation Warnings", show_header=True, header_style="bold")
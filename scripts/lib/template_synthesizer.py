@@ -0,0 +1,349 @@
+"""Rule-based example synthesis for the basic Query DSL labs."""
+
+import json
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+from value_profile import ValueProfile
+
+
+# Query types whose examples can be built from schema values alone
+SYNTHESIZED_QUERY_TYPES = ('term', 'terms', 'range', 'exists', 'prefix', 'wildcard', 'fuzzy', 'match')
+
+# Hits every synthesized example must be expected to return
+MIN_EXPECTED_HITS = 3
+
+LIKE_TERM_PATTERN = re.compile(r'\bLIKE\s+"\*?([^"*]+)\*?"', re.IGNORECASE)
+
+
+def synthesized_query_type(parsed_doc: Dict[str, Any]) -> Optional[str]:
+    """Get the synthesizable query type of a documentation page.
+    
+    Args:
+        parsed_doc: Parsed documentation structure
+        
+    Returns:
+        Query type (e.g. 'term'), or None if the page needs the LLM
+    """
+    query_type = (parsed_doc.get('query_type') or '').lower()
+    if query_type.endswith('_query'):
+        query_type = query_type[:-len('_query')]
+    return query_type if query_type in SYNTHESIZED_QUERY_TYPES else None
+
+
+class TemplateSynthesizer:
+    """Builds Query DSL examples from known field values.
+    
+    Values come from the value profile when one has been built (with
+    document counts, so every example is expected to return at least
+    MIN_EXPECTED_HITS documents) and otherwise from the keyword values,
+    searchable text fields and ES|QL example terms in
+    `dataset_schemas.json`. Examples are spread across indices and fields
+    and come with plain prose that an LLM can rewrite.
+    """
+    
+    def __init__(self, dataset_schemas: Dict[str, Any], value_profile: Optional[ValueProfile] = None):
+        """Initialize synthesizer.
+        
+        Args:
+            dataset_schemas: Dataset schema information
+            value_profile: Optional value profile of the live indices
+        """
+        self.dataset_schemas = dataset_schemas
+        self.value_profile = value_profile
+        self.values = {
+            index: self._index_values(index, schema)
+            for index, schema in dataset_schemas.items()
+            if isinstance(schema, dict) and 'fields' in schema
+        }
+    
+    def _index_values(self, index: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect usable values of an index by field role.
+        
+        Args:
+            index: Index name
+            schema: Schema for the index
+            
+        Returns:
+            Dict with keyword ({field: [values]}), patterned (keyword fields
+            usable in pattern queries), numeric ({field: sorted values}),
+            text ({field: [tokens]}) and fields entries
+        """
+        keyword = {}
+        numeric = {}
+        text = {}
+        profile_fields = {}
+        if self.value_profile:
+            profile_fields = self.value_profile.indices.get(index, {}).get('fields', {})
+        
+        if profile_fields:
+            for field, field_profile in profile_fields.items():
+                if field_profile['type'] == 'keyword':
+                    values = [str(v) for v, count in field_profile['top_terms'] if count >= MIN_EXPECTED_HITS]
+                    if len(values) >= 2:
+                        keyword[field] = values
+                elif field_profile['type'] == 'numeric':
+                    # Quartiles, so ranges span the middle half of the values
+                    percentiles = field_profile['percentiles']
+                    numeric[field] = [
+                        percentiles.get('25', field_profile['min']),
+                        percentiles.get('50', field_profile['avg']),
+                        percentiles.get('75', field_profile['max'])
+                    ]
+                elif field_profile['type'] == 'text':
+                    tokens = [t for t, _ in field_profile.get('top_tokens', []) if len(t) >= 4 and t.isalpha()]
+                    if tokens:
+                        text[field] = tokens
+        else:
+            for field, field_values in schema.get('keyword_field_values', {}).items():
+                if not field_values:
+                    continue
+                if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in field_values):
+                    numeric[field] = sorted(field_values)
+                elif field != schema.get('key_display_field'):
+                    keyword[field] = [str(v) for v in field_values]
+            
+            like_terms = []
+            for example in schema.get('esql_examples', []):
+                for term in LIKE_TERM_PATTERN.findall(example):
+                    if term.lower() not in like_terms:
+                        like_terms.append(term.lower())
+            for field in schema.get('searchable_text_fields', []):
+                if like_terms:
+                    text[field] = like_terms
+        
+        # Pattern queries (prefix, wildcard, fuzzy) fail on boolean fields
+        patterned = {
+            field: field_values for field, field_values in keyword.items()
+            if not all(v.lower() in ('true', 'false') for v in field_values)
+        }
+        
+        return {
+            'keyword': keyword,
+            'patterned': patterned,
+            'numeric': numeric,
+            'text': text,
+            'fields': [f for f in schema.get('fields', []) if not f.endswith('_id')]
+        }
+    
+    def _expected_hits(self, query: Dict[str, Any], index: str) -> Optional[int]:
+        """Estimate hits from the value profile (None if it can't tell)."""
+        if not self.value_profile:
+            return None
+        return self.value_profile.estimate_hits({'query': query}, index)
+    
+    def _number(self, value: float) -> Any:
+        """Round a bound to a readable number."""
+        return int(value) if float(value).is_integer() or abs(value) >= 100 else round(value, 2)
+    
+    def _misspell(self, token: str) -> Optional[str]:
+        """Swap two inner characters (one edit at fuzziness AUTO)."""
+        if len(token) < 5:
+            return None
+        middle = len(token) // 2
+        swapped = token[:middle - 1] + token[middle] + token[middle - 1] + token[middle + 1:]
+        return swapped if swapped != token else None
+    
+    def _candidates(self, query_type: str, index: str) -> List[Dict[str, Any]]:
+        """Build candidate examples of one query type for one index.
+        
+        Args:
+            query_type: Query type (one of SYNTHESIZED_QUERY_TYPES)
+            index: Index name
+            
+        Returns:
+            Candidates with index, field, query, title, description,
+            tryThis and tooltips, one field after another
+        """
+        values = self.values[index]
+        candidates = []
+        
+        def add(field, query, title, description, try_this, tooltip):
+            candidates.append({
+                'index': index,
+                'field': field,
+                'query': query,
+                'title': title,
+                'description': description,
+                'tryThis': try_this,
+                'tooltips': {field: tooltip}
+            })
+        
+        if query_type == 'term':
+            for field, field_values in values['keyword'].items():
+                for value in field_values[:2]:
+                    add(
+                        field,
+                        {'term': {field: {'value': value}}},
+                        f"Exact {field} match",
+                        f"Find documents in {index} whose `{field}` is exactly \"{value}\".",
+                        [f"Change the value to \"{field_values[-1]}\"", f"Try \"{value.lower()}\" to see that term queries are case-sensitive"],
+                        "Keyword field matched exactly, without analysis"
+                    )
+        
+        elif query_type == 'terms':
+            for field, field_values in values['keyword'].items():
+                for start in range(0, min(len(field_values) - 1, 4), 2):
+                    chosen = field_values[start:start + 2]
+                    add(
+                        field,
+                        {'terms': {field: chosen}},
+                        f"Any of several {field} values",
+                        f"Find documents in {index} whose `{field}` is \"{chosen[0]}\" or \"{chosen[1]}\".",
+                        [f"Add \"{field_values[-1]}\" to the list", "Remove a value to narrow the results"],
+                        "Matches documents containing any one of the listed exact values"
+                    )
+        
+        elif query_type == 'range':
+            for field, field_values in values['numeric'].items():
+                low = field_values[len(field_values) // 4]
+                high = field_values[(3 * len(field_values)) // 4]
+                median = field_values[len(field_values) // 2]
+                if low < high:
+                    add(
+                        field,
+                        {'range': {field: {'gte': self._number(low), 'lte': self._number(high)}}},
+                        f"{field} between two values",
+                        f"Find documents in {index} with `{field}` from {self._number(low)} to {self._number(high)}.",
+                        ["Widen the range to include more documents", "Change gte to gt to exclude the lower bound"],
+                        "Inclusive bounds: gte (≥) and lte (≤)"
+                    )
+                add(
+                    field,
+                    {'range': {field: {'gte': self._number(median)}}},
+                    f"{field} of at least {self._number(median)}",
+                    f"Find documents in {index} with `{field}` of {self._number(median)} or more.",
+                    ["Replace gte with lt to get the other half", f"Raise the bound above {self._number(median)}"],
+                    "Open-ended range with only a lower bound"
+                )
+        
+        elif query_type == 'exists':
+            for field in values['fields']:
+                add(
+                    field,
+                    {'exists': {'field': field}},
+                    f"Documents with a {field}",
+                    f"Find documents in {index} that have an indexed value for `{field}`.",
+                    ["Wrap the query in a bool must_not to find documents without the field"],
+                    "Matches documents where the field has any non-null value"
+                )
+        
+        elif query_type in ('prefix', 'wildcard'):
+            for field, field_values in values['patterned'].items():
+                for value in field_values[:2]:
+                    if len(value) < 4:
+                        continue
+                    if query_type == 'prefix':
+                        pattern = value[:3]
+                        add(
+                            field,
+                            {'prefix': {field: {'value': pattern}}},
+                            f"{field} starting with \"{pattern}\"",
+                            f"Find documents in {index} whose `{field}` starts with \"{pattern}\".",
+                            ["Shorten the prefix to match more values", "Add \"case_insensitive\": true"],
+                            "Prefix queries are not analyzed and are case-sensitive"
+                        )
+                    else:
+                        pattern = f"*{value[1:4]}*"
+                        add(
+                            field,
+                            {'wildcard': {field: {'value': pattern}}},
+                            f"{field} containing \"{value[1:4]}\"",
+                            f"Find documents in {index} whose `{field}` matches the pattern \"{pattern}\".",
+                            ["Use ? to match exactly one character", "Remove the leading * for a faster query"],
+                            "* matches any characters, ? matches one character"
+                        )
+        
+        elif query_type == 'fuzzy':
+            for field, tokens in {**values['text'], **values['patterned']}.items():
+                for token in tokens[:2]:
+                    misspelled = self._misspell(token)
+                    if not misspelled:
+                        continue
+                    add(
+                        field,
+                        {'fuzzy': {field: {'value': misspelled, 'fuzziness': 'AUTO'}}},
+                        f"Misspelled {field} search",
+                        f"Find documents in {index} whose `{field}` is within one edit of \"{misspelled}\" (e.g. \"{token}\").",
+                        ["Set fuzziness to 0 to require an exact match", "Add another typo and see when matches stop"],
+                        "AUTO allows 1 edit for 3-5 characters and 2 edits for longer terms"
+                    )
+        
+        elif query_type == 'match':
+            for field, tokens in values['text'].items():
+                add(
+                    field,
+                    {'match': {field: tokens[0]}},
+                    f"Full-text search in {field}",
+                    f"Find documents in {index} whose `{field}` mentions \"{tokens[0]}\".",
+                    [f"Search for \"{tokens[-1]}\" instead", "Add a second word to match either term"],
+                    "The query text is analyzed the same way as the field"
+                )
+                if len(tokens) >= 2:
+                    add(
+                        field,
+                        {'match': {field: {'query': f"{tokens[0]} {tokens[1]}", 'operator': 'or'}}},
+                        f"Either of two words in {field}",
+                        f"Find documents in {index} whose `{field}` mentions \"{tokens[0]}\" or \"{tokens[1]}\".",
+                        ["Set operator to and to require both words", "Add minimum_should_match"],
+                        "With operator or, any analyzed term may match"
+                    )
+        
+        return candidates
+    
+    def synthesize(self, query_type: str, count: int = 5) -> List[Dict[str, Any]]:
+        """Build diverse examples of a query type.
+        
+        Candidates are taken round-robin across indices so each index and
+        field is used before any repeats; with a value profile, candidates
+        expected to return fewer than MIN_EXPECTED_HITS documents are skipped.
+        
+        Args:
+            query_type: Query type (one of SYNTHESIZED_QUERY_TYPES)
+            count: Number of examples to build
+            
+        Returns:
+            Example dicts (id, title, description, template, index, tryThis,
+            tooltips), possibly fewer than count
+        """
+        if query_type not in SYNTHESIZED_QUERY_TYPES:
+            return []
+        
+        per_index = {}
+        for index in self.values:
+            usable = []
+            for candidate in self._candidates(query_type, index):
+                expected = self._expected_hits(candidate['query'], index)
+                if expected is not None and expected < MIN_EXPECTED_HITS:
+                    continue
+                usable.append(candidate)
+            
+            # One candidate per field first, then the remaining ones
+            first = []
+            rest = []
+            seen_fields = set()
+            for candidate in usable:
+                (rest if candidate['field'] in seen_fields else first).append(candidate)
+                seen_fields.add(candidate['field'])
+            per_index[index] = first + rest
+        
+        chosen: List[Tuple[str, Dict[str, Any]]] = []
+        position = 0
+        while len(chosen) < count and any(position < len(c) for c in per_index.values()):
+            for index, candidates in per_index.items():
+                if position < len(candidates) and len(chosen) < count:
+                    chosen.append((index, candidates[position]))
+            position += 1
+        
+        return [
+            {
+                'id': str(number),
+                'title': candidate['title'],
+                'description': candidate['description'],
+                'template': json.dumps({'query': candidate['query']}, indent=2),
+                'index': index,
+                'tryThis': candidate['tryThis'],
+                'tooltips': candidate['tooltips']
+            }
+            for number, (index, candidate) in enumerate(chosen, start=1)
+        ]
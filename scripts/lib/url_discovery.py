@@ -0,0 +1,221 @@
+"""Discover documentation URLs from docs section index pages and sitemaps."""
+
+import re
+from typing import Callable, Dict, List, Optional, Any
+from urllib.parse import urljoin, urlparse, urlunparse
+
+import requests
+
+from doc_parser import extract_slug_from_url, normalize_url
+
+
+# Links in sitemaps (<loc>), markdown ([text](url)) and HTML (href="url")
+SITEMAP_LOC_PATTERN = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+MARKDOWN_LINK_PATTERN = re.compile(r'\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+HTML_LINK_PATTERN = re.compile(r'href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Linked files that are never documentation pages
+SKIPPED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.json', '.xml', '.zip', '.gz', '.pdf', '.txt', '.css', '.js')
+
+# Work list priorities (lower is generated first)
+PRIORITY_QUERY_PAGE = 0
+PRIORITY_ESQL_PAGE = 1
+PRIORITY_OTHER_PAGE = 2
+
+PRIORITY_LABELS = {
+    PRIORITY_QUERY_PAGE: 'Query DSL query pages',
+    PRIORITY_ESQL_PAGE: 'ES|QL pages',
+    PRIORITY_OTHER_PAGE: 'Other pages'
+}
+
+
+def canonicalize_url(url: str, base_url: Optional[str] = None) -> Optional[str]:
+    """Canonicalize a documentation URL.
+    
+    Relative links are resolved against the base URL. The fragment, query
+    string, '.md' extension and trailing slash are dropped and the host is
+    lowercased, so '.../match-query.md', '.../match-query/' and
+    '.../match-query#params' all map to '.../match-query'.
+    
+    Args:
+        url: URL or link as found on the page
+        base_url: URL of the page the link was found on
+        
+    Returns:
+        Canonical URL, or None for non-HTTP links (mailto:, javascript:, ...)
+    """
+    url = urljoin(base_url, url.strip()) if base_url else url.strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return None
+    
+    path = parsed.path
+    if path.endswith('.md'):
+        path = path[:-len('.md')]
+    path = path.rstrip('/')
+    return urlunparse((parsed.scheme, parsed.netloc.lower(), path, '', '', ''))
+
+
+def extract_links(content: str) -> List[str]:
+    """Extract links from a sitemap, markdown or HTML index page.
+    
+    Args:
+        content: Page content
+        
+    Returns:
+        Links in page order (not canonicalized)
+    """
+    locs = SITEMAP_LOC_PATTERN.findall(content)
+    if locs:
+        return locs
+    return [
+        match.group(1) for match in sorted(
+            [*MARKDOWN_LINK_PATTERN.finditer(content), *HTML_LINK_PATTERN.finditer(content)],
+            key=lambda match: match.start()
+        )
+    ]
+
+
+def is_sitemap(source_url: str, content: str) -> bool:
+    """Check whether a discovery source is a sitemap."""
+    return source_url.lower().endswith('.xml') or '<urlset' in content[:1000] or '<sitemapindex' in content[:1000]
+
+
+def fetch_index(source_url: str) -> str:
+    """Fetch a sitemap or docs section index page.
+    
+    Index pages are fetched in their markdown form, like doc pages. They
+    are not cached: new pages show up on them, so each discovery run
+    fetches them again.
+    
+    Args:
+        source_url: Sitemap or index page URL
+        
+    Returns:
+        Page content
+        
+    Raises:
+        requests.RequestException: If the fetch fails
+    """
+    fetch_url = source_url if source_url.lower().endswith('.xml') else normalize_url(source_url.rstrip('/'))
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (compatible; LabGenerator/1.0)'
+    }
+    response = requests.get(fetch_url, timeout=30, headers=headers)
+    response.raise_for_status()
+    return response.text
+
+
+def url_priority(url: str) -> int:
+    """Rank a discovered URL for the work list.
+    
+    Pages for a single Query DSL query type map directly to a lab, so they
+    come first, then ES|QL pages, then everything else.
+    
+    Args:
+        url: Canonical URL
+        
+    Returns:
+        PRIORITY_* value
+    """
+    slug = extract_slug_from_url(url)
+    last_part = urlparse(url).path.rstrip('/').split('/')[-1]
+    if last_part.startswith('query-dsl-') and slug.endswith('-query'):
+        return PRIORITY_QUERY_PAGE
+    if 'esql' in last_part:
+        return PRIORITY_ESQL_PAGE
+    return PRIORITY_OTHER_PAGE
+
+
+def discover_urls(
+    sources: List[str],
+    lab_exists: Optional[Callable[[str], bool]] = None,
+    scope: Optional[str] = None,
+    known_urls: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Build a prioritized work list from sitemaps and docs section index pages.
+    
+    Each source is fetched once per run. Links are canonicalized and deduplicated;
+    links outside the scope, to the sources themselves, or whose slug maps
+    to an existing lab are dropped without fetching them.
+    
+    Args:
+        sources: Sitemap or index page URLs
+        lab_exists: Function telling whether a lab exists for a slug
+        scope: URL prefix discovered pages must start with (default: each
+            index page's own section; sitemaps are not scoped)
+        known_urls: URLs to leave out (e.g. already in a URLs file)
+        
+    Returns:
+        Dict with:
+        - work_list: List of {'url', 'slug', 'priority'} dicts, in priority order
+        - found: Number of links found
+        - duplicates: Links dropped as duplicates
+        - out_of_scope: Links dropped as outside the scope
+        - existing: Slugs dropped because their lab exists
+        - errors: {source: error message} for sources that could not be fetched
+    """
+    canonical_sources = {canonicalize_url(source) for source in sources}
+    seen = {canonicalize_url(url) for url in known_urls or []}
+    seen_slugs = {extract_slug_from_url(url) for url in seen if url}
+    work_list = []
+    result = {'found': 0, 'duplicates': 0, 'out_of_scope': 0, 'existing': [], 'errors': {}}
+    
+    for source in sources:
+        try:
+            content = fetch_index(source)
+        except requests.RequestException as e:
+            result['errors'][source] = str(e)
+            continue
+        
+        source_scope = scope
+        if source_scope is None and not is_sitemap(source, content):
+            # Pages of an index's section live next to it or below it
+            source_scope = canonicalize_url(source).rsplit('/', 1)[0] + '/'
+        
+        for link in extract_links(content):
+            result['found'] += 1
+            url = canonicalize_url(link, source)
+            if not url or url in canonical_sources or urlparse(url).path.lower().endswith(SKIPPED_EXTENSIONS):
+                result['out_of_scope'] += 1
+                continue
+            if source_scope and not url.startswith(source_scope):
+                result['out_of_scope'] += 1
+                continue
+            slug = extract_slug_from_url(url)
+            if url in seen or slug in seen_slugs:
+                # Pages under another path with the same slug map to the same lab
+                result['duplicates'] += 1
+                continue
+            seen.add(url)
+            seen_slugs.add(slug)
+            
+            if lab_exists and lab_exists(slug):
+                result['existing'].append(slug)
+                continue
+            work_list.append({'url': url, 'slug': slug, 'priority': url_priority(url)})
+    
+    # Stable sort keeps page order within a priority
+    work_list.sort(key=lambda item: item['priority'])
+    result['work_list'] = work_list
+    return result
+
+
+def write_work_list(work_list: List[Dict[str, Any]], path: str) -> None:
+    """Write a work list as a URLs file, grouped by priority.
+    
+    Args:
+        work_list: Work list from discover_urls
+        path: Output path (usable as the urls_file argument)
+    """
+    lines = []
+    priority = None
+    for item in work_list:
+        if item['priority'] != priority:
+            priority = item['priority']
+            if lines:
+                lines.append('')
+            lines.append(f"# {PRIORITY_LABELS[priority]}")
+        lines.append(item['url'])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
@@ -0,0 +1,508 @@
+"""Profile of the values that actually exist in the dataset indices."""
+
+import hashlib
+import json
+import re
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+DEFAULT_PROFILE_PATH = Path(__file__).parent.parent / "data" / "value_profile.json"
+
+# Values kept per keyword field and tokens kept per text field
+TOP_TERMS = 50
+
+# Documents sampled per index to count text tokens
+TEXT_SAMPLE_SIZE = 500
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+KEYWORD_TYPES = ('keyword', 'constant_keyword', 'boolean', 'ip')
+NUMERIC_TYPES = ('long', 'integer', 'short', 'byte', 'double', 'float', 'half_float', 'scaled_float', 'unsigned_long')
+DATE_TYPES = ('date', 'date_nanos')
+
+# ES|QL commands after which columns no longer hold the indexed values
+ESQL_COLUMN_COMMANDS = ('EVAL', 'RENAME', 'DISSECT', 'GROK', 'ENRICH', 'MV_EXPAND', 'LOOKUP')
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'this', 'that', 'are', 'was', 'but', 'not', 'you',
+    'from', 'have', 'has', 'its', 'they', 'very', 'all', 'our', 'your', 'will', 'can'
+}
+
+
+def _flatten_properties(properties: Dict[str, Any], prefix: str = '') -> Dict[str, Dict[str, Any]]:
+    """Flatten a mapping's properties into {dotted field: mapping}."""
+    fields = {}
+    for name, mapping in properties.items():
+        path = f"{prefix}{name}"
+        if 'properties' in mapping:
+            fields.update(_flatten_properties(mapping['properties'], f"{path}."))
+        else:
+            fields[path] = mapping
+    return fields
+
+
+def _tokens(text: str) -> set:
+    """Split text into the lowercase tokens a standard analyzer would index."""
+    return {
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 2 and token not in STOPWORDS
+    }
+
+
+def build_value_profile(
+    es,
+    indices: List[str],
+    fingerprints: Optional[Dict[str, Optional[str]]] = None,
+    top_terms: int = TOP_TERMS,
+    sample_size: int = TEXT_SAMPLE_SIZE
+) -> Dict[str, Any]:
+    """Profile field values in the live indices with one search per index.
+    
+    Keyword fields get their top terms (and whether the list is complete),
+    numeric fields their range and quantiles, date fields their range, and
+    text fields the document frequency of their tokens in a random sample.
+    
+    Args:
+        es: Elasticsearch client
+        indices: Index names to profile
+        fingerprints: Optional dataset fingerprint per index, stored so
+            stale profiles can be detected
+        top_terms: Values kept per keyword field
+        sample_size: Documents sampled for text token frequencies
+        
+    Returns:
+        Profile dict (see ValueProfile)
+    """
+    profile = {
+        'version': 1,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'indices': {}
+    }
+    
+    for index in indices:
+        mappings = es.indices.get_mapping(index=index)
+        fields = {}
+        for info in dict(mappings).values():
+            fields.update(_flatten_properties(info.get('mappings', {}).get('properties', {})))
+        
+        aggs = {}
+        text_fields = []
+        for field, mapping in fields.items():
+            field_type = mapping.get('type')
+            if field_type in KEYWORD_TYPES:
+                aggs[f"{field}|terms"] = {'terms': {'field': field, 'size': top_terms}}
+            elif field_type in NUMERIC_TYPES:
+                aggs[f"{field}|stats"] = {'stats': {'field': field}}
+                aggs[f"{field}|percentiles"] = {'percentiles': {'field': field, 'percents': PERCENTILES}}
+            elif field_type in DATE_TYPES:
+                aggs[f"{field}|stats"] = {'stats': {'field': field}}
+            elif field_type in ('text', 'match_only_text'):
+                text_fields.append(field)
+                keyword_subfield = next(
+                    (name for name, sub in mapping.get('fields', {}).items() if sub.get('type') == 'keyword'),
+                    None
+                )
+                if keyword_subfield:
+                    aggs[f"{field}|terms"] = {'terms': {'field': f"{field}.{keyword_subfield}", 'size': top_terms}}
+        
+        response = es.search(
+            index=index,
+            size=sample_size if text_fields else 0,
+            query={'function_score': {'query': {'match_all': {}}, 'random_score': {'seed': 42, 'field': '_seq_no'}}},
+            source=text_fields or False,
+            aggs=aggs,
+            track_total_hits=True
+        )
+        results = response.get('aggregations', {})
+        hits = response['hits']['hits']
+        
+        field_profiles = {}
+        for field, mapping in fields.items():
+            field_type = mapping.get('type')
+            terms = results.get(f"{field}|terms")
+            stats = results.get(f"{field}|stats")
+            
+            if field_type in KEYWORD_TYPES and terms:
+                field_profiles[field] = {
+                    'type': 'keyword',
+                    'top_terms': [[b.get('key_as_string', b['key']), b['doc_count']] for b in terms['buckets']],
+                    'complete': terms.get('sum_other_doc_count', 0) == 0
+                }
+            elif field_type in NUMERIC_TYPES and stats and stats.get('count'):
+                percentiles = results.get(f"{field}|percentiles", {}).get('values', {})
+                field_profiles[field] = {
+                    'type': 'numeric',
+                    'count': stats['count'],
+                    'min': stats['min'],
+                    'max': stats['max'],
+                    'avg': round(stats['avg'], 2),
+                    'percentiles': {str(int(float(k))): v for k, v in percentiles.items() if v is not None}
+                }
+            elif field_type in DATE_TYPES and stats and stats.get('count'):
+                field_profiles[field] = {
+                    'type': 'date',
+                    'count': stats['count'],
+                    'min': stats.get('min_as_string', stats['min']),
+                    'max': stats.get('max_as_string', stats['max'])
+                }
+            elif field in text_fields:
+                document_frequency = Counter()
+                for hit in hits:
+                    value = hit.get('_source', {})
+                    for part in field.split('.'):
+                        value = value.get(part) if isinstance(value, dict) else None
+                    if isinstance(value, list):
+                        value = ' '.join(str(v) for v in value)
+                    if value:
+                        document_frequency.update(_tokens(str(value)))
+                field_profiles[field] = {
+                    'type': 'text',
+                    'sample_size': len(hits),
+                    'top_tokens': [list(item) for item in document_frequency.most_common(top_terms)]
+                }
+                if terms:
+                    field_profiles[field]['top_terms'] = [[b['key'], b['doc_count']] for b in terms['buckets']]
+                    field_profiles[field]['complete'] = terms.get('sum_other_doc_count', 0) == 0
+        
+        profile['indices'][index] = {
+            'doc_count': response['hits']['total']['value'],
+            'fingerprint': (fingerprints or {}).get(index),
+            'fields': field_profiles
+        }
+        print(f"[Profile] {index}: {len(field_profiles)} fields, {response['hits']['total']['value']} documents")
+    
+    return profile
+
+
+class ValueProfile:
+    """Persisted value profile of the dataset indices.
+    
+    Used to show the LLM which values really exist and to predict how many
+    documents a query will match before it is sent to Elasticsearch.
+    """
+    
+    def __init__(self, profile: Dict[str, Any]):
+        """Initialize profile.
+        
+        Args:
+            profile: Profile dict from build_value_profile
+        """
+        self.profile = profile
+        self.indices: Dict[str, Any] = profile.get('indices', {})
+        self.fingerprint = hashlib.sha256(
+            json.dumps(profile.get('indices', {}), sort_keys=True).encode('utf-8')
+        ).hexdigest()
+    
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional['ValueProfile']:
+        """Load a saved profile.
+        
+        Args:
+            path: Profile path (default: data/value_profile.json)
+            
+        Returns:
+            ValueProfile, or None if no usable profile has been built
+        """
+        path = Path(path or DEFAULT_PROFILE_PATH)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f))
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"[Profile] Ignoring unreadable value profile {path}: {e}")
+            return None
+    
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the profile to disk.
+        
+        Args:
+            path: Profile path (default: data/value_profile.json)
+            
+        Returns:
+            Path written
+        """
+        path = Path(path or DEFAULT_PROFILE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.profile, f, indent=2)
+        return path
+    
+    def is_current(self, index: str, fingerprint: Optional[str]) -> bool:
+        """Check that an index has not changed since it was profiled."""
+        stored = self.indices.get(index, {}).get('fingerprint')
+        return stored is not None and stored == fingerprint
+    
+    def prompt_context(self, indices: Optional[List[str]] = None, max_values: int = 10) -> Dict[str, Any]:
+        """Summarize the profile for an LLM prompt.
+        
+        Args:
+            indices: Indices to include (default: all)
+            max_values: Values or tokens listed per field
+            
+        Returns:
+            {index: {"documents": N, "fields": {field: summary}}}
+        """
+        context = {}
+        for index in indices or list(self.indices):
+            info = self.indices.get(index)
+            if not info:
+                continue
+            
+            fields = {}
+            for field, field_profile in info.get('fields', {}).items():
+                field_type = field_profile['type']
+                if field_type == 'keyword':
+                    fields[field] = {'values': {str(v): c for v, c in field_profile['top_terms'][:max_values]}}
+                elif field_type == 'numeric':
+                    fields[field] = {
+                        'range': [field_profile['min'], field_profile['max']],
+                        'median': field_profile['percentiles'].get('50')
+                    }
+                elif field_type == 'date':
+                    fields[field] = {'range': [field_profile['min'], field_profile['max']]}
+                elif field_type == 'text':
+                    fields[field] = {'common_tokens': [t for t, _ in field_profile['top_tokens'][:max_values]]}
+            
+            context[index] = {'documents': info.get('doc_count'), 'fields': fields}
+        return context
+    
+    def estimate_hits(self, query: Any, index: str) -> Optional[int]:
+        """Estimate how many documents a query matches.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            
+        Returns:
+            Estimated hit count, or None if the query can't be estimated
+        """
+        estimate = self._estimate(query, index)
+        return estimate[0] if estimate else None
+    
+    def explain_zero_hits(self, query: Any, index: str) -> Optional[str]:
+        """Explain why a query is certain to match nothing.
+        
+        Only keyword values missing from a complete term list and numeric or
+        date ranges outside the indexed range count as certain.
+        
+        Args:
+            query: Query DSL dict or ES|QL query string
+            index: Target index name
+            
+        Returns:
+            Reason, or None if the query may match documents
+        """
+        estimate = self._estimate(query, index)
+        if estimate and estimate[0] == 0 and estimate[1]:
+            return estimate[2]
+        return None
+    
+    def _estimate(self, query: Any, index: str) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits as (count, exact, reason)."""
+        info = self.indices.get(index)
+        if not info:
+            return None
+        if isinstance(query, str):
+            return self._estimate_esql(query, info)
+        if isinstance(query, dict):
+            return self._estimate_dsl(query.get('query', query), info)
+        return None
+    
+    def _field(self, info: Dict[str, Any], field: str) -> Optional[Dict[str, Any]]:
+        """Look up a field profile, resolving .keyword subfields to their parent."""
+        fields = info.get('fields', {})
+        if field in fields:
+            return fields[field]
+        parent = field.rsplit('.', 1)[0]
+        if parent != field and 'top_terms' in fields.get(parent, {}):
+            return {'type': 'keyword', 'top_terms': fields[parent]['top_terms'], 'complete': fields[parent]['complete']}
+        return None
+    
+    def _term_count(self, info: Dict[str, Any], field: str, value: Any) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits for an exact value on a keyword field."""
+        if value is None or not isinstance(value, (str, int, float, bool)):
+            return None
+        field_profile = self._field(info, field)
+        if not field_profile or field_profile.get('type') != 'keyword':
+            # Exact values on analyzed text fields match tokens, not whole values
+            return None
+        if isinstance(value, bool):
+            value = str(value).lower()
+        for term, count in field_profile['top_terms']:
+            if str(term) == str(value):
+                return count, True, ''
+        if field_profile.get('complete'):
+            return 0, True, f"value {value!r} does not exist in {field}"
+        return None
+    
+    def _range_count(
+        self,
+        info: Dict[str, Any],
+        field: str,
+        lower: Optional[float],
+        upper: Optional[float]
+    ) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits for a numeric range by interpolating percentiles."""
+        field_profile = self._field(info, field)
+        if not field_profile or field_profile.get('type') != 'numeric':
+            return None
+        low, high = field_profile['min'], field_profile['max']
+        if (lower is not None and lower > high) or (upper is not None and upper < low):
+            return 0, True, f"{field} only ranges from {low} to {high}"
+        
+        points = sorted((float(k), v) for k, v in field_profile['percentiles'].items())
+        values = [low] + [v for _, v in points] + [high]
+        ranks = [0.0] + [k / 100 for k, _ in points] + [1.0]
+        
+        def rank(x):
+            position = bisect_left(values, x)
+            if position <= 0:
+                return 0.0
+            if position >= len(values):
+                return 1.0
+            span = values[position] - values[position - 1]
+            fraction = (x - values[position - 1]) / span if span else 1.0
+            return ranks[position - 1] + fraction * (ranks[position] - ranks[position - 1])
+        
+        share = rank(upper if upper is not None else high) - rank(lower if lower is not None else low)
+        return max(1, round(max(share, 0.0) * field_profile['count'])), False, ''
+    
+    def _text_count(self, info: Dict[str, Any], field: str, text: str) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits for a full-text match from sampled token frequencies."""
+        field_profile = self._field(info, field)
+        if not field_profile or field_profile.get('type') != 'text' or not field_profile.get('sample_size'):
+            return None
+        frequencies = dict(field_profile['top_tokens'])
+        tokens = _tokens(str(text))
+        if not tokens:
+            return None
+        best = max(frequencies.get(token, 0) for token in tokens)
+        return round(best * info.get('doc_count', 0) / field_profile['sample_size']), False, ''
+    
+    def _estimate_dsl(self, query: Dict[str, Any], info: Dict[str, Any]) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits for a Query DSL clause."""
+        if not isinstance(query, dict) or len(query) != 1:
+            return None
+        query_type, body = next(iter(query.items()))
+        
+        if query_type == 'match_all':
+            return info.get('doc_count', 0), True, ''
+        
+        if query_type in ('term', 'terms') and isinstance(body, dict):
+            field, value = next(((k, v) for k, v in body.items() if k != 'boost'), (None, None))
+            if field is None:
+                return None
+            if isinstance(value, dict):
+                # Case-insensitive terms and terms lookups can't be checked against top terms
+                if value.get('case_insensitive') or 'value' not in value:
+                    return None
+                value = value['value']
+            values = value if isinstance(value, list) else [value]
+            estimates = [self._term_count(info, field, v) for v in values]
+            if any(e is None for e in estimates):
+                return None
+            if sum(e[0] for e in estimates) == 0:
+                return 0, True, '; '.join(e[2] for e in estimates)
+            return sum(e[0] for e in estimates), True, ''
+        
+        if query_type == 'range' and isinstance(body, dict) and len(body) == 1:
+            field, bounds = next(iter(body.items()))
+            try:
+                lower = bounds.get('gte', bounds.get('gt'))
+                upper = bounds.get('lte', bounds.get('lt'))
+                return self._range_count(
+                    info,
+                    field,
+                    float(lower) if lower is not None else None,
+                    float(upper) if upper is not None else None
+                )
+            except (TypeError, ValueError, AttributeError):
+                return None
+        
+        if query_type in ('match', 'match_phrase') and isinstance(body, dict) and len(body) == 1:
+            field, value = next(iter(body.items()))
+            if isinstance(value, dict):
+                value = value.get('query')
+            return self._text_count(info, field, value) if value is not None else None
+        
+        if query_type == 'bool' and isinstance(body, dict):
+            def clauses(key):
+                value = body.get(key, [])
+                return value if isinstance(value, list) else [value]
+            
+            required = [self._estimate_dsl(c, info) for c in clauses('must') + clauses('filter')]
+            known = [e for e in required if e is not None]
+            for estimate in known:
+                if estimate[0] == 0 and estimate[1]:
+                    return estimate
+            if known:
+                return min(e[0] for e in known), False, ''
+            
+            optional = [self._estimate_dsl(c, info) for c in clauses('should')]
+            if optional and all(e is not None for e in optional):
+                if all(e[0] == 0 and e[1] for e in optional):
+                    return 0, True, '; '.join(e[2] for e in optional)
+                return min(sum(e[0] for e in optional), info.get('doc_count', 0)), False, ''
+            return None
+        
+        return None
+    
+    def _estimate_esql(self, query: str, info: Dict[str, Any]) -> Optional[Tuple[int, bool, str]]:
+        """Estimate hits for simple ES|QL WHERE conditions joined by AND.
+        
+        WHERE clauses after a command that creates or changes columns
+        (EVAL, RENAME, DISSECT, ...) can't be checked against the indexed
+        values, and STATS returns rows even when nothing matched.
+        """
+        conditions = []
+        columns_changed = False
+        for segment in query.split('|')[1:]:
+            command = segment.strip().split(' ', 1)[0].upper()
+            if command == 'STATS':
+                return None
+            if command in ESQL_COLUMN_COMMANDS:
+                columns_changed = True
+            if command != 'WHERE':
+                continue
+            if columns_changed:
+                return None
+            clause = segment.strip()[len('WHERE'):]
+            if re.search(r'\bOR\b|\bNOT\b', clause, re.IGNORECASE):
+                return None
+            conditions.extend(re.split(r'\bAND\b', clause, flags=re.IGNORECASE))
+        if not conditions:
+            return None
+        
+        estimates = []
+        for condition in conditions:
+            condition = condition.strip()
+            match = re.fullmatch(r'([\w.]+)\s*==\s*"([^"]*)"', condition)
+            if match:
+                estimates.append(self._term_count(info, match.group(1), match.group(2)))
+                continue
+            match = re.fullmatch(r'([\w.]+)\s*(>=|>|<=|<)\s*(\d+(?:\.\d+)?)', condition)
+            if match:
+                value = float(match.group(3))
+                lower = value if match.group(2).startswith('>') else None
+                upper = value if match.group(2).startswith('<') else None
+                estimates.append(self._range_count(info, match.group(1), lower, upper))
+                continue
+            match = re.fullmatch(r'([\w.]+)\s+LIKE\s+"\*?([^"*]+)\*?"', condition, re.IGNORECASE)
+            if match:
+                estimates.append(self._text_count(info, match.group(1), match.group(2)))
+                continue
+            estimates.append(None)
+        
+        for estimate in estimates:
+            if estimate and estimate[0] == 0 and estimate[1]:
+                return estimate
+        known = [e for e in estimates if e is not None]
+        if not known:
+            return None
+        return min(e[0] for e in known), len(known) == len(estimates) and all(e[1] for e in known), ''